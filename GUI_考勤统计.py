@@ -32,14 +32,23 @@ warnings.filterwarnings("ignore", category=UserWarning)
 
 from Modulo import Ask
 
-from Modulo import Spider
-
-from Modulo import Writer
-
 from Modulo import Constant
 
 from Modulo import Methods
 
+from Modulo import Calendar
+from Modulo import Cancel
+from Modulo import Pipeline
+from Modulo import Profile
+from Modulo import Progress
+from Modulo import Rules
+from Modulo import Warehouse
+
+# 进度队列的刷新间隔 (毫秒)
+PROGRESS_POLL_MS = 100
+
+# 预览表格每页显示的人数
+PREVIEW_PAGE_SIZE = 100
 
 
 
@@ -68,6 +77,11 @@ class ACMAttendanceGUI:
 
         self.selected_dates = []
 
+        # 载入训练日程与已保存的自定义统计规则, 需在创建统计规则下拉列表之前
+        Calendar.register_saved()
+        Rules.register_saved()
+        self.custom_methods = Rules.custom_specs()
+
         
 
         # 创建界面
@@ -80,10 +94,26 @@ class ACMAttendanceGUI:
 
         self.load_default_config()
 
+        # 统计任务状态, 关闭窗口时需要先取消任务并等待 Excel 清理完毕
+        self.worker = None
+        self.job = None
+        self.cancel_token = None
+        self.preview_result = None
+        self.closing = False
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
     
 
     def create_widgets(self):
 
+        # 菜单: 性能分析开关, 开启后每次统计结束时在输出表格旁写出 .prof 与 .folded
+        self.profile_var = tk.BooleanVar(value=getattr(Constant, 'PROFILE', False))
+        menubar = tk.Menu(self.root)
+        tools_menu = tk.Menu(menubar, tearoff=0)
+        tools_menu.add_checkbutton(label="性能分析", variable=self.profile_var)
+        menubar.add_cascade(label="工具", menu=tools_menu)
+        self.root.config(menu=menubar)
+
         # 创建主框架
 
         main_frame = ttk.Frame(self.root, padding="10")
@@ -261,15 +291,27 @@ class ACMAttendanceGUI:
 
             row=6, column=1, sticky=tk.W, pady=5)
 
+        # 历史查询按钮, 直接查询历史仓库, 不打开表格
+        ttk.Button(main_frame, text="历史查询", command=self.show_history).grid(
+            row=6, column=2, sticky=tk.W, pady=5)
+
         
 
-        # 开始统计按钮
+        # 开始统计与取消按钮
+        action_frame = ttk.Frame(main_frame)
+        action_frame.grid(row=7, column=0, columnspan=3, pady=20)
 
-        self.start_button = ttk.Button(main_frame, text="开始统计", command=self.start_statistics,
+        self.start_button = ttk.Button(action_frame, text="开始统计", command=self.start_statistics,
 
                                       style="Accent.TButton")
 
-        self.start_button.grid(row=7, column=0, columnspan=3, pady=20)
+        self.start_button.pack(side=tk.LEFT, padx=(0, 10))
+
+        self.preview_button = ttk.Button(action_frame, text="预览", command=self.start_preview)
+        self.preview_button.pack(side=tk.LEFT, padx=(0, 10))
+
+        self.cancel_button = ttk.Button(action_frame, text="取消", command=self.cancel_statistics, state="disabled")
+        self.cancel_button.pack(side=tk.LEFT)
 
         
 
@@ -496,6 +538,14 @@ class ACMAttendanceGUI:
 
         for name, method_class in Methods.all_methods.items():
 
+            if Rules.is_custom(method_class):
+                rules_info += Rules.format_text(method_class.SPEC) + "\n"
+                continue
+
+            if isinstance(method_class, Calendar.Schedule):
+                rules_info += Calendar.format_text(method_class) + "\n"
+                continue
+
             rules_info += f"• {name}\n"
 
             if hasattr(method_class, 'FLEX_STANDARD'):
@@ -648,191 +698,23 @@ class ACMAttendanceGUI:
             messagebox.showerror("保存失败", f"保存设置时出现错误：\n{str(e)}")
     
     def parse_and_save_custom_rules(self, rules_text):
-        """解析并保存自定义规则"""
+        """解析规则文本, 编译并注册自定义规则, 保存到 Constant.RULES_PATH"""
         try:
-            # 简单的规则解析逻辑
-            lines = rules_text.split('\n')
-            custom_rules = {}
-            current_rule = None
-            
-            for line in lines:
-                line = line.strip()
-                if line.startswith('• '):
-                    # 新规则开始
-                    rule_name = line[2:]  # 移除 "• " 前缀
-                    current_rule = rule_name
-                    custom_rules[current_rule] = {}
-                elif line.startswith('  灵活时长标准: ') and current_rule:
-                    # 解析灵活时长标准
-                    value = line.replace('  灵活时长标准: ', '')
-                    try:
-                        custom_rules[current_rule]['FLEX_STANDARD'] = int(value)
-                    except ValueError:
-                        pass
-                elif line.startswith('  固定打卡日期: ') and current_rule:
-                    # 解析固定打卡日期
-                    value = line.replace('  固定打卡日期: ', '')
-                    if value == '每天':
-                        custom_rules[current_rule]['REGULAR_WDAY'] = 'daily'
-                    elif value == '无':
-                        custom_rules[current_rule]['REGULAR_WDAY'] = 'none'
-                    elif value.startswith('周'):
-                        try:
-                            day_num = int(value.replace('周', ''))
-                            custom_rules[current_rule]['REGULAR_WDAY'] = day_num - 1  # 转换为0-based
-                        except ValueError:
-                            pass
-                elif line.startswith('  训练时间: ') and current_rule:
-                    # 解析训练时间
-                    value = line.replace('  训练时间: ', '')
-                    if '-' in value and value.count('-') == 4:  # 格式：2025-01-20-2025-02-05
-                        try:
-                            # 解析开始和结束日期
-                            parts = value.split('-')
-                            start_year, start_month, start_day = int(parts[0]), int(parts[1]), int(parts[2])
-                            end_year, end_month, end_day = int(parts[3]), int(parts[4]), int(parts[5])
-                            
-                            start_date = datetime(start_year, start_month, start_day).date()
-                            end_date = datetime(end_year, end_month, end_day).date()
-                            
-                            custom_rules[current_rule]['TRAIN_START_DATE'] = start_date
-                            custom_rules[current_rule]['TRAIN_END_DATE'] = end_date
-                            custom_rules[current_rule]['TRAIN_MODE'] = 'date_range'
-                            
-                            # 计算天数差
-                            delta = end_date - start_date
-                            custom_rules[current_rule]['TRAIN_DAYS'] = delta.days + 1
-                            
-                        except (ValueError, IndexError):
-                            pass
-                    elif value.startswith('间隔'):
-                        try:
-                            days = int(value.replace('间隔', '').replace('天', ''))
-                            custom_rules[current_rule]['TRAIN_INTERVAL'] = days
-                            custom_rules[current_rule]['TRAIN_MODE'] = 'interval'
-                        except ValueError:
-                            pass
-                    elif value.isdigit():
-                        # 纯数字，作为间隔天数处理
-                        try:
-                            days = int(value)
-                            custom_rules[current_rule]['TRAIN_INTERVAL'] = days
-                            custom_rules[current_rule]['TRAIN_MODE'] = 'interval'
-                        except ValueError:
-                            pass
-            
-            # 创建真正的统计方法类并添加到Methods.all_methods中
-            for rule_name, rule_config in custom_rules.items():
-                # 创建自定义方法类
-                custom_method_class = self.create_custom_method_class(rule_name, rule_config)
-                if custom_method_class:
-                    # 添加到Methods.all_methods中
-                    Methods.all_methods[rule_name] = custom_method_class
-            
-            # 保存到实例变量中，供后续使用
-            if hasattr(self, 'custom_methods'):
-                self.custom_methods.update(custom_rules)
-            else:
-                self.custom_methods = custom_rules
-            
-            return len(custom_rules) > 0
+            # 界面中列出的内置办法只读, 不参与解析
+            builtin = [name for name, method_class in Methods.all_methods.items()
+                       if not Rules.is_custom(method_class)]
+            custom_rules = Rules.parse_text(rules_text, skip=builtin)
+            # 文本即全部自定义规则, 其中删除的规则同时注销, 不再写回保存文件
+            Rules.unregister_missing(custom_rules)
+            Rules.register(custom_rules)
+            self.custom_methods = Rules.custom_specs()
+            Rules.save(self.custom_methods)
+            return True
             
-        except Exception as e:
+        except (ValueError, OSError) as e:
             print(f"解析规则时出错: {e}")
             return False
     
-    def create_custom_method_class(self, rule_name, rule_config):
-        """创建自定义统计方法类"""
-        try:
-            # 导入必要的模块
-            from Modulo.Methods import MethodBase
-            
-            # 创建自定义方法类
-            class CustomMethod(MethodBase):
-                def __init__(self, data, records):
-                    super().__init__(data, records)
-                    # 设置自定义参数
-                    if 'FLEX_STANDARD' in rule_config:
-                        self.FLEX_STANDARD = rule_config['FLEX_STANDARD']
-                    else:
-                        self.FLEX_STANDARD = 14  # 默认灵活时长标准
-                    
-                    if 'REGULAR_WDAY' in rule_config:
-                        self.REGULAR_WDAY = rule_config['REGULAR_WDAY']
-                    else:
-                        self.REGULAR_WDAY = 5  # 默认周六
-                    
-                    if 'TRAIN_DAYS' in rule_config:
-                        self.TRAIN_DAYS = rule_config['TRAIN_DAYS']
-                    else:
-                        self.TRAIN_DAYS = 7  # 默认7天
-                    
-                    if 'TRAIN_MODE' in rule_config:
-                        self.TRAIN_MODE = rule_config['TRAIN_MODE']
-                    else:
-                        self.TRAIN_MODE = 'continuous'
-                    
-                    if 'TRAIN_START_DATE' in rule_config:
-                        self.TRAIN_START_DATE = rule_config['TRAIN_START_DATE']
-                    
-                    if 'TRAIN_END_DATE' in rule_config:
-                        self.TRAIN_END_DATE = rule_config['TRAIN_END_DATE']
-                    
-                    if 'TRAIN_INTERVAL' in rule_config:
-                        self.TRAIN_INTERVAL = rule_config['TRAIN_INTERVAL']
-                    else:
-                        self.TRAIN_INTERVAL = 1
-                
-                def _calc_seconds(self) -> str:
-                    """计算打卡时长"""
-                    _seconds = 0.0
-                    for _st, _ed in self._data:
-                        _seconds += _ed - _st
-                    return "'{:02d}:{:02d}".format(int(_seconds) // 3600, int(_seconds) % 3600 // 60)
-                
-                def _calc_flex_count(self) -> int:
-                    """计算灵活次数"""
-                    _seconds = 0.0
-                    for _st, _ed in self._data:
-                        _seconds += _ed - _st
-                    # 超过 50 min 向上取整
-                    return (int(_seconds) + 600) // 3600
-                
-                def _calc_regular_count(self) -> int:
-                    """计算固定次数"""
-                    if self.REGULAR_WDAY == 'daily':
-                        # 每天都要打卡
-                        return len(set(time.strftime('%Y-%m-%d', time.localtime(_st)) for _st, _ in self._data))
-                    elif self.REGULAR_WDAY == 'none':
-                        # 无固定打卡要求
-                        return 0
-                    else:
-                        # 指定星期几打卡
-                        count = 0
-                        for _st, _ed in self._data:
-                            _mk_st = time.localtime(_st)
-                            if _mk_st.tm_wday == self.REGULAR_WDAY:
-                                count += 1
-                        return count
-                
-                def _calc_violation_count(self) -> int:
-                    """计算违规次数"""
-                    # 简单实现：如果灵活次数不足标准，则违规
-                    flex_hours = self._calc_flex_count()
-                    if flex_hours < self.FLEX_STANDARD:
-                        return self.FLEX_STANDARD - flex_hours
-                    return 0
-            
-            # 设置类名
-            CustomMethod.__name__ = rule_name
-            CustomMethod.__qualname__ = rule_name
-            
-            return CustomMethod
-            
-        except Exception as e:
-            print(f"创建自定义方法类时出错: {e}")
-            return None
-    
     def update_methods_combo(self):
         """更新统计规则下拉列表"""
         try:
@@ -960,185 +842,319 @@ class ACMAttendanceGUI:
         self.stat_method_value = self.stat_method.get()  # 获取统计方式
         self.allowed_dates_value = getattr(self, 'allowed_dates', None)  # 获取允许的日期
         
+        self.start_job(self.run_statistics, "正在统计...")
+
+    def start_preview(self):
+        """预览统计结果: 只获取记录并计算, 确认后才写入表格"""
+        if not self.validate_inputs():
+            return
+
+        self.path_output = self.file_path_var.get()
+        self.stat_method_value = self.stat_method.get()
+        self.allowed_dates_value = getattr(self, 'allowed_dates', None)
+        self.start_job(self.run_preview, "正在生成预览...")
+
+    def start_job(self, target, status_text):
+        """在工作线程中执行 target, 进度与结果通过进度队列返回主循环"""
         # 禁用开始按钮
 
         self.start_button.config(state="disabled")
+        self.preview_button.config(state="disabled")
 
         self.progress.start()
 
-        self.status_label.config(text="正在统计...", foreground="blue")
+        self.status_label.config(text=status_text, foreground="blue")
 
         
 
+        self.cancel_button.config(state="normal")
+
+        # 进度事件队列: 工作线程只负责上报, 由主循环定时取出并刷新界面
+        self.job = target
+        self.cancel_token = Cancel.CancelToken()
+        self.progress_reporter = Progress.ProgressReporter()
+        self.progress_tracker = Progress.ProgressTracker()
+        self.root.after(PROGRESS_POLL_MS, self.poll_progress)
+
         # 在新线程中执行统计
 
-        thread = threading.Thread(target=self.run_statistics)
+        # 性能分析开关在主线程读取, 输出文件名按任务区分, 如 考勤.run_preview.prof
+        self.worker = threading.Thread(target=Profile.wrap(
+            target, self.path_output, target.__name__, self.profile_var.get()))
 
-        thread.daemon = True
+        self.worker.daemon = True
 
-        thread.start()
+        self.worker.start()
 
-    
+    def cancel_statistics(self):
+        """请求取消当前统计, 流水线会在下一页或下一批处停止并退出 Excel"""
+        if self.cancel_token is not None and not self.cancel_token.cancelled:
+            self.cancel_token.cancel()
+            self.cancel_button.config(state="disabled")
+            self.status_label.config(text="正在取消...", foreground="orange")
 
-    def run_statistics(self):
+    def on_close(self):
+        """关闭窗口: 若统计仍在进行, 先取消并等待工作线程完成清理, 避免残留 Excel 进程"""
+        if self.worker is not None and self.worker.is_alive():
+            self.closing = True
+            self.cancel_statistics()
+            self.root.after(PROGRESS_POLL_MS, self.on_close)
+            return
+        self.root.destroy()
 
-        """执行统计任务"""
+    
 
+    def run_statistics(self):
+        """执行统计任务, 运行在工作线程中, 只通过进度队列与界面通信"""
+        reporter = self.progress_reporter
         try:
-
             print("浙江理工大学 ACM 集训队考勤统计 - 得力e+版 Jamhus Tao @ 2023")
-
             print("继续维护详见源代码注释...")
-
             print()
 
-            
-
-            # 获取参数 - 在线程启动前获取，避免线程安全问题
-            TIME_RANGE = self.time_range
+            # 参数均在线程启动前获取，避免线程安全问题
+            # 如果是指定日期模式，则在取回数据后按所选日期进行过滤，仅保留这些日期的记录
+            allowed_dates = self.allowed_dates_value if self.stat_method_value == "指定日期" else None
+            Pipeline.run(self.time_range, self.path_output, self.method_todo, allowed_dates, reporter,
+                         self.cancel_token)
+            reporter.finish(True, "统计完成！")
+        except Cancel.Cancelled as e:
+            print(e)
+            reporter.finish(False, str(e))
+        except Exception as e:
+            error_msg = f"统计过程中出现错误:\n{str(e)}"
+            print(error_msg)
+            traceback.print_exc()
+            reporter.finish(False, error_msg)
 
-            PATH_OUTPUT = self.path_output  # 使用实例变量而不是直接访问tkinter变量
-            METHOD_TODO = self.method_todo
+    def run_preview(self):
+        """生成预览, 运行在工作线程中, 不修改表格"""
+        reporter = self.progress_reporter
+        try:
+            allowed_dates = self.allowed_dates_value if self.stat_method_value == "指定日期" else None
+            self.preview_result = Pipeline.preview(self.time_range, self.path_output, self.method_todo,
+                                                   allowed_dates, reporter, self.cancel_token)
+            reporter.finish(True, "预览已生成，确认后写入表格")
+        except Cancel.Cancelled as e:
+            print(e)
+            reporter.finish(False, str(e))
+        except Exception as e:
+            error_msg = f"生成预览时出现错误:\n{str(e)}"
+            print(error_msg)
+            traceback.print_exc()
+            reporter.finish(False, error_msg)
 
-            
+    def run_commit(self):
+        """将已确认的预览写入表格, 运行在工作线程中, 不重新获取记录"""
+        reporter = self.progress_reporter
+        try:
+            Pipeline.commit(self.preview_result, reporter, self.cancel_token)
+            reporter.finish(True, "统计完成！")
+        except Cancel.Cancelled as e:
+            print(e)
+            reporter.finish(False, str(e))
+        except Exception as e:
+            error_msg = f"写入表格时出现错误:\n{str(e)}"
+            print(error_msg)
+            traceback.print_exc()
+            reporter.finish(False, error_msg)
 
-            # 打开文件
+    def poll_progress(self):
+        """在 Tk 主循环中定时取出进度事件并刷新进度条与状态"""
+        for event in self.progress_reporter.drain():
+            if event.stage == Progress.STAGE_FINISH:
+                self.on_statistics_complete(bool(event.done), event.message)
+                return
+            if event.stage == Progress.STAGE_MESSAGE:
+                self.status_label.config(text=event.message, foreground="blue")
+                continue
+            self.progress_tracker.update(event)
+            fraction = self.progress_tracker.fraction()
+            if fraction is None:
+                if str(self.progress.cget('mode')) != 'indeterminate':
+                    self.progress.config(mode='indeterminate')
+                    self.progress.start()
+            else:
+                if str(self.progress.cget('mode')) != 'determinate':
+                    self.progress.stop()
+                    self.progress.config(mode='determinate')
+                self.progress['value'] = fraction * 100
+            self.status_label.config(text=self.progress_tracker.describe(), foreground="blue")
+        self.root.after(PROGRESS_POLL_MS, self.poll_progress)
 
-            print("获取原始刷卡记录与训练情况历史...")
+    def on_statistics_complete(self, success, message):
+        """统计完成后的处理"""
+        self.progress.stop()
+        self.progress.config(mode='indeterminate')
+        self.progress['value'] = 0
+        self.start_button.config(state="normal")
+        self.preview_button.config(state="normal")
+        self.cancel_button.config(state="disabled")
+        if self.closing:
+            # 窗口正在关闭, on_close 会在工作线程退出后销毁窗口
+            return
+        if not success and self.cancel_token.cancelled:
+            self.status_label.config(text=message, foreground="orange")
+        elif success and self.job == self.run_preview:
+            self.status_label.config(text=message, foreground="green")
+            self.show_preview(self.preview_result)
+        elif success:
+            self.status_label.config(text=message, foreground="green")
+            messagebox.showinfo("完成", f"{message}\n文件已保存到: {self.path_output}")
+        else:
+            self.status_label.config(text="统计失败", foreground="red")
+            messagebox.showerror("错误", message)
 
-            spider = Spider.Spider(TIME_RANGE[0], TIME_RANGE[1])
+    def show_preview(self, preview):
+        """以可排序、分页的表格展示预览结果, 确认后写入"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("统计预览 - " + preview.method_todo)
+        dialog.geometry("760x520")
+        dialog.transient(self.root)
 
-            # 如果是指定日期模式，则在取回数据后按所选日期进行过滤，仅保留这些日期的记录
-            if self.stat_method_value == "指定日期" and self.allowed_dates_value:
-                filtered_records = {}
-                for _id, pairs in spider.MemberClockinRecords.items():
-                    kept = []
-                    for st_ts, ed_ts in pairs:
-                        day_key = time.strftime('%Y-%m-%d', time.localtime(st_ts))
-                        if day_key in self.allowed_dates_value:
-                            kept.append((st_ts, ed_ts))
-                    if kept:
-                        filtered_records[_id] = kept
-                member_records = filtered_records
+        columns = (
+            ("工号", lambda x: x.member),
+            ("姓名", lambda x: x.name),
+            ("类别", lambda x: x.type),
+            (Constant.COL_RECORDS_SECONDS_TITLE, lambda x: x.total_seconds),
+            (Constant.COL_RECORDS_FLEX_COUNT_TITLE, lambda x: x.flex_count),
+            (Constant.COL_RECORDS_REGULAR_COUNT_TITLE, lambda x: x.regular_count),
+            (Constant.COL_RECORDS_VIOLATION_COUNT_TITLE, lambda x: x.violation_count),
+        )
+        state = {"rows": list(preview.scores), "page": 0, "sort": None, "reverse": False}
+
+        table_frame = ttk.Frame(dialog)
+        table_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 0))
+        tree = ttk.Treeview(table_frame, columns=[__[0] for __ in columns], show="headings")
+        scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        page_frame = ttk.Frame(dialog)
+        page_frame.pack(fill=tk.X, padx=10, pady=5)
+        page_label = ttk.Label(page_frame)
+
+        def render():
+            # 只插入当前页的行, 大名单下也能保持流畅
+            pages = max((len(state["rows"]) + PREVIEW_PAGE_SIZE - 1) // PREVIEW_PAGE_SIZE, 1)
+            state["page"] = min(max(state["page"], 0), pages - 1)
+            tree.delete(*tree.get_children())
+            start = state["page"] * PREVIEW_PAGE_SIZE
+            for row in state["rows"][start:start + PREVIEW_PAGE_SIZE]:
+                tree.insert("", tk.END, values=(
+                    row.member, row.name, row.type, str(row.seconds),
+                    row.flex_count, row.regular_count, row.violation_count,
+                ))
+            page_label.config(text=f"第 {state['page'] + 1}/{pages} 页，共 {len(state['rows'])} 人")
+
+        def sort_by(index):
+            if state["sort"] == index:
+                state["reverse"] = not state["reverse"]
             else:
-                member_records = spider.MemberClockinRecords
-            writer = Writer.Writer(PATH_OUTPUT)
+                state["sort"], state["reverse"] = index, False
+            state["rows"].sort(key=columns[index][1], reverse=state["reverse"])
+            state["page"] = 0
+            render()
 
-            _new_col = len(writer.data[Constant.ROW_START - 1]) - Constant.COL_RECORDS_START + Constant.COL_RECORDS_LENGTH - 1
+        def turn(delta):
+            state["page"] += delta
+            render()
 
-            _new_col = _new_col // Constant.COL_RECORDS_LENGTH * Constant.COL_RECORDS_LENGTH + Constant.COL_RECORDS_START
+        for index, (title, _) in enumerate(columns):
+            tree.heading(title, text=title, command=lambda i=index: sort_by(i))
+            tree.column(title, width=90, anchor=tk.CENTER)
 
-            
+        ttk.Button(page_frame, text="上一页", command=lambda: turn(-1)).pack(side=tk.LEFT)
+        page_label.pack(side=tk.LEFT, padx=10)
+        ttk.Button(page_frame, text="下一页", command=lambda: turn(1)).pack(side=tk.LEFT)
 
-            print("计算与更新新增数据...")
+        def confirm():
+            dialog.destroy()
+            self.start_job(self.run_commit, "正在写入表格...")
 
-            # 更新表格大小 (扩容)
+        button_frame = ttk.Frame(dialog)
+        button_frame.pack(pady=10)
+        ttk.Button(button_frame, text="确认写入", command=confirm).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(button_frame, text="放弃", command=dialog.destroy).pack(side=tk.LEFT)
 
-            _extend = _new_col + Constant.COL_RECORDS_LENGTH - len(writer.data[Constant.ROW_START - 1])
+        render()
 
-            for _i in range(len(writer.data)):
+    def show_history(self):
+        """查询历史仓库: 每月打卡时长与固定时段缺勤, 不需要打开表格"""
+        if not Warehouse.default_path() or not os.path.exists(Warehouse.default_path()):
+            messagebox.showinfo("历史查询", "尚无历史数据，完成一次统计后会自动记录。\n仓库路径由 Constant.ini 的 WAREHOUSE_PATH 配置。")
+            return
 
-                writer.data[_i].extend(
+        dialog = tk.Toplevel(self.root)
+        dialog.title("历史查询")
+        dialog.geometry("640x480")
+        dialog.transient(self.root)
 
-                    [''] * _extend
+        notebook = ttk.Notebook(dialog)
+        notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
+        def make_table(parent, titles):
+            tree = ttk.Treeview(parent, columns=titles, show="headings")
+            for title in titles:
+                tree.heading(title, text=title)
+                tree.column(title, width=120, anchor=tk.CENTER)
+            tree.pack(fill=tk.BOTH, expand=True, pady=(5, 0))
+            return tree
+
+        def fill_table(tree, rows):
+            tree.delete(*tree.get_children())
+            for row in rows:
+                tree.insert("", tk.END, values=row)
+
+        # 每月打卡时长
+        monthly_frame = ttk.Frame(notebook, padding=5)
+        notebook.add(monthly_frame, text="每月时长")
+        monthly_bar = ttk.Frame(monthly_frame)
+        monthly_bar.pack(fill=tk.X)
+        ttk.Label(monthly_bar, text="工号(留空为全部):").pack(side=tk.LEFT)
+        member_entry = ttk.Entry(monthly_bar, width=20)
+        member_entry.pack(side=tk.LEFT, padx=5)
+        monthly_tree = make_table(monthly_frame, ("工号", "月份", "小时数"))
+
+        def query_monthly():
+            member = member_entry.get().strip().upper() or None
+            with Warehouse.Warehouse() as warehouse:
+                rows = warehouse.monthly_hours(member)
+            fill_table(monthly_tree, [(m, month, f"{hours:.2f}") for m, month, hours in rows])
+
+        ttk.Button(monthly_bar, text="查询", command=query_monthly).pack(side=tk.LEFT)
+
+        # 固定时段缺勤
+        missed_frame = ttk.Frame(notebook, padding=5)
+        notebook.add(missed_frame, text="固定时段缺勤")
+        missed_bar = ttk.Frame(missed_frame)
+        missed_bar.pack(fill=tk.X)
+        missed_start = DateEntry(missed_bar, width=12, date_pattern='yyyy-mm-dd')
+        missed_start.set_date(self.start_date.get_date())
+        missed_start.pack(side=tk.LEFT)
+        ttk.Label(missed_bar, text="至").pack(side=tk.LEFT, padx=5)
+        missed_end = DateEntry(missed_bar, width=12, date_pattern='yyyy-mm-dd')
+        missed_end.set_date(self.end_date.get_date())
+        missed_end.pack(side=tk.LEFT)
+        weekdays = ("周一", "周二", "周三", "周四", "周五", "周六", "周日")
+        weekday_combo = ttk.Combobox(missed_bar, values=weekdays, state="readonly", width=6)
+        weekday_combo.current(Methods.MethodRegular.REGULAR_WDAY)
+        weekday_combo.pack(side=tk.LEFT, padx=5)
+        missed_tree = make_table(missed_frame, ("工号", "日期"))
+
+        def query_missed():
+            with Warehouse.Warehouse() as warehouse:
+                rows = warehouse.missed_sessions(
+                    weekday_combo.current(),
+                    missed_start.get_date().strftime('%Y-%m-%d'),
+                    missed_end.get_date().strftime('%Y-%m-%d'),
                 )
+            fill_table(missed_tree, rows)
 
-            
-
-            # 更新新增表头
-
-            writer.merge_range(
-
-                (Constant.ROW_START - 2, _new_col),
+        ttk.Button(missed_bar, text="查询", command=query_missed).pack(side=tk.LEFT)
 
-                (Constant.ROW_START - 1, _new_col + Constant.COL_RECORDS_LENGTH),
-
-            )
-
-            _st, _ed = spider.TimeRange
-
-            _mk_st = time.localtime(_st)
-
-            _mk_ed = time.localtime(_ed)
-
-            writer.data[Constant.ROW_START - 2][_new_col] = "{}-{}-{} ~ {}-{}-{}".format(
-                _mk_st.tm_year, _mk_st.tm_mon, _mk_st.tm_mday,
-                _mk_ed.tm_year, _mk_ed.tm_mon, _mk_ed.tm_mday,
-            )
-            writer.data[Constant.ROW_START - 1][_new_col + Constant.COL_RECORDS_SECONDS] \
-                = Constant.COL_RECORDS_SECONDS_TITLE  # 打卡时长
-            writer.data[Constant.ROW_START - 1][_new_col + Constant.COL_RECORDS_FLEX_COUNT] \
-                = Constant.COL_RECORDS_FLEX_COUNT_TITLE  # 灵活次数
-            writer.data[Constant.ROW_START - 1][_new_col + Constant.COL_RECORDS_REGULAR_COUNT] \
-                = Constant.COL_RECORDS_REGULAR_COUNT_TITLE  # 固定次数
-            writer.data[Constant.ROW_START - 1][_new_col + Constant.COL_RECORDS_VIOLATION_COUNT] \
-                = Constant.COL_RECORDS_VIOLATION_COUNT_TITLE  # 新增违规
-            writer.data[Constant.ROW_START - 1][_new_col + Constant.COL_RECORDS_REMARK] \
-                = Constant.COL_RECORDS_REMARK_TITLE  # 备注
-            
-            # 更新新增信息
-            for _i in range(Constant.ROW_START, len(writer.data)):
-                _id = writer.data[_i][Constant.COL_ID].strip().upper()
-                if not Constant.ID_TYPE_TEXT:
-                    _id = str(int(float(_id)))
-                
-                # 选择执行方案
-                method = Methods.all_methods[METHOD_TODO](writer.data[_i], member_records.get(_id, []))
-                writer.data[_i][_new_col + Constant.COL_RECORDS_SECONDS] = method.seconds()  # 打卡时长
-                writer.data[_i][_new_col + Constant.COL_RECORDS_FLEX_COUNT] = method.flex_count()  # 灵活次数
-                writer.data[_i][_new_col + Constant.COL_RECORDS_REGULAR_COUNT] = method.regular_count()  # 固定次数
-                writer.data[_i][_new_col + Constant.COL_RECORDS_VIOLATION_COUNT] = method.violation_count()  # 新增违规
-            
-            # 递交新增信息 (含新增表头)
-            writer.rewrite_range(
-                (Constant.ROW_START - 2, _new_col),
-                (len(writer.data), _new_col + Constant.COL_RECORDS_LENGTH),
-            )
-            
-            # 更新人员基本信息
-            for _i in range(Constant.ROW_START, len(writer.data)):
-                # 更新违规次数公式
-                writer.data[_i][Constant.COL_VIOLATION_COUNT] = "={}".format(
-                    "+".join(
-                        [writer.excel_index(_i, __) for __ in range(
-                            Constant.COL_RECORDS_START + Constant.COL_RECORDS_VIOLATION_COUNT,
-                            _new_col + Constant.COL_RECORDS_LENGTH,
-                            Constant.COL_RECORDS_LENGTH
-                        )]
-                    )
-                )
-            
-            # 递交人员基本信息更新
-            print("正在将结果写入文件...")
-            writer.rewrite_range(
-                (Constant.ROW_START, Constant.COL_VIOLATION_COUNT),
-                (len(writer.data), Constant.COL_VIOLATION_COUNT + 1),
-            )  # 仅更新了违规次数公式
-            
-            # 关闭文件
-            writer.close()
-            
-            # 更新UI状态
-            self.root.after(0, self.on_statistics_complete, True, "统计完成！")
-            
-        except Exception as e:
-            error_msg = f"统计过程中出现错误:\n{str(e)}"
-            print(error_msg)
-            traceback.print_exc()
-            self.root.after(0, self.on_statistics_complete, False, error_msg)
-    
-    def on_statistics_complete(self, success, message):
-        """统计完成后的处理"""
-        self.progress.stop()
-        self.start_button.config(state="normal")
-        
-        if success:
-            self.status_label.config(text=message, foreground="green")
-            messagebox.showinfo("完成", f"{message}\n文件已保存到: {self.file_path_var.get()}")
-        else:
-            self.status_label.config(text="统计失败", foreground="red")
-            messagebox.showerror("错误", message)
+        query_monthly()
 
 
 def main():
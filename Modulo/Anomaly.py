@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ACM考勤统计系统 - Anomaly模块
+功能：在原始打卡流上检测可疑模式: 两名成员总在几秒内先后打卡 (代打卡), 深夜打卡, 被 FREQUENCY_FILTER 丢弃的频繁重复打卡
+特点：成对检测按时间分桶哈希, 只比较同一桶与相邻桶内的打卡, 不做全体成员两两扫描; 结果按可疑程度排序
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from Modulo import Constant
+from Modulo import Methods
+
+KIND_BUDDY = "buddy"  # 两名成员总在几秒内先后打卡
+KIND_NIGHT = "night"  # 深夜打卡
+KIND_REPEAT = "repeat"  # 频繁重复打卡
+
+KIND_TITLES = {
+    KIND_BUDDY: "疑似代打卡",
+    KIND_NIGHT: "深夜打卡",
+    KIND_REPEAT: "频繁重复打卡",
+}
+
+
+class Finding:
+    """
+    一项可疑发现
+
+    Attributes:
+        kind: 类型, 取值见 KIND_* 常量
+        members: 涉及的工号
+        score: 可疑程度 0~1, 用于排序
+        count: 可疑打卡的次数
+        detail: 说明文本
+    """
+    __slots__ = ("kind", "members", "score", "count", "detail")
+
+    def __init__(self, kind: str, members: Tuple[str, ...], score: float, count: int, detail: str):
+        self.kind = kind
+        self.members = members
+        self.score = score
+        self.count = count
+        self.detail = detail
+
+    def __repr__(self):
+        return "Finding({!r}, {!r}, {:.2f}, {})".format(self.kind, self.members, self.score, self.count)
+
+
+class AnomalyReport:
+    """按可疑程度 (其次按次数) 降序排列的发现"""
+
+    def __init__(self, findings: List[Finding]):
+        self.findings = sorted(findings, key=lambda __: (-__.score, -__.count))
+
+    def __len__(self) -> int:
+        return len(self.findings)
+
+    def by_kind(self, kind: str) -> List[Finding]:
+        return [__ for __ in self.findings if __.kind == kind]
+
+    def describe(self, top: Optional[int] = None) -> str:
+        top = top or getattr(Constant, 'ANOMALY_TOP', 20)
+        if not self.findings:
+            return "未发现可疑打卡"
+        return "\n".join(
+            "{:>2}. [{}] {} · 可疑度 {:.0%} · {}".format(
+                _i, KIND_TITLES[__.kind], " & ".join(__.members), __.score, __.detail)
+            for _i, __ in enumerate(self.findings[:top], 1)
+        )
+
+
+def buddy_pairs(punches: Dict[str, List[int]], window: int, min_count: int) -> List[Finding]:
+    """
+    成对检测: 统计每对成员在 window 秒内先后打卡的次数
+
+    打卡时间按 window 分桶, 相距不超过 window 的两次打卡只可能在同一桶或相邻桶, 因此每个桶只需与下一个桶合并比较.
+    可疑度为共同打卡次数占两人中较少打卡数的比例.
+    """
+    _ids = list(punches)
+    _buckets: Dict[int, List[Tuple[int, int]]] = {}
+    for _k, _id in enumerate(_ids):
+        for _t in punches[_id]:
+            _buckets.setdefault(_t // window, []).append((_t, _k))
+    _n = len(_ids)
+    _pairs: Dict[int, int] = {}  # 键为 较小下标 * _n + 较大下标, 比元组键省去构造与哈希的开销
+    for _b, _items in _buckets.items():
+        _merged = sorted(_items + _buckets.get(_b + 1, []))
+        _end = _b * window + window  # 本桶之后的打卡不作为起点, 下一桶内部的组合留给下一桶, 避免重复计数
+        for _i, (_t, _a) in enumerate(_merged):
+            if _t >= _end:
+                break
+            for _j in range(_i + 1, len(_merged)):
+                _t2, _c = _merged[_j]
+                if _t2 - _t > window:
+                    break
+                if _c != _a:
+                    _key = _a * _n + _c if _a < _c else _c * _n + _a
+                    _pairs[_key] = _pairs.get(_key, 0) + 1
+    _findings = []
+    for _key, _count in _pairs.items():
+        if _count < min_count:
+            continue
+        _a, _c = divmod(_key, _n)
+        _base = min(len(punches[_ids[_a]]), len(punches[_ids[_c]]))
+        _findings.append(Finding(
+            KIND_BUDDY, (_ids[_a], _ids[_c]), min(_count / _base, 1.0), _count,
+            "{} 次在 {} 秒内先后打卡, 占较少一方打卡的 {:.0%}".format(_count, window, min(_count / _base, 1.0)),
+        ))
+    return _findings
+
+
+def night_punches(punches: Dict[str, List[int]], window: Tuple[int, int], min_count: int) -> List[Finding]:
+    """深夜打卡: 打卡时刻落在每天 [window[0], window[1]) 内, 可疑度为其占本人打卡的比例"""
+    _findings = []
+    for _id, _times in punches.items():
+        _count = 0
+        for _t in _times:
+            _day, _ = Methods.local_day(_t)
+            if window[0] <= _t - _day < window[1]:
+                _count += 1
+        if _count >= min_count:
+            _findings.append(Finding(
+                KIND_NIGHT, (_id,), _count / len(_times), _count,
+                "{} 次打卡在 {:02d}:00-{:02d}:00 之间".format(_count, window[0] // 3600, window[1] // 3600),
+            ))
+    return _findings
+
+
+def repeated_punches(punches: Dict[str, List[int]], interval: int, min_count: int) -> List[Finding]:
+    """频繁重复打卡: 与上一次保留的打卡相隔不足 interval 秒, 即配对时被 FREQUENCY_FILTER 丢弃的打卡"""
+    _findings = []
+    for _id, _times in punches.items():
+        _count, _pre = 0, None
+        for _t in _times:
+            if _pre is not None and _t - _pre < interval:
+                _count += 1
+            else:
+                _pre = _t
+        if _count >= min_count:
+            _findings.append(Finding(
+                KIND_REPEAT, (_id,), _count / len(_times), _count,
+                "{} 次打卡与上一次相隔不足 {} 秒, 配对时被丢弃".format(_count, interval),
+            ))
+    return _findings
+
+
+def detect(punches: Dict[str, List[int]]) -> AnomalyReport:
+    """
+    对原始打卡流运行全部检测
+
+    Args:
+        punches: {工号: [打卡时间, ...]}, Unix 时间, 须在 Spider.pair_punches 之前调用 (配对会原地过滤);
+                 列表会被原地排序, 不影响之后的配对
+
+    Returns:
+        排序后的报告; 阈值见 Constant.ini 的 ANOMALY_* 配置
+    """
+    for _times in punches.values():
+        _times.sort()
+    _min_count = getattr(Constant, 'ANOMALY_MIN_COUNT', 5)
+    return AnomalyReport(
+        buddy_pairs(punches, getattr(Constant, 'ANOMALY_PAIR_WINDOW', 30), _min_count)
+        + night_punches(punches, getattr(Constant, 'ANOMALY_NIGHT', (1 * 3600, 6 * 3600)), _min_count)
+        + repeated_punches(punches, Constant.FREQUENCY_FILTER, _min_count)
+    )
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ACM考勤统计系统 - AsyncSpider模块
+功能：在一个事件循环中并发获取多个组织、多个时间分片的考勤数据
+特点：与 Spider 共用请求构建、重试策略与打卡配对; 每个组织独立限速与熔断; 结果按 (组织, 工号) 合并
+依赖：aiohttp (可选, 仅本模块需要)
+"""
+
+import asyncio
+import json
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import requests
+
+from Modulo import Cancel
+from Modulo import Constant
+from Modulo import Intervals
+from Modulo import Paging
+from Modulo import Progress
+from Modulo import Retry
+from Modulo import Spider
+
+try:
+    import aiohttp
+except ImportError:  # 未安装时仅本模块不可用
+    aiohttp = None
+
+
+class RateLimiter:
+    """
+    异步限速器: 相邻两次请求的开始时刻至少间隔 1 / rate 秒
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            _now = time.monotonic()
+            if self._next > _now:
+                await asyncio.sleep(self._next - _now)
+                _now = self._next
+            self._next = _now + self.interval
+
+
+def split_shards(start_time: int, end_time: int, shard_seconds: int) -> List[Tuple[int, int]]:
+    """
+    将闭区间 [start_time, end_time] 切成互不重叠的闭区间分片, 分片边界对齐到 10 分钟
+
+    Returns:
+        [(开始时间, 结束时间), ...]
+    """
+    shard_seconds = max(shard_seconds // 600 * 600, 600)
+    _shards = []
+    _st = start_time
+    while _st <= end_time:
+        _shards.append((_st, min(_st + shard_seconds - 1, end_time)))
+        _st += shard_seconds
+    return _shards
+
+
+class AsyncSpider:
+    """
+    多组织并发爬取器
+
+    每个 (组织, 时间分片) 为一个任务, 各自分页获取; 同一组织的任务共用一个限速器、并发上限和熔断器,
+    不同组织互不影响. 打卡时间按 (组织, 工号) 归并后统一配对.
+
+    用法:
+        spider = AsyncSpider(start_time, end_time, ['组织编号1', '组织编号2'])
+        records = spider.get_member_records()  # 键为 (组织编号, 工号)
+    """
+
+    def __init__(self, start_time: float, end_time: float, org_ids: Optional[Iterable[str]] = None,
+                 progress: Optional[Progress.ProgressReporter] = None,
+                 cancel: Optional[Cancel.CancelToken] = None):
+        """
+        Args:
+            start_time, end_time: 查询时间范围 (Unix时间)
+            org_ids: 组织编号列表, 默认为 Constant.ORG_IDS, 未配置时为 [Constant.ORG_ID]
+            progress: 进度上报队列, 为 None 时不上报
+            cancel: 取消令牌, 每页之间与重试等待期间检查
+        """
+        if aiohttp is None:
+            raise ImportError("AsyncSpider 需要 aiohttp, 请先 pip install aiohttp")
+        self.start_time = int(start_time) // 600 * 600
+        self.end_time = (int(end_time) + 1) // 600 * 600 - 1
+        self.TimeRange = (self.start_time, self.end_time)
+        self.org_ids = [str(__) for __ in (org_ids or getattr(Constant, 'ORG_IDS', None) or [Constant.ORG_ID])]
+        self.progress = progress
+        self.cancel = cancel
+
+        self.shards = split_shards(self.start_time, self.end_time,
+                                   int(getattr(Constant, 'ASYNC_SHARD_DAYS', 7) * 86400))
+        self.rate = getattr(Constant, 'ASYNC_ORG_RATE', 5.0)  # 每个组织每秒最多发起的请求数
+        self.concurrency = getattr(Constant, 'ASYNC_ORG_CONCURRENCY', 4)  # 每个组织同时进行的请求数
+        self.timeout = getattr(Constant, 'SSL_TIMEOUT', 60)
+        self.verify_ssl = getattr(Constant, 'VERIFY_SSL', False)
+        self.retry_policy = Retry.RetryPolicy()
+        self.telemetry = Paging.FetchTelemetry()
+
+        self.MemberClockinRecords: Optional[Intervals.IntervalStore] = None
+        self._punches: Dict[Tuple[str, str], List[int]] = {}
+        self._shard_totals: Dict[Tuple[str, int], int] = {}
+        self._fetched = 0
+
+    def get_member_records(self) -> Intervals.IntervalStore:
+        """
+        同步入口, 在新的事件循环中完成全部获取
+
+        Returns:
+            考勤记录, 用法同 {(组织编号, 工号): [(开始时间, 结束时间), ...]}
+        """
+        if self.MemberClockinRecords is None:
+            self.MemberClockinRecords = asyncio.run(self.fetch())
+        return self.MemberClockinRecords
+
+    @staticmethod
+    def split_by_org(member_records: Intervals.IntervalStore) -> Dict[str, Intervals.IntervalStore]:
+        """将合并结果拆回 {组织编号: {工号: 区间}}, 便于逐个组织交给 Pipeline"""
+        _by_org: Dict[str, Dict[str, Intervals.IntervalView]] = {}
+        for (_org, _id), _view in member_records.items():
+            _by_org.setdefault(_org, {})[_id] = _view
+        return {_org: Intervals.IntervalStore.from_pairs(_records) for _org, _records in _by_org.items()}
+
+    async def fetch(self) -> Intervals.IntervalStore:
+        """并发获取全部组织与分片, 返回按 (组织编号, 工号) 配对后的区间"""
+        print(f"[AsyncSpider] 获取 {len(self.org_ids)} 个组织，每个组织 {len(self.shards)} 个时间分片")
+        _ssl = None if self.verify_ssl else False
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout),
+                                         connector=aiohttp.TCPConnector(ssl=_ssl)) as session:
+            _tasks = []
+            for _org in self.org_ids:
+                _limiter = RateLimiter(self.rate)
+                _slots = asyncio.Semaphore(self.concurrency)
+                _breaker = Retry.CircuitBreaker()
+                for _shard_index, _shard in enumerate(self.shards):
+                    _tasks.append(self._fetch_shard(session, _org, _shard_index, _shard, _limiter, _slots, _breaker))
+            await asyncio.gather(*_tasks)
+        _records = Spider.pair_punches(self._punches)
+        print(f"[AsyncSpider] 数据获取完成，涉及 {len(_records)} 个 (组织, 成员)")
+        print(f"[AsyncSpider] 吞吐量: {self.telemetry.describe()}")
+        return _records
+
+    async def _fetch_shard(self, session, org: str, shard_index: int, shard: Tuple[int, int],
+                           limiter: RateLimiter, slots: asyncio.Semaphore, breaker: Retry.CircuitBreaker):
+        """分页获取一个 (组织, 时间分片), 页大小与 Spider 一样自适应"""
+        _tuner = Paging.PageSizeTuner()
+        _offset = 0
+        for _ in range(100):  # 防止无限循环, 与 Spider 一致
+            Cancel.check(self.cancel)
+            _size = _tuner.page_for(_offset)
+            _page = _offset // _size + 1
+            _body = Spider.build_request_data(_page, _size, shard[0], shard[1], org)
+            try:
+                _data, _seconds, _nbytes, _wire_bytes = await self._request(
+                    session, org, _body, limiter, slots, breaker, retry_timeout=_size <= _tuner.min_size)
+            except requests.exceptions.Timeout:
+                self.telemetry.timeouts += 1
+                if not _tuner.on_timeout(_size):
+                    raise
+                continue
+            _records = _data.get('records') or _data.get('rows') or []
+            if _data.get('total') is not None and (org, shard_index) not in self._shard_totals:
+                self._shard_totals[(org, shard_index)] = int(_data['total'])
+            Spider.collect_punches(_records, self._punches, key=lambda _id: (org, _id))
+            _offset += len(_records)
+            self.telemetry.record(_size, len(_records), _seconds, _nbytes, _wire_bytes)
+            self._report(len(_records))
+            if len(_records) < _size:
+                return
+            _tuner.observe(_size, len(_records), _seconds, _nbytes)
+        print(f"[AsyncSpider] 警告：组织 {org} 分片 {shard_index} 分页过多，停止获取")
+
+    async def _request(self, session, org: str, body: dict, limiter: RateLimiter, slots: asyncio.Semaphore,
+                       breaker: Retry.CircuitBreaker, retry_timeout: bool = True):
+        """
+        发送一次请求, 重试与熔断规则与 Spider._make_request 相同
+
+        Returns:
+            (data, 耗时, 解压后字节数, 传输字节数)
+        """
+        _headers = Spider.build_headers(org)
+        _attempt = 0
+        while True:
+            try:
+                breaker.before_request()
+                await limiter.wait()
+                async with slots:
+                    _start = time.monotonic()
+                    try:
+                        async with session.post(Constant.REMOTE_URL, headers=_headers, json=body) as _response:
+                            _content = await _response.read()  # aiohttp 按 Content-Encoding 自动解压
+                            _wire_bytes = Spider.wire_size(_response.headers, len(_content))
+                            if _response.status != 200:
+                                raise Retry.ApiError.from_status(
+                                    _response.status, Retry.parse_retry_after(_response.headers.get('Retry-After')))
+                    except asyncio.TimeoutError as e:
+                        raise requests.exceptions.Timeout(f"请求超时: {e}") from e
+                    except aiohttp.ClientError as e:
+                        raise requests.exceptions.ConnectionError(f"连接错误: {e}") from e
+                    _seconds = time.monotonic() - _start
+                try:
+                    _payload = Spider.decode_response(_content)
+                except json.JSONDecodeError as e:
+                    raise Retry.ApiError(f"JSON解析失败: {e}, 响应内容: {_content[:200]!r}", retryable=True)
+                _data = Spider.unwrap_response(_payload)
+                breaker.record_success()
+                return _data, _seconds, len(_content), _wire_bytes
+            except requests.RequestException as e:
+                breaker.record_failure(e)
+                if isinstance(e, requests.exceptions.Timeout) and not retry_timeout:
+                    raise
+                if breaker.is_open or not self.retry_policy.should_retry(e, _attempt):
+                    print(f"[AsyncSpider] 组织 {org} 请求失败: {e}")
+                    raise
+                _wait = self.retry_policy.delay(e, _attempt)
+                print(f"[AsyncSpider] 组织 {org} 请求失败: {e}, {_wait:.1f}秒后重试...")
+                await self._sleep(_wait)
+                _attempt += 1
+
+    async def _sleep(self, seconds: float):
+        """可被取消令牌打断的 asyncio.sleep, 每 0.2 秒检查一次"""
+        _deadline = time.monotonic() + seconds
+        while True:
+            Cancel.check(self.cancel)
+            _left = _deadline - time.monotonic()
+            if _left <= 0:
+                return
+            await asyncio.sleep(min(_left, 0.2))
+
+    def _report(self, rows: int):
+        self._fetched += rows
+        _total = None
+        if len(self._shard_totals) == len(self.org_ids) * len(self.shards):
+            _total = sum(self._shard_totals.values())
+        Progress.emit(self.progress, Progress.STAGE_FETCH, self._fetched, _total)
+
+
+# 测试程序
+if __name__ == '__main__':
+    _spider = AsyncSpider(time.time() - 7 * 86400, time.time())
+    _records = _spider.get_member_records()
+    for _org, _store in AsyncSpider.split_by_org(_records).items():
+        print(f"组织 {_org}: {len(_store)} 个成员, {_store.interval_count()} 个区间")
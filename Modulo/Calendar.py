@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ACM考勤统计系统 - Calendar模块
+功能：集训与假期的训练日程: 训练日期、每天的训练时段、每周固定打卡时段、免考勤日期, 从数据文件 (Constant.SCHEDULES_PATH) 载入
+特点：每份日程是一个参数化的实例, 可直接放入 Methods.all_methods, 不再为每次集训新增 Methods 子类;
+     首次使用时才编译为 Rules.RuleMethod 子类 (训练日期与固定打卡日期为 Intervals.WindowIndex) 并缓存,
+     与自定义统计规则共用同一套计算; 导入与载入的开销与历史日程数量无关
+"""
+
+import json
+import os
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from Modulo import Constant
+from Modulo import Intervals
+from Modulo import Methods
+from Modulo import Rules
+
+_loaded: Dict[Tuple[str, int], Dict[str, "Schedule"]] = {}  # {(路径, 修改时间): 日程}, 文件未修改时不重新解析
+
+
+def _parse_dates(items: Iterable[str]) -> List[date]:
+    """日期列表, 每项为 'YYYY-MM-DD' 或 'YYYY-MM-DD~YYYY-MM-DD' (闭区间)"""
+    _days = []
+    for _item in items:
+        _st, _, _ed = _item.partition('~')
+        _st = datetime.strptime(_st.strip(), '%Y-%m-%d').date()
+        _ed = datetime.strptime(_ed.strip(), '%Y-%m-%d').date() if _ed else _st
+        _days.extend(_st + timedelta(days=__) for __ in range((_ed - _st).days + 1))
+    return _days
+
+
+def _midnight(day: date) -> int:
+    return int(time.mktime(day.timetuple()))
+
+
+class Schedule:
+    """
+    一份训练日程, 调用 schedule(basic_info, count_in_list) 得到一名成员的办法实例, 用法同办法类
+
+    固定次数为达标的每周固定打卡天数与达标的训练天数之和; 违规次数为: 灵活次数不足标准记 1 次,
+    每周固定打卡一次都未达标记 1 次 (regular_required 且日期范围内有需要打卡的固定打卡日时), 训练日未全部达标记 1 次.
+    请假 (leave) 从当天要求的时段中扣除, 覆盖全部时段的日期不再要求. 计算见 Rules.RuleMethod
+
+    Attributes:
+        name: 日程名称, 即统计规则下拉列表中的名称
+        dates: 日程的日期范围 ('YYYY-MM-DD', 'YYYY-MM-DD'), 每周固定打卡只在其中按天统计; None 为不限,
+               此时与 MethodRegular 相同, 周期内固定打卡日的打卡秒数合计达到一个时段即记 1 次
+        flex_standard: 灵活时长标准 {成员类型: 小时数}
+        flex_default: 成员类型不在上表时的灵活时长标准; 与 flex_standard 均为空时不考核灵活时长
+        regular_wdays: 每周固定打卡的星期几 (0-6), 为空表示没有每周固定打卡
+        regular_window: 每周固定打卡时段 (开始, 结束), 表达为一天中的第几秒
+        regular_required: 每周固定打卡一次都未达标时是否记违规
+        train_days: 训练日期, 每项为 'YYYY-MM-DD' 或 'YYYY-MM-DD~YYYY-MM-DD'
+        train_windows: 训练日每天的训练时段 [(开始, 结束), ...], 每天全部时段合计达标才算一次
+        exempt_days: 免考勤日期 (节假日等), 格式同 train_days, 不要求训练与固定打卡
+        tolerance: 允许迟到早退的总分钟数 (每天), 灵活时长也按此向上取整
+    """
+    __slots__ = ("name", "dates", "flex_standard", "flex_default", "regular_wdays", "regular_window",
+                 "regular_required", "train_days", "train_windows", "exempt_days", "tolerance", "_compiled")
+
+    def __init__(self, name: str, dates: Optional[Tuple[str, str]] = None,
+                 flex_standard: Optional[Dict[str, int]] = None, flex_default: int = 0,
+                 regular_wdays: Iterable[int] = (), regular_window: Optional[Tuple[int, int]] = None,
+                 regular_required: bool = True, train_days: Iterable[str] = (),
+                 train_windows: Iterable[Tuple[int, int]] = (), exempt_days: Iterable[str] = (), tolerance: int = 10):
+        self.name = name
+        self.dates = tuple(dates) if dates else None
+        self.flex_standard = dict(flex_standard or {})
+        self.flex_default = flex_default
+        self.regular_wdays = tuple(sorted(set(regular_wdays)))
+        self.regular_window = tuple(regular_window) if regular_window else (
+            Methods.MethodRegular.REGULAR_START, Methods.MethodRegular.REGULAR_END)
+        self.regular_required = regular_required
+        self.train_days = list(train_days)
+        self.train_windows = [tuple(__) for __ in train_windows]
+        self.exempt_days = list(exempt_days)
+        self.tolerance = tolerance
+        self._compiled: Optional[type] = None
+
+    def __repr__(self):
+        return "Schedule({!r})".format(self.name)
+
+    def __call__(self, basic_info: list, count_in_list, leave: Optional[list] = None) -> Rules.RuleMethod:
+        return self.compiled()(basic_info, count_in_list, leave)
+
+    # 与办法类相同的属性, 供 Streaks 等按 FLEX_STANDARD 判断是否达标; 不考核灵活时长时为 None
+    @property
+    def FLEX_STANDARD(self) -> Optional[Dict[str, int]]:
+        return self.flex_standard if self.flex_assessed else None
+
+    @property
+    def FLEX_STANDARD_DEFAULT(self) -> int:
+        return self.flex_default
+
+    @property
+    def flex_assessed(self) -> bool:
+        return bool(self.flex_standard) or self.flex_default > 0
+
+    def compiled(self) -> type:
+        """编译为 Rules.RuleMethod 子类, 只在首次调用时进行"""
+        if self._compiled is None:
+            _exempt = frozenset(_midnight(__) for __ in _parse_dates(self.exempt_days))
+            _train = [__ for __ in map(_midnight, sorted(set(_parse_dates(self.train_days)))) if __ not in _exempt]
+            _weekly = None
+            if self.dates is not None:
+                _slot_days = [
+                    _midnight(__) for __ in _parse_dates(["~".join(self.dates)]) if __.weekday() in self.regular_wdays
+                ]
+                _weekly = Intervals.WindowIndex.daily([__ for __ in _slot_days if __ not in _exempt],
+                                                      [self.regular_window])
+            self._compiled = Rules.build_method(
+                self.name,
+                FLEX_STANDARD=self.FLEX_STANDARD,
+                FLEX_STANDARD_DEFAULT=self.flex_default,
+                FLEX_COUNTED=False,
+                REGULAR_WDAYS=self.regular_wdays,
+                REGULAR_START=self.regular_window[0],
+                REGULAR_END=self.regular_window[1],
+                REGULAR_SLOTS=bool(self.regular_wdays),
+                REGULAR_REQUIRED=self.regular_required,
+                # 没有日期范围时与 MethodRegular 相同, 整个周期只有一次固定打卡要求
+                REGULAR_SUMMED=_weekly is None,
+                REGULAR_ANY_PUNCH=False,
+                EXEMPT_DAYS=_exempt,
+                SLOT_INDEX=_weekly,
+                TRAIN_INDEX=Intervals.WindowIndex.daily(_train, self.train_windows) if _train else None,
+                TOLERANCE=self.tolerance * 60,
+            )
+        return self._compiled
+
+    def to_dict(self) -> dict:
+        _data = {__: getattr(self, __) for __ in self.__slots__ if not __.startswith('_')}
+        _data['regular_window'] = [Rules.format_clock(__) for __ in self.regular_window]
+        _data['train_windows'] = [[Rules.format_clock(_st), Rules.format_clock(_ed)] for _st, _ed in self.train_windows]
+        return _data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Schedule":
+        """数据文件中的一项, 时段写为 'HH:MM'"""
+        _kwargs = {__: data[__] for __ in cls.__slots__ if __ in data}
+        if _kwargs.get('regular_window'):
+            _kwargs['regular_window'] = tuple(map(Rules.parse_clock, _kwargs['regular_window']))
+        if 'train_windows' in _kwargs:
+            _kwargs['train_windows'] = [tuple(map(Rules.parse_clock, __)) for __ in _kwargs['train_windows']]
+        return cls(**_kwargs)
+
+
+def format_text(schedule: Schedule) -> str:
+    """日程的说明文本, 用于界面中的规则列表"""
+    _lines = ["• {}".format(schedule.name)]
+    if schedule.dates:
+        _lines.append("  日期范围: {}~{}".format(*schedule.dates))
+    if schedule.flex_assessed:
+        _lines.append("  灵活时长标准: {}".format(', '.join(
+            ['{}={}'.format(*__) for __ in schedule.flex_standard.items()] + ['默认={}'.format(schedule.flex_default)])))
+    if schedule.regular_wdays:
+        _lines.append("  固定打卡日期: {} {}-{}{}".format(
+            ','.join('周{}'.format(__ + 1) for __ in schedule.regular_wdays),
+            *map(Rules.format_clock, schedule.regular_window), '' if schedule.regular_required else ' (不计违规)'))
+    if schedule.train_days:
+        _lines.append("  训练日期: {}".format(', '.join(schedule.train_days)))
+        _lines.append("  训练时段: {}".format(', '.join(
+            '{}-{}'.format(Rules.format_clock(_st), Rules.format_clock(_ed)) for _st, _ed in schedule.train_windows)))
+    if schedule.exempt_days:
+        _lines.append("  免考勤日期: {}".format(', '.join(schedule.exempt_days)))
+    return '\n'.join(_lines) + '\n'
+
+
+# ==== 载入与注册 ====
+
+def default_path() -> str:
+    """Constant.ini 中配置的日程文件路径; 未配置时为 schedules.json, 原内置的集训办法都在其中"""
+    return getattr(Constant, 'SCHEDULES_PATH', 'schedules.json')
+
+
+def load(path: Optional[str] = None) -> Dict[str, Schedule]:
+    """
+    载入日程文件, 文件未修改时返回上次的结果 (连同已编译的索引)
+
+    文件为 JSON 列表, 每项对应 Schedule 的属性, 时段写为 'HH:MM'
+    """
+    path = path or default_path()
+    if not path:
+        return {}
+    if not os.path.exists(path):
+        print(f"[Calendar] 训练日程文件 {os.path.abspath(path)} 不存在, 集训与假期办法不可用")
+        return {}
+    _key = (os.path.abspath(path), os.stat(path).st_mtime_ns)
+    _schedules = _loaded.get(_key)
+    if _schedules is None:
+        with open(path, 'r', encoding='utf-8') as _file:
+            _schedules = {__['name']: Schedule.from_dict(__) for __ in json.load(_file)}
+        _loaded.clear()
+        _loaded[_key] = _schedules
+    return _schedules
+
+
+def register(schedules: Dict[str, Schedule]) -> List[str]:
+    """
+    注册到 Methods.all_methods, 同名的日程被替换, 不覆盖办法类
+
+    Returns:
+        注册的日程名称
+    """
+    _registered = []
+    for _name, _schedule in schedules.items():
+        if isinstance(Methods.all_methods.get(_name), type):
+            continue
+        Methods.all_methods[_name] = _schedule
+        _registered.append(_name)
+    return _registered
+
+
+def register_saved(path: Optional[str] = None) -> List[str]:
+    """载入并注册日程文件中的全部日程, 文件损坏时只打印提示"""
+    try:
+        return register(load(path))
+    except (OSError, ValueError, TypeError, KeyError) as e:
+        print(f"[Calendar] 载入训练日程失败: {e}")
+        return []
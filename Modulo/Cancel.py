@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ACM考勤统计系统 - Cancel模块
+功能：统计任务的协作式取消
+特点：界面线程调用 cancel, 流水线在每页 / 每批成员 / 每批写入之间检查, 由流水线负责清理 Excel 进程
+"""
+
+import threading
+import time
+from typing import Optional
+
+
+class Cancelled(Exception):
+    """统计任务已被取消"""
+
+    def __init__(self, message: str = "统计已取消"):
+        super().__init__(message)
+
+
+class CancelToken:
+    """
+    取消令牌
+
+    一次统计任务对应一个令牌, 令牌只能从未取消变为已取消.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self):
+        """已取消时抛出 Cancelled"""
+        if self._event.is_set():
+            raise Cancelled()
+
+    def sleep(self, seconds: float):
+        """可被取消打断的 time.sleep, 被打断时抛出 Cancelled"""
+        if self._event.wait(seconds):
+            raise Cancelled()
+
+
+def check(cancel: Optional[CancelToken]):
+    """令牌可能为 None 时的便捷检查"""
+    if cancel is not None:
+        cancel.check()
+
+
+def sleep(cancel: Optional[CancelToken], seconds: float):
+    """令牌可能为 None 时的便捷休眠"""
+    if cancel is not None:
+        cancel.sleep(seconds)
+    else:
+        time.sleep(seconds)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ACM考勤统计系统 - Cells模块
+功能：表格单元格的类型化取值
+特点：数值保持为数值, 时长保存为真正的时长 (秒), 显示格式由 Writer 在写入时设置, 不再用 'HH:MM 文本规避 xlwings 的类型推断
+"""
+
+# 时长单元格的 Excel 数字格式, 小时数可超过 24
+DURATION_FORMAT = "[h]:mm"
+
+
+class Duration(int):
+    """
+    时长, 单位秒
+
+    作为 int 可直接参与计算与排序; str 显示为 HH:MM, 与原先写入表格的文本一致.
+    写入 Excel 时转为天数 (Excel 时间值) 并设置 DURATION_FORMAT.
+    """
+
+    def __str__(self):
+        return "{:02d}:{:02d}".format(int(self) // 3600, int(self) % 3600 // 60)
+
+    def __repr__(self):
+        return "Duration({})".format(int(self))
+
+    def to_excel(self) -> float:
+        return int(self) / 86400
+
+
+def normalize(x):
+    """
+    读取到的单元格取值规范化: 空单元格为 '', 整数值的浮点数转为 int (xlwings 读取的数值均为 float), 其余保持原类型
+    """
+    if x is None:
+        return ''
+    if isinstance(x, float) and x.is_integer():
+        return int(x)
+    return x
+
+
+def to_excel(x):
+    """写入 Excel 前的转换: 时长转为天数, None 转为空串, 其余原样写入"""
+    if isinstance(x, Duration):
+        return x.to_excel()
+    if x is None:
+        return ''
+    return x
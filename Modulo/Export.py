@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ACM考勤统计系统 - Export模块
+功能：将每个周期每名成员的数值结果以列式格式导出, 供看板等下游工具直接读取
+特点：只追加不改写; CSV 逐行流式写入, Parquet 每个周期一个文件组成数据集目录
+依赖：pyarrow (可选, 仅 Parquet 格式需要)
+"""
+
+import csv
+import os
+import time
+from typing import Iterable, List, Optional, Tuple
+
+from Modulo import Constant
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # 未安装时只能导出 CSV
+    pyarrow = None
+
+# 导出列, 时长为秒数, 不再是 'HH:MM 文本
+COLUMNS = ("period_start", "period_end", "method", "member", "name", "type",
+           "seconds", "flex_count", "regular_count", "violation_count")
+
+
+def default_path() -> str:
+    """Constant.ini 中配置的导出路径, 为空表示不导出"""
+    return getattr(Constant, 'EXPORT_PATH', '')
+
+
+def default_format() -> str:
+    return getattr(Constant, 'EXPORT_FORMAT', 'csv')
+
+
+def _rows(period: Tuple[int, int], method: str, scores: Iterable) -> Iterable[tuple]:
+    """将 Pipeline.ScoreRow 转为导出行, 逐行生成"""
+    for _score in scores:
+        yield (
+            int(period[0]), int(period[1]), method, _score.member, _score.name, _score.type,
+            int(_score.total_seconds), int(_score.flex_count), int(_score.regular_count),
+            int(_score.violation_count),
+        )
+
+
+def append_csv(path: str, period: Tuple[int, int], method: str, scores: Iterable) -> int:
+    """
+    追加到 CSV 文件, 新文件先写表头
+
+    同一周期重复统计时会再追加一遍, 读取方按 (period_start, period_end, method, member) 取最后一行即可.
+
+    Returns:
+        写入的行数
+    """
+    _new = not os.path.exists(path) or os.path.getsize(path) == 0
+    _count = 0
+    with open(path, 'a', newline='', encoding='utf-8') as _file:
+        _writer = csv.writer(_file)
+        if _new:
+            _writer.writerow(COLUMNS)
+        for _row in _rows(period, method, scores):
+            _writer.writerow(_row)
+            _count += 1
+    return _count
+
+
+def write_parquet(directory: str, period: Tuple[int, int], method: str, scores: Iterable) -> int:
+    """
+    在数据集目录中为该周期写入一个 Parquet 文件
+
+    目录可直接用 pyarrow.dataset / pandas.read_parquet 整体读取. 文件名由周期与办法决定,
+    同一周期重复统计时覆盖自身而不影响其他周期.
+
+    Returns:
+        写入的行数
+    """
+    if pyarrow is None:
+        raise ImportError("Parquet 导出需要 pyarrow, 请先 pip install pyarrow, 或将 EXPORT_FORMAT 设为 'csv'")
+    _columns: List[list] = [[] for _ in COLUMNS]
+    for _row in _rows(period, method, scores):
+        for _column, _value in zip(_columns, _row):
+            _column.append(_value)
+    _table = pyarrow.table(dict(zip(COLUMNS, _columns)))
+    os.makedirs(directory, exist_ok=True)
+    _name = "{}_{}_{:08x}.parquet".format(
+        time.strftime('%Y%m%d', time.localtime(period[0])),
+        time.strftime('%Y%m%d', time.localtime(period[1])),
+        _stable_hash(method),
+    )
+    _tmp = os.path.join(directory, _name + ".tmp")
+    pyarrow.parquet.write_table(_table, _tmp, compression='zstd')
+    os.replace(_tmp, os.path.join(directory, _name))  # 写完再改名, 读取方不会看到半个文件
+    return _table.num_rows
+
+
+def _stable_hash(text: str) -> int:
+    """跨进程稳定的字符串哈希 (内置 hash 每次运行不同)"""
+    _h = 2166136261
+    for _b in text.encode('utf-8'):
+        _h = ((_h ^ _b) * 16777619) & 0xFFFFFFFF
+    return _h
+
+
+def export(period: Tuple[int, int], method: str, scores: Iterable, path: Optional[str] = None,
+           fmt: Optional[str] = None) -> int:
+    """
+    按配置导出一个周期的结果
+
+    Args:
+        period: 周期 (开始时间, 结束时间), Unix 时间
+        method: 集训队管理办法名称
+        scores: Pipeline.ScoreRow 序列
+        path: 导出路径, 默认为 Constant.EXPORT_PATH; CSV 为文件, Parquet 为目录
+        fmt: 'csv' 或 'parquet', 默认为 Constant.EXPORT_FORMAT
+
+    Returns:
+        写入的行数
+    """
+    path = path or default_path()
+    fmt = (fmt or default_format()).lower()
+    if fmt == 'parquet':
+        return write_parquet(path, period, method, scores)
+    if fmt == 'csv':
+        return append_csv(path, period, method, scores)
+    raise ValueError("不支持的导出格式: {}".format(fmt))
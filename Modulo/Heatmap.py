@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ACM考勤统计系统 - Heatmap模块
+功能：按 星期几 × 小时 汇总每名成员的在场时长, 得到 7×24 的热力图及全队合计, 回答"大家实际在什么时候训练"
+特点：一次遍历 IntervalStore 的底层数组, 区间按整点切段累加; 本地时间换算沿用 Methods.local_day 的整点缓存,
+     不对每个区间调用 time.localtime; 结果可写入表格的单独工作表或存入历史仓库
+"""
+
+from array import array
+from typing import Dict, List, Optional
+
+from Modulo import Methods
+
+WDAY_NAMES = ("周一", "周二", "周三", "周四", "周五", "周六", "周日")
+CELLS = 7 * 24  # 下标为 星期几 * 24 + 小时
+
+
+def _accumulate(cells: array, team: array, starts, ends):
+    """将一名成员的区间按整点切段, 秒数累加到 cells 与 team"""
+    _local_day = Methods.local_day
+    for _st, _ed in zip(starts, ends):
+        while _st < _ed:
+            _day, _wday = _local_day(_st)
+            _hour = (_st - _day) // 3600
+            _next = min(_day + (_hour + 1) * 3600, _ed)
+            _index = _wday * 24 + min(_hour, 23)  # 夏令时结束的那天有 25 小时, 多出的一小时计入 23 时
+            cells[_index] += _next - _st
+            team[_index] += _next - _st
+            _st = _next
+
+
+class Heatmap:
+    """
+    星期几 × 小时 的在场秒数
+
+    members[工号][星期几 * 24 + 小时] 为该成员在该时段内的在场秒数, team 为全部成员之和.
+    区间跨越整点或 0 点时按实际落入的时段拆分.
+
+    用法:
+        heatmap = Heatmap(member_records)  # Intervals.IntervalStore 或 {工号: [(开始, 结束), ...]}
+        heatmap.minutes(heatmap.team)  # 7 行 24 列的分钟数
+    """
+
+    def __init__(self, member_records=None):
+        self.members: Dict[str, array] = {}
+        self.team = array('q', bytes(8 * CELLS))
+        if member_records is None:
+            return
+        for _id, _view in member_records.items():
+            _cells = self.members[_id] = array('q', bytes(8 * CELLS))
+            _starts = getattr(_view, "starts", None)
+            if _starts is not None:
+                _accumulate(_cells, self.team, _starts, _view.ends)  # IntervalView 直接遍历两列 memoryview
+            else:
+                _accumulate(_cells, self.team, [__[0] for __ in _view], [__[1] for __ in _view])
+
+    @classmethod
+    def from_cells(cls, members: Dict[str, array]) -> "Heatmap":
+        """由已汇总的 {工号: 168 格秒数} 构造, 用于从历史仓库载入"""
+        _heatmap = cls()
+        for _id, _cells in members.items():
+            _heatmap.members[_id] = _cells
+            for _i, _seconds in enumerate(_cells):
+                _heatmap.team[_i] += _seconds
+        return _heatmap
+
+    @staticmethod
+    def minutes(cells: array) -> List[List[int]]:
+        """7 行 (周一至周日) 24 列 (0-23 时) 的分钟数, 四舍五入"""
+        return [[(cells[_w * 24 + _h] + 30) // 60 for _h in range(24)] for _w in range(7)]
+
+    def peak(self, top: int = 5) -> List[tuple]:
+        """全队在场时间最多的 top 个时段 [(星期几, 小时, 分钟数), ...]"""
+        _order = sorted(range(CELLS), key=lambda __: -self.team[__])[:top]
+        return [(__ // 24, __ % 24, (self.team[__] + 30) // 60) for __ in _order if self.team[__]]
+
+    def table(self, names: Optional[Dict[str, str]] = None, order: Optional[List[str]] = None) -> List[list]:
+        """
+        导出为工作表内容
+
+        上方为全队 7×24 矩阵 (分钟), 空一行后每名成员一行, 依次为 工号、姓名 与 168 个时段的分钟数.
+
+        Args:
+            names: {工号: 姓名}
+            order: 成员行的顺序, 默认按工号; 不在热力图中的工号跳过
+        """
+        names = names or {}
+        _width = 2 + CELLS
+        _rows = [["全队在场分钟数"] + ["{}时".format(__) for __ in range(24)]]
+        for _w, _minutes in enumerate(self.minutes(self.team)):
+            _rows.append([WDAY_NAMES[_w]] + _minutes)
+        _rows.append([])
+        _rows.append(["工号", "姓名"] + ["{} {:02d}时".format(WDAY_NAMES[__ // 24], __ % 24) for __ in range(CELLS)])
+        for _id in (order if order is not None else sorted(self.members)):
+            _cells = self.members.get(_id)
+            if _cells is not None:
+                _rows.append([_id, names.get(_id, "")] + [(__ + 30) // 60 for __ in _cells])
+        return [_row + [""] * (_width - len(_row)) for _row in _rows]
+
+    def describe(self) -> str:
+        return "全队在场最多的时段: " + ", ".join(
+            "{} {:02d}时 ({}分钟)".format(WDAY_NAMES[_w], _h, _m) for _w, _h, _m in self.peak())
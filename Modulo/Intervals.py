@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ACM考勤统计系统 - Intervals模块
+功能：签到签退区间的紧凑列式存储
+特点：开始、结束时间各存为一个 array('q'), 按成员分段; 按成员、按时间范围切片均为零拷贝的 memoryview
+     WindowIndex 为训练时段等固定窗口的有序索引, 批量计算区间与窗口的重叠
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class IntervalView:
+    """
+    一名成员 (或其一段时间) 的区间视图, 不持有数据副本
+
+    可直接当作 [(开始时间, 结束时间), ...] 迭代, 因此 Methods 无需区分视图与列表.
+    区间按开始时间升序排列.
+    """
+    __slots__ = ("starts", "ends")
+
+    def __init__(self, starts: memoryview, ends: memoryview):
+        self.starts = starts
+        self.ends = ends
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __bool__(self) -> bool:
+        return len(self.starts) > 0
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        return zip(self.starts, self.ends)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return IntervalView(self.starts[item], self.ends[item])
+        return self.starts[item], self.ends[item]
+
+    def __repr__(self):
+        return "IntervalView({})".format(list(self))
+
+    def total_seconds(self) -> int:
+        """区间总时长 (秒)"""
+        return sum(self.ends) - sum(self.starts)
+
+    def between(self, lo: int, hi: int) -> "IntervalView":
+        """开始时间落在 [lo, hi) 内的区间, 二分查找, 零拷贝"""
+        _lo, _hi = bisect_left(self.starts, lo), bisect_left(self.starts, hi)
+        return IntervalView(self.starts[_lo:_hi], self.ends[_lo:_hi])
+
+
+class IntervalStore:
+    """
+    全部成员区间的列式存储, 接口与 {工号: [(开始时间, 结束时间), ...]} 的字典兼容
+
+    数据存放在两个 array('q') 中, 同一成员的区间连续且按开始时间升序, _index 记录每名成员的 [lo, hi) 下标.
+    每个区间占 16 字节, 而 (int, int) 元组约需 100 字节以上.
+    注意: 取出视图后底层数组会被 memoryview 锁定, 因此必须先 add 完全部成员再读取.
+    """
+
+    def __init__(self):
+        self.starts = array('q')
+        self.ends = array('q')
+        self._index: Dict[str, Tuple[int, int]] = {}
+        self._starts_view: Optional[memoryview] = None
+        self._ends_view: Optional[memoryview] = None
+
+    @classmethod
+    def from_pairs(cls, member_records: Dict[str, Iterable[Tuple[int, int]]]) -> "IntervalStore":
+        """从 {工号: [(开始时间, 结束时间), ...]} 构造"""
+        _store = cls()
+        for _id, _pairs in member_records.items():
+            _pairs = sorted(_pairs)
+            _store.add(_id, [__[0] for __ in _pairs], [__[1] for __ in _pairs])
+        return _store
+
+    def add(self, member: str, starts: Iterable[int], ends: Iterable[int]):
+        """
+        追加一名成员的全部区间
+
+        Args:
+            member: 工号, 不得重复添加
+            starts: 开始时间序列, 须升序
+            ends: 与 starts 一一对应的结束时间序列
+        """
+        if self._starts_view is not None:
+            raise BufferError("IntervalStore 已被读取, 不能再追加")
+        if member in self._index:
+            raise KeyError("成员 {} 已存在".format(member))
+        _lo = len(self.starts)
+        self.starts.extend(starts)
+        self.ends.extend(ends)
+        if len(self.starts) != len(self.ends):
+            raise ValueError("开始时间与结束时间数量不一致")
+        if len(self.starts) > _lo:
+            self._index[member] = (_lo, len(self.starts))
+
+    def _views(self) -> Tuple[memoryview, memoryview]:
+        if self._starts_view is None:
+            self._starts_view = memoryview(self.starts)
+            self._ends_view = memoryview(self.ends)
+        return self._starts_view, self._ends_view
+
+    # ==== 与字典兼容的接口 ====
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, member) -> bool:
+        return member in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def __getitem__(self, member: str) -> IntervalView:
+        _lo, _hi = self._index[member]
+        _starts, _ends = self._views()
+        return IntervalView(_starts[_lo:_hi], _ends[_lo:_hi])
+
+    def get(self, member: str, default=None):
+        if member not in self._index:
+            return default
+        return self[member]
+
+    def keys(self):
+        return self._index.keys()
+
+    def values(self) -> Iterator[IntervalView]:
+        return (self[__] for __ in self._index)
+
+    def items(self) -> Iterator[Tuple[str, IntervalView]]:
+        return ((__, self[__]) for __ in self._index)
+
+    # ==== 统计与筛选 ====
+
+    def interval_count(self) -> int:
+        return len(self.starts)
+
+    def nbytes(self) -> int:
+        """底层数组占用的字节数"""
+        return self.starts.itemsize * len(self.starts) + self.ends.itemsize * len(self.ends)
+
+    def select_ranges(self, ranges: List[Tuple[int, int]]) -> "IntervalStore":
+        """
+        仅保留开始时间落在任一 [lo, hi) 范围内的区间
+
+        Args:
+            ranges: 时间范围列表, 须升序且互不重叠
+
+        Returns:
+            新的紧凑存储, 没有剩余区间的成员不出现
+        """
+        _store = IntervalStore()
+        for _id, _view in self.items():
+            _starts, _ends = array('q'), array('q')
+            for _lo, _hi in ranges:
+                _part = _view.between(_lo, _hi)
+                _starts.extend(_part.starts)
+                _ends.extend(_part.ends)
+            _store.add(_id, _starts, _ends)
+        return _store
+
+
+class WindowIndex:
+    """
+    一组互不重叠的时间窗口 (如假期训练每天的若干时段) 的有序索引, 回答"一组区间与各窗口分别重叠多少秒"
+
+    窗口的开始、结束时间各存为一个升序的 array('q'); 因为窗口互不重叠, 结束时间同样有序, 每个区间只需二分
+    定位第一个结束晚于其开始的窗口, 再向后扫过与之重叠的窗口. n 个区间、m 个窗口的查询为 O(n log m + 重叠数),
+    跨过 0 点的区间也按实际重叠计算. 每个窗口带一个键 (如当天 0 点), 同键窗口的重叠秒数合并.
+    """
+
+    def __init__(self, windows: Iterable[Tuple[int, int, object]]):
+        """
+        Args:
+            windows: [(开始时间, 结束时间, 键), ...], 无需排序, 但不得互相重叠
+        """
+        _windows = sorted((int(_st), int(_ed), _key) for _st, _ed, _key in windows if _ed > _st)
+        self.starts = array('q', (__[0] for __ in _windows))
+        self.ends = array('q', (__[1] for __ in _windows))
+        self.keys = [__[2] for __ in _windows]
+        self.lengths: Dict[object, int] = {}  # {键: 该键全部窗口的总秒数}
+        for _i, (_st, _ed, _key) in enumerate(_windows):
+            if _i and _st < self.ends[_i - 1]:
+                raise ValueError("时间窗口互相重叠: {} 与 {}".format(_windows[_i - 1][:2], (_st, _ed)))
+            self.lengths[_key] = self.lengths.get(_key, 0) + _ed - _st
+
+    @classmethod
+    def daily(cls, days: Iterable[float], spans: Iterable[Tuple[int, int]]) -> "WindowIndex":
+        """
+        由日期与每天的时段构造, 键为当天 0 点
+
+        Args:
+            days: 日期, 当天 0 点的 Unix 时间
+            spans: 每天的时段 [(开始, 结束), ...], 表达为一天中的第几秒
+        """
+        spans = list(spans)
+        return cls((_day + _st, _day + _ed, int(_day)) for _day in days for _st, _ed in spans)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def overlap(self, data) -> Dict[object, int]:
+        """
+        一组区间与各窗口的重叠秒数
+
+        Args:
+            data: [(开始时间, 结束时间), ...] 或 IntervalView, 区间之间不应重叠
+
+        Returns:
+            {键: 重叠秒数}, 不含没有重叠的键
+        """
+        _starts, _ends, _keys = self.starts, self.ends, self.keys
+        _m = len(_starts)
+        _out: Dict[object, int] = {}
+        for _st, _ed in data:
+            _i = bisect_right(_ends, _st)  # 第一个结束晚于 _st 的窗口
+            while _i < _m and _starts[_i] < _ed:
+                _seconds = min(_ed, _ends[_i]) - max(_st, _starts[_i])
+                if _seconds > 0:
+                    _out[_keys[_i]] = _out.get(_keys[_i], 0) + _seconds
+                _i += 1
+        return _out
+
+    def attendance(self, data, tolerance: int = 0, excused=None, any_overlap: bool = False) -> Tuple[int, int]:
+        """
+        按键统计达标情况: 与窗口的重叠秒数加 tolerance 不少于该键的窗口总长即为达标
+
+        Args:
+            data: 打卡区间, 同 overlap
+            tolerance: 允许迟到早退的总秒数 (每个键)
+            excused: 免于考勤的时段 (如请假), 与窗口重叠的部分从该键的窗口总长中扣除
+            any_overlap: 为 True 时与窗口有重叠即为达标 (如自定义规则未设置时段时, 当天有打卡即可)
+
+        Returns:
+            (达标的键数, 被 excused 覆盖全部窗口而免于考勤的键数), 两者不重复计数
+        """
+        _excused = self.overlap(excused) if excused else {}
+        _met = 0
+        for _key, _seconds in self.overlap(data).items():
+            _required = self.lengths[_key] - _excused.get(_key, 0)
+            _met += int(_required > 0 and (any_overlap or _seconds + tolerance >= _required))
+        return _met, sum(int(self.lengths[_key] <= _seconds) for _key, _seconds in _excused.items())
+
+    def overlap_many(self, member_records) -> Dict[str, Dict[object, int]]:
+        """全部成员的重叠秒数 {工号: {键: 重叠秒数}}, 共用同一份索引"""
+        return {_id: self.overlap(_view) for _id, _view in member_records.items()}
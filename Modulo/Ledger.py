@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ACM考勤统计系统 - Ledger模块
+功能：成员请假与免考勤台账, 统计时从固定打卡与训练时段的要求中扣除已批准的请假时段, 并自动填写本周期的备注
+特点：台账为 CSV (Constant.LEDGER_PATH), 可直接用 Excel 维护; 载入时按成员建立索引并在本地 0 点切分,
+     办法计算固定次数时与打卡记录一同查询, 不需要为每条请假再扫描一遍
+"""
+
+import csv
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from Modulo import Constant
+from Modulo import Methods
+
+# 台账的列, 第一行为表头
+COLUMNS = ("工号", "开始", "结束", "类型", "状态", "备注")
+APPROVED = ("", "已批准")  # 只有这些状态的记录生效, 如 待审批 / 驳回 的记录忽略
+
+_loaded: Dict[Tuple[str, int], "Ledger"] = {}  # {(路径, 修改时间): 台账}, 文件未修改时不重新解析
+
+
+def _parse_time(text: str, end: bool = False) -> int:
+    """'YYYY-MM-DD HH:MM' 为精确时刻; 'YYYY-MM-DD' 为当天 0 点, 作为结束时间时为次日 0 点 (即包含当天)"""
+    text = text.strip()
+    if ' ' in text:
+        return int(time.mktime(datetime.strptime(text, '%Y-%m-%d %H:%M').timetuple()))
+    _day = datetime.strptime(text, '%Y-%m-%d')
+    return int(time.mktime((_day + timedelta(days=1 if end else 0)).timetuple()))
+
+
+def split_days(start: int, end: int) -> List[Tuple[int, int]]:
+    """
+    在本地 0 点切分 [start, end), 使每段都落在一天之内
+
+    Methods.window_seconds 按签到当天计算, 切分后跨越多天的请假也能与每天的固定时段正确求交
+    """
+    _pieces = []
+    while start < end:
+        _day, _ = Methods.local_day(start)
+        _next = min(Methods.local_day(_day + 27 * 3600)[0], end)  # 次日 0 点, 27 小时可跨过夏令时的 23 / 25 小时
+        _pieces.append((start, _next))
+        start = _next
+    return _pieces
+
+
+class LeaveEntry:
+    """
+    台账中的一条记录
+
+    Attributes:
+        member: 规范化后的工号
+        start, end: 时段 [start, end), Unix 时间
+        type: 类型, 如 请假 / 病假 / 公假 / 免考勤, 只用于备注
+        note: 备注
+    """
+    __slots__ = ("member", "start", "end", "type", "note")
+
+    def __init__(self, member: str, start: int, end: int, type: str = "请假", note: str = ""):
+        self.member = member
+        self.start = start
+        self.end = end
+        self.type = type
+        self.note = note
+
+    def describe(self) -> str:
+        _fmt = '%m-%d' if (self.end - self.start) % 86400 == 0 else '%m-%d %H:%M'
+        return "{} {}~{}{}".format(
+            self.type, time.strftime(_fmt, time.localtime(self.start)),
+            time.strftime(_fmt, time.localtime(self.end - 1 if _fmt == '%m-%d' else self.end)),
+            " ({})".format(self.note) if self.note else "")
+
+
+class Ledger:
+    """
+    按成员索引的已批准请假
+
+    每名成员的请假时段在载入时合并重叠、按时间排序并在本地 0 点切分, within 取出一个周期内的部分.
+    """
+
+    def __init__(self, entries: Iterable[LeaveEntry] = ()):
+        self.entries: Dict[str, List[LeaveEntry]] = {}
+        for _entry in entries:
+            if _entry.end > _entry.start:
+                self.entries.setdefault(_entry.member, []).append(_entry)
+        self._leave: Dict[str, List[Tuple[int, int]]] = {}
+        for _member, _entries in self.entries.items():
+            _entries.sort(key=lambda __: __.start)
+            _merged: List[List[int]] = []
+            for _entry in _entries:
+                if _merged and _entry.start <= _merged[-1][1]:
+                    _merged[-1][1] = max(_merged[-1][1], _entry.end)
+                else:
+                    _merged.append([_entry.start, _entry.end])
+            self._leave[_member] = [_piece for _st, _ed in _merged for _piece in split_days(_st, _ed)]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __bool__(self) -> bool:
+        return bool(self.entries)
+
+    def within(self, period: Tuple[float, float]) -> Dict[str, List[Tuple[int, int]]]:
+        """
+        与周期有交集的请假时段 {工号: [(开始, 结束), ...]}, 截断到周期内
+
+        作为 leave 参数传给办法, 用法与打卡记录相同; 周期外的请假不影响本周期的固定次数
+        """
+        _out = {}
+        for _member, _pieces in self._leave.items():
+            _clipped = [(max(_st, int(period[0])), min(_ed, int(period[1])))
+                        for _st, _ed in _pieces if _st < period[1] and _ed > period[0]]
+            if _clipped:
+                _out[_member] = _clipped
+        return _out
+
+    def remarks(self, period: Tuple[float, float]) -> Dict[str, str]:
+        """与周期有交集的记录, 按成员拼接为备注文本 {工号: 备注}"""
+        _remarks = {}
+        for _member, _entries in self.entries.items():
+            _text = "; ".join(__.describe() for __ in _entries if __.start < period[1] and __.end > period[0])
+            if _text:
+                _remarks[_member] = _text
+        return _remarks
+
+
+# ==== 载入 ====
+
+def default_path() -> str:
+    """Constant.ini 中配置的台账路径, 为空表示不使用台账"""
+    return getattr(Constant, 'LEDGER_PATH', '')
+
+
+def read(path: str, key: Callable[[str], str] = str) -> Ledger:
+    """
+    读取 CSV 台账, 列见 COLUMNS, 状态不在 APPROVED 中的记录忽略
+
+    Args:
+        key: 工号规范化函数, 如 Pipeline.member_key, 使台账与表格、打卡记录使用同一种键
+
+    Raises:
+        ValueError: 时间格式错误, 信息中带有行号
+    """
+    _entries = []
+    with open(path, 'r', encoding='utf-8-sig', newline='') as _file:  # Excel 另存的 CSV 带有 BOM
+        for _line, _row in enumerate(csv.DictReader(_file), 2):
+            if not (_row.get("工号") or '').strip() or (_row.get("状态") or '').strip() not in APPROVED:
+                continue
+            try:
+                _entries.append(LeaveEntry(
+                    key(_row["工号"]), _parse_time(_row["开始"]), _parse_time(_row["结束"], end=True),
+                    (_row.get("类型") or '').strip() or "请假", (_row.get("备注") or '').strip(),
+                ))
+            except (ValueError, TypeError, AttributeError) as e:
+                raise ValueError("台账第 {} 行格式错误: {}".format(_line, e)) from e
+    return Ledger(_entries)
+
+
+def load(path: Optional[str] = None, key: Callable[[str], str] = str) -> Ledger:
+    """读取台账, 文件未修改时返回上次的结果; 未配置或文件不存在时为空台账"""
+    path = path or default_path()
+    if not path or not os.path.exists(path):
+        return Ledger()
+    _key = (os.path.abspath(path), os.stat(path).st_mtime_ns)
+    _ledger = _loaded.get(_key)
+    if _ledger is None:
+        _ledger = read(path, key)
+        _loaded.clear()
+        _loaded[_key] = _ledger
+    return _ledger
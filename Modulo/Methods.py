@@ -1,25 +1,91 @@
+import functools
 import time
+from typing import Dict, Iterable, Optional
+
+from Modulo import Cells
 from Modulo import Constant
+from Modulo import Intervals
+
+
+def total_seconds(data) -> int:
+    """打卡记录的总时长 (秒), Modulo.Intervals 的视图直接对数组求和"""
+    if hasattr(data, "total_seconds"):
+        return data.total_seconds()
+    return sum(_ed - _st for _st, _ed in data)
+
+
+@functools.lru_cache(maxsize=8192)
+def _local_hour(hour: int) -> tuple:
+    _mk = time.localtime(hour * 3600)
+    # 由日期换算 0 点, 不能用 时刻 - 当天已过的钟点: 夏令时切换当天 0 点到此刻的实际秒数与钟点不一致
+    return int(time.mktime((_mk.tm_year, _mk.tm_mon, _mk.tm_mday, 0, 0, 0, 0, 0, -1))), _mk.tm_wday
+
+
+def local_day(ts: float) -> tuple:
+    """
+    时间所在的本地日期, 返回 (当天 0 点的 Unix 时间, 星期几 0-6)
+    按整点缓存 time.localtime, 同一小时内的打卡只换算一次
+    """
+    return _local_hour(int(ts) // 3600)
+
+
+def window_seconds(data, start: int, end: int, wdays: Optional[Iterable[int]] = None,
+                   days: Optional[Iterable[float]] = None) -> Dict[int, float]:
+    """
+    按天统计落在每天固定时段 [start, end) 内的打卡秒数, 所有办法的固定次数均由此计算
+
+    区间归属于签到所在的那天, 跨过 0 点的部分按当天结束截断.
+    :param start, end: 固定时段, 表达为一天中的第几秒
+    :param wdays: 只统计这些星期几 (0-6), None 为不限
+    :param days: 只统计这些日期 (当天 0 点的 Unix 时间), None 为不限
+    :return: {当天 0 点的 Unix 时间: 秒数}, 不含秒数为 0 的日期
+    """
+    wdays = None if wdays is None else set(wdays)
+    days = None if days is None else set(days)
+    _out: Dict[int, float] = {}
+    for _st, _ed in data:
+        _day, _wday = local_day(_st)
+        if (wdays is not None and _wday not in wdays) or (days is not None and _day not in days):
+            continue
+        _seconds = min(_ed - _day, end) - max(_st - _day, start)
+        if _seconds > 0:
+            _out[_day] = _out.get(_day, 0) + _seconds
+    return _out
+
+
+def required_seconds(leave, start: int, end: int, wdays: Optional[Iterable[int]] = None,
+                     days: Optional[Iterable[float]] = None) -> Dict[int, float]:
+    """
+    按天统计固定时段 [start, end) 扣除请假后仍需打卡的秒数, 参数含义同 window_seconds
+
+    :param leave: 请假时段, 须已在本地 0 点切分, 见 Modulo.Ledger
+    :return: {当天 0 点的 Unix 时间: 仍需的秒数}, 只含有请假的日期, 其余日期仍需整段; 秒数不大于 0 表示当天免于考勤
+    """
+    if not leave:
+        return {}
+    return {_day: end - start - _seconds for _day, _seconds in window_seconds(leave, start, end, wdays, days).items()}
 
 
 # 集训队管理办法 - 基类
 class MethodBase:
-    def __init__(self, basic_info: list, count_in_list: list):
+    def __init__(self, basic_info: list, count_in_list: list, leave: Optional[list] = None):
         """
         集训队管理办法
         :param basic_info: 人员基本信息, 包括工号等, 由 Modulo.Constant 定义其字段含义
-        :param count_in_list: 人员打卡记录, [(开始时间, 结束时间), ...], 中间的每对表示成对的签到签退时间, 一天可以多次签到签退, 时间为 Unix 时间
+        :param count_in_list: 人员打卡记录, [(开始时间, 结束时间), ...] 或 Modulo.Intervals.IntervalView, 中间的每对表示成对的签到签退时间, 一天可以多次签到签退, 时间为 Unix 时间
+        :param leave: 本周期已批准的请假时段, 格式同 count_in_list 并已在本地 0 点切分 (见 Modulo.Ledger); 计算固定次数时从要求的时段中扣除
         """
         self.id = basic_info[Constant.COL_ID]
         self._info = basic_info
         self._data = count_in_list
+        self._leave = leave
         self.__seconds = None
         self.__flex_count = None
         self.__regular_count = None
         self.__violation_count = None
 
     # 必须实现的接口: 计算打卡时长
-    def _calc_seconds(self) -> str:
+    def _calc_seconds(self) -> Cells.Duration:
         raise NotImplementedError("function must be implemented.")
 
     # 必须实现的接口: 计算灵活次数
@@ -35,7 +101,7 @@ class MethodBase:
         raise NotImplementedError("function must be implemented.")
 
     # 带有记忆化的对外接口簇
-    def seconds(self) -> str:
+    def seconds(self) -> Cells.Duration:
         if self.__seconds is None:
             self.__seconds = self._calc_seconds()
         return self.__seconds
@@ -67,52 +133,40 @@ class MethodRegular(MethodBase):
     REGULAR_WDAY = 5  # 固定打卡为周六
     REGULAR_START = 12 * 3600  # 固定打卡开始时间, 表达为一天中的第几秒
     REGULAR_END = 17 * 3600  # 固定打卡结束时间, 表达为一天中的第几秒
+    TOLERANCE = 600  # 允许迟到早退的总秒数, 灵活次数也按此向上取整
 
-    def _calc_seconds(self) -> str:
-        # 累计时间: 具体为统计所有签到签退区间, 格式化为 HH:MM
-        _seconds = 0.0
-        for _st, _ed in self._data:
-            _seconds += _ed - _st
-        # 开头没有 ' 概率触发 xlwings 的又一个 BUG
-        return "'{:02d}:{:02d}".format(int(_seconds) // 3600, int(_seconds) % 3600 // 60)
+    def _calc_seconds(self) -> Cells.Duration:
+        # 累计时间: 具体为统计所有签到签退区间, 由 Writer 以 HH:MM 格式显示
+        return Cells.Duration(total_seconds(self._data))
 
     def _calc_flex_count(self) -> int:
         # 灵活次数: 累计小时数
-        _seconds = 0.0
-        for _st, _ed in self._data:
-            _seconds += _ed - _st
-        # 超过 50 min 向上取整
-        return (int(_seconds) + 600) // 3600
+        _seconds = total_seconds(self._data)
+        # 超过 (60 min - TOLERANCE) 向上取整
+        return (int(_seconds) + self.TOLERANCE) // 3600
+
+    def _regular_required(self) -> float:
+        # 固定时段需要的打卡秒数, 扣除请假与固定时段重叠的部分; 不大于 0 即本周期免于固定打卡
+        return self.REGULAR_END - self.REGULAR_START - sum(window_seconds(
+            self._leave or (), self.REGULAR_START, self.REGULAR_END, wdays=(self.REGULAR_WDAY,)
+        ).values())
 
     def _calc_regular_count(self) -> int:
-        # for _st, _ed in self._data:
-        #     _mk_st, _mk_ed = time.localtime(_st), time.localtime(_ed)
-        #     _wday = _mk_st.tm_wday
-        #     _dsec_st = _mk_st.tm_hour * 3600 + _mk_st.tm_min * 60 + _mk_st.tm_sec
-        #     _dsec_ed = _mk_ed.tm_hour * 3600 + _mk_ed.tm_min * 60 + _mk_ed.tm_sec
-        #     if _wday == self.REGULAR_WDAY and _dsec_st <= self.REGULAR_START and _dsec_ed <= self.REGULAR_END:
-        #         return 1
-        # return 0
-
-        # 放宽条件, 允许迟到早退但求和不得超过 10 min, 具体实现为在固定时间内的打卡时长不少于(固定时长 - 10 min)
-        _seconds = 0.0
-        for _st, _ed in self._data:
-            _mk_st, _mk_ed = time.localtime(_st), time.localtime(_ed)
-            _wday = _mk_st.tm_wday
-            _dsec_st = _mk_st.tm_hour * 3600 + _mk_st.tm_min * 60 + _mk_st.tm_sec
-            _dsec_ed = _mk_ed.tm_hour * 3600 + _mk_ed.tm_min * 60 + _mk_ed.tm_sec
-            if _wday == self.REGULAR_WDAY:
-                _seconds += max(min(_dsec_ed, self.REGULAR_END) - max(_dsec_st, self.REGULAR_START), 0)
-        return int(_seconds + 600 >= self.REGULAR_END - self.REGULAR_START)
+        # 放宽条件, 允许迟到早退但求和不得超过 TOLERANCE, 具体实现为在固定时间内的打卡时长不少于(固定时长 - TOLERANCE)
+        _seconds = sum(window_seconds(
+            self._data, self.REGULAR_START, self.REGULAR_END, wdays=(self.REGULAR_WDAY,)
+        ).values())
+        _required = self._regular_required()
+        return int(_required > 0 and _seconds + self.TOLERANCE >= _required)
 
     def _calc_violation_count(self) -> int:
         _cnt = 0
         if self.flex_count() < self.FLEX_STANDARD.get(
-                self._info[Constant.COL_TYPE].strip(),
+                str(self._info[Constant.COL_TYPE]).strip(),
                 self.FLEX_STANDARD_DEFAULT
         ):
             _cnt += 1
-        if self.regular_count() == 0:
+        if self.regular_count() == 0 and self._regular_required() > 0:
             _cnt += 1
         return _cnt
 
@@ -122,84 +176,45 @@ class MethodVacation(MethodBase):
     TRAIN_DAYS = []
     TRAIN_START = 0
     TRAIN_END = 0
-
-    def _calc_seconds(self) -> str:
-        # 累计时间: 具体为统计所有签到签退区间, 格式化为 HH:MM
-        _seconds = 0.0
-        for _st, _ed in self._data:
-            _seconds += _ed - _st
-        # 开头没有 ' 概率触发 xlwings 的又一个 BUG
-        return "'{:02d}:{:02d}".format(int(_seconds) // 3600, int(_seconds) % 3600 // 60)
+    TRAIN_WINDOWS = None  # 每天有多个训练时段时为 [(开始, 结束), ...], 表达为一天中的第几秒; None 即 [(TRAIN_START, TRAIN_END)]
+    TOLERANCE = 600  # 允许迟到早退的总秒数 (每天)
+    _attendance = None  # _train_attendance 的结果, 每名成员只计算一次
+
+    @classmethod
+    def train_index(cls) -> Intervals.WindowIndex:
+        """训练日期 × 训练时段的窗口索引, 每个办法类只构造一次, 全部成员共用"""
+        _index = cls.__dict__.get("_train_index")
+        if _index is None:
+            _index = Intervals.WindowIndex.daily(cls.TRAIN_DAYS, cls.TRAIN_WINDOWS or [(cls.TRAIN_START, cls.TRAIN_END)])
+            cls._train_index = _index
+        return _index
+
+    def _calc_seconds(self) -> Cells.Duration:
+        # 累计时间: 具体为统计所有签到签退区间, 由 Writer 以 HH:MM 格式显示
+        return Cells.Duration(total_seconds(self._data))
 
     def _calc_flex_count(self) -> int:
         return 0
 
-    def _calc_regular_count(self) -> int:
-        _cnt = 0
-        _days_seconds = dict(zip(self.TRAIN_DAYS, [0] * len(self.TRAIN_DAYS)))  # 存储每天对应打卡时间
-        for _st, _ed in self._data:
-            _mk_st, _mk_ed = time.localtime(_st), time.localtime(_ed)
-            _dsec_st = _mk_st.tm_hour * 3600 + _mk_st.tm_min * 60 + _mk_st.tm_sec
-            _dsec_ed = _mk_ed.tm_hour * 3600 + _mk_ed.tm_min * 60 + _mk_ed.tm_sec
-            _sec_day = _st - _dsec_st
-            if _sec_day in self.TRAIN_DAYS:
-                _days_seconds[_sec_day] += max(min(_dsec_ed, self.TRAIN_END) - max(_dsec_st, self.TRAIN_START), 0)
-        # 放宽条件, 允许迟到早退但求和不得超过 10 min, 具体实现为在固定时间内的打卡时长不少于(固定时长 - 10 min)
-        for _train_day in _days_seconds:
-            _cnt += int(_days_seconds[_train_day] + 600 >= self.TRAIN_END - self.TRAIN_START)
-        return _cnt
-
-    def _calc_violation_count(self) -> int:
-        return int(self.regular_count() < len(self.TRAIN_DAYS))
-
-
-# 集训队假期管理办法241001 10-01~10-04 9:00~17:00
-class MethodVacation241001(MethodVacation):
-    TRAIN_DAYS = [
-        time.mktime((2024, 10, 1, 0, 0, 0, 0, 0, 0)),
-        time.mktime((2024, 10, 2, 0, 0, 0, 0, 0, 0)),
-        time.mktime((2024, 10, 3, 0, 0, 0, 0, 0, 0)),
-        time.mktime((2024, 10, 4, 0, 0, 0, 0, 0, 0)),
-    ]
-    TRAIN_START = 9 * 3600
-    TRAIN_END = 17 * 3600
-
-
-class MethodVacation20240430(MethodRegular):
-    FLEX_STANDARD = {  # 灵活时长标准
-        "正式队员": 20,
-        "参赛队员": 22,
-    }
-    FLEX_STANDARD_DEFAULT = 20  # 默认灵活时长标准, 如果成员类型不属于上表
-
-
-class MethodVacation20240501(MethodVacation):
-    TRAIN_DAYS = [
-        time.mktime((2024, 5, 2, 0, 0, 0, 0, 0, 0)),
-        time.mktime((2024, 5, 3, 0, 0, 0, 0, 0, 0)),
-        time.mktime((2024, 5, 4, 0, 0, 0, 0, 0, 0)),
-    ]
-    TRAIN_START = 9 * 3600
-    TRAIN_END = 17 * 3600
+    def _train_attendance(self) -> tuple:
+        # (达标天数, 请假覆盖全部训练时段而免于考勤的天数); 每天与训练时段的重叠秒数, 跨过 0 点的区间按实际重叠计入
+        # 放宽条件, 允许迟到早退但求和不得超过 TOLERANCE, 具体实现为在训练时段内的打卡时长不少于(训练总时长 - 请假 - TOLERANCE)
+        if self._attendance is None:
+            self._attendance = self.train_index().attendance(self._data, self.TOLERANCE, self._leave)
+        return self._attendance
 
+    def _calc_regular_count(self) -> int:
+        return self._train_attendance()[0]
 
-class MethodVacation20240506(MethodRegular):
     def _calc_violation_count(self) -> int:
-        _cnt = 0
-        if self.flex_count() < self.FLEX_STANDARD.get(
-                self._info[Constant.COL_TYPE].strip(),
-                self.FLEX_STANDARD_DEFAULT
-        ):
-            _cnt += 1
-        return _cnt
+        _met, _excused = self._train_attendance()
+        return int(_met < len(self.TRAIN_DAYS) - _excused)
 
 
 # 不要为纯数字
 
+# 各次集训与假期的办法由日程文件 (Constant.SCHEDULES_PATH) 描述, 启动时由 Calendar.register_saved 注册为参数化的实例,
+# 不再在此新增子类; 图形界面中的自定义规则由 Rules.register_saved 注册
 all_methods = {
     "集训队日常管理办法": MethodRegular,
-    "集训队假期管理方法241001 10-01~10-04 9:00~17:00": MethodVacation241001,
-    "集训队假期管理方法240420 4-22~4-30": MethodVacation20240430,
-    "集训队假期管理方法240501 05-02~05-03 9:00~17:00": MethodVacation20240501,
-    "集训队假期管理方法240506 05-06~05-12": MethodVacation20240506,
 }
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ACM考勤统计系统 - Occupancy模块
+功能：实验室在场人数分析: 合并全部成员的区间, 得到每分钟 (或每 10 分钟) 的在场人数、峰值及其时刻、每个星期几的平均负载
+特点：峰值由扫描线精确求得, O(n log n); 时间序列用差分数组前缀和, O(n log 时段数 + 时段数), 一年数据在一秒内完成
+"""
+
+import heapq
+import sys
+import time
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Dict, Iterable, Optional, Tuple
+
+from Modulo import Constant
+from Modulo import Methods
+
+WDAY_NAMES = ("周一", "周二", "周三", "周四", "周五", "周六", "周日")
+
+
+def _format_time(t: int) -> str:
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(t))
+
+
+def _merge(intervals: Iterable[Tuple[int, int]]) -> list:
+    """排序并合并重叠或相接的区间, 去掉空区间"""
+    _merged = []
+    for _st, _ed in sorted(intervals):
+        if _ed <= _st:
+            continue
+        if _merged and _st <= _merged[-1][1]:
+            _merged[-1][1] = max(_merged[-1][1], _ed)
+        else:
+            _merged.append([_st, _ed])
+    return [(_st, _ed) for _st, _ed in _merged]
+
+
+def sweep_peak(intervals: Iterable[Tuple[int, int]]) -> Tuple[int, int]:
+    """
+    扫描线求最大同时在场人数
+
+    同一时刻既有人离开又有人到达时先处理离开, 即 [st, ed) 半开区间.
+
+    Returns:
+        (峰值人数, 首次达到峰值的时刻); 没有区间时为 (0, 0)
+    """
+    _events = []
+    for _st, _ed in intervals:
+        if _ed > _st:
+            _events.append((_st, 1))
+            _events.append((_ed, -1))
+    _events.sort()  # 同一时刻 -1 排在 +1 之前
+    _count, _peak, _peak_time = 0, 0, 0
+    for _t, _delta in _events:
+        _count += _delta
+        if _count > _peak:
+            _peak, _peak_time = _count, _t
+    return _peak, _peak_time
+
+
+class Occupancy:
+    """
+    在场人数时间序列
+
+    series[i] 为时段 [bin_time(i), bin_time(i + 1)) 内出现过的人数, 同一成员在一个时段内有多个区间也只计 1 人.
+    时段从每天的本地 0 点起按 bin_seconds 划分 (bin_seconds 须整除 86400), 跨过夏令时切换的日子
+    (23 / 25 小时) 也与当天 0 点对齐, 当天最后一个时段截止于次日 0 点.
+
+    用法:
+        occupancy = Occupancy(member_records)  # Intervals.IntervalStore 或 {工号: [(开始, 结束), ...]}
+        print(occupancy.describe())
+    """
+
+    def __init__(self, member_records, bin_seconds: Optional[int] = None,
+                 start: Optional[int] = None, end: Optional[int] = None):
+        """
+        Args:
+            member_records: 配对后的打卡记录
+            bin_seconds: 时段长度, 默认为 Constant.OCCUPANCY_BIN (600 秒)
+            start, end: 统计范围 (Unix 时间), 默认为全部区间的范围; 范围外的部分被截断
+        """
+        self.bin_seconds = int(bin_seconds or getattr(Constant, 'OCCUPANCY_BIN', 600))
+        if self.bin_seconds <= 0 or 86400 % self.bin_seconds:
+            raise ValueError("时段长度必须整除 86400 秒: {}".format(self.bin_seconds))
+        _members = [list(_view) for _view in member_records.values()]
+        _all = [__ for _view in _members for __ in _view]
+        _lo = start if start is not None else min((__[0] for __ in _all), default=0)
+        _hi = end if end is not None else max((__[1] for __ in _all), default=0)
+        # 每名成员的区间截断到统计范围并合并, 同一成员重叠或相接的区间只算一段
+        self._members = [_merge((max(_st, _lo), min(_ed, _hi)) for _st, _ed in _view if _st < _hi and _ed > _lo)
+                         for _view in _members]
+        self._members = [__ for __ in self._members if __]
+        self.intervals = [__ for _view in self._members for __ in _view]
+        self.day_starts = array('q')  # 每天的本地 0 点
+        self.bin_starts = array('q')  # 每个时段的开始时刻, 最后一项之后为 self.end
+        self.origin, self.origin_wday = Methods.local_day(_lo) if self.intervals else (0, 0)
+        self.end = self.origin
+        if self.intervals:
+            _day = self.origin
+            while _day < _hi:
+                _next = Methods.local_day(_day + 27 * 3600)[0]  # 次日 0 点, 27 小时可跨过夏令时的 23 / 25 小时
+                self.day_starts.append(_day)
+                self.bin_starts.extend(range(_day, _next, self.bin_seconds))
+                _day = _next
+            self.end = _day
+        self.days = len(self.day_starts)
+        self.series = self._series()
+        self.peak, self.peak_time = sweep_peak(self.intervals)
+
+    def _bin_of(self, t: int) -> int:
+        return bisect_right(self.bin_starts, t) - 1
+
+    def _series(self) -> array:
+        """
+        差分数组: 每名成员覆盖的时段合并为若干段, 每段首个时段 +1, 最后一个时段之后 -1, 前缀和即为各时段人数
+        """
+        _bins = len(self.bin_starts)
+        _diff = [0] * (_bins + 1)
+        for _view in self._members:
+            _last = -1  # 该成员已计入的最后一个时段, 相邻区间落在同一时段时不重复计入
+            for _st, _ed in _view:
+                _first, _stop = max(self._bin_of(_st), _last + 1), self._bin_of(_ed - 1)
+                if _first > _stop:
+                    continue
+                _diff[_first] += 1
+                _diff[_stop + 1] -= 1
+                _last = _stop
+        return array('l', accumulate(_diff[:_bins]))
+
+    def bin_time(self, index: int) -> int:
+        """第 index 个时段的开始时刻"""
+        return self.bin_starts[index] if index < len(self.bin_starts) else self.end
+
+    def busiest_bins(self, top: int = 10) -> Iterable[Tuple[int, int]]:
+        """人数最多的 top 个时段 [(开始时刻, 人数), ...]"""
+        _order = heapq.nlargest(top, range(len(self.series)), key=self.series.__getitem__)
+        return [(self.bin_time(__), self.series[__]) for __ in _order]
+
+    def weekday_load(self, window: Optional[Tuple[int, int]] = None) -> Dict[int, float]:
+        """
+        每个星期几的平均在场人数 (人·秒 / 秒), 按时间加权, 不受时段长度影响
+
+        Args:
+            window: 只统计每天的该时段 (一天中的第几秒), 如 (REGULAR_START, REGULAR_END); 默认全天
+
+        Returns:
+            {星期几 0-6: 平均人数}, 范围内没有出现的星期几不在结果中
+        """
+        _ws, _we = window or (0, 86400)
+        _person_seconds = [0] * 7
+        for _st, _ed in self.intervals:
+            while _st < _ed:  # 跨过 0 点的区间逐天计入, 与时间序列一致
+                _day, _wday = Methods.local_day(_st)
+                _next = Methods.local_day(_day + 27 * 3600)[0]  # 次日 0 点, 27 小时可跨过夏令时的 23 / 25 小时
+                _seconds = min(_ed, _day + _we, _next) - max(_st, _day + _ws)
+                if _seconds > 0:
+                    _person_seconds[_wday] += _seconds
+                _st = _next
+        _day_count = [0] * 7
+        for _day in self.day_starts:
+            _day_count[Methods.local_day(_day)[1]] += 1
+        return {__: _person_seconds[__] / (_day_count[__] * (_we - _ws)) for __ in range(7) if _day_count[__]}
+
+    def describe(self, window: Optional[Tuple[int, int]] = None) -> str:
+        if not self.intervals:
+            return "没有打卡区间"
+        _lines = [
+            "共 {} 个区间, {} 天, 时段 {} 分钟".format(len(self.intervals), self.days, self.bin_seconds // 60),
+            "峰值 {} 人, 首次出现于 {}".format(self.peak, _format_time(self.peak_time)),
+            "最忙的时段: " + ", ".join("{} ({}人)".format(_format_time(_t), _n) for _t, _n in self.busiest_bins(5)),
+        ]
+        _load = self.weekday_load(window)
+        _lines.append("平均在场人数{}: ".format(
+            " ({:02d}:{:02d}-{:02d}:{:02d})".format(window[0] // 3600, window[0] % 3600 // 60,
+                                                      window[1] // 3600, window[1] % 3600 // 60) if window else ""
+        ) + ", ".join("{} {:.2f}".format(WDAY_NAMES[__], _load[__]) for __ in sorted(_load)))
+        return "\n".join(_lines)
+
+
+# 命令行分析历史仓库中的区间:
+#   python -m Modulo.Occupancy 起始日期 结束日期 [时段分钟数]
+if __name__ == '__main__':
+    from Modulo import Warehouse
+    if not Warehouse.default_path() or len(sys.argv) < 3:
+        print("用法: python -m Modulo.Occupancy 起始日期 结束日期 [时段分钟数], 需要配置 WAREHOUSE_PATH")
+        sys.exit(1)
+    with Warehouse.Warehouse() as _warehouse:
+        _records = _warehouse.interval_store(sys.argv[1], sys.argv[2])
+    _occupancy = Occupancy(_records, int(sys.argv[3]) * 60 if len(sys.argv) > 3 else None)
+    print(_occupancy.describe())
+    print(_occupancy.describe((Methods.MethodRegular.REGULAR_START, Methods.MethodRegular.REGULAR_END)).split("\n")[-1])
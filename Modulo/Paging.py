@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ACM考勤统计系统 - Paging模块
+功能：分页获取时的自适应页大小与吞吐量统计
+特点：根据每页耗时与响应大小调整页大小, 单行耗时不再改善时停止增长, 超时时减半
+"""
+
+import time
+from typing import List, Optional
+
+from Modulo import Constant
+
+
+class PageSizeTuner:
+    """
+    自适应页大小
+
+    接口按 (页码, 页大小) 分页, 即第 page 页覆盖 [(page-1)*size, page*size) 行.
+    页大小只取 PAGE_SIZE_MIN * 2^k, 且必须整除已获取的行数, 这样换页大小后页码仍能接上, 不会漏行或重复.
+
+    增长阶段每获取一个满页就翻倍, 直到单行耗时改善不足 PAGE_SIZE_GAIN 或响应超过 PAGE_BYTES_MAX,
+    此后固定在单行耗时最低的页大小. 超时后页大小减半, 且不再增长到超时过的大小.
+    """
+
+    def __init__(self, min_size: Optional[int] = None, max_size: Optional[int] = None):
+        self.min_size = min_size or getattr(Constant, 'PAGE_SIZE_MIN', 100)
+        self.max_size = max(max_size or getattr(Constant, 'PAGE_SIZE_MAX', 6400), self.min_size)
+        self.gain = getattr(Constant, 'PAGE_SIZE_GAIN', 0.1)  # 单行耗时至少降低的比例
+        self.max_bytes = getattr(Constant, 'PAGE_BYTES_MAX', 8 * 1024 * 1024)
+        self.size = self.min_size
+        self.growing = True
+        self._best_size = self.min_size
+        self._best_per_row: Optional[float] = None
+        self._ceiling: Optional[int] = None  # 超时过的最小页大小
+
+    def page_for(self, offset: int) -> int:
+        """
+        已获取 offset 行时, 下一次请求应使用的页大小; 页码为 offset // 页大小 + 1
+
+        offset 总是 min_size 的倍数, 因此至少 min_size 可用.
+        """
+        _size = self.size
+        while _size > self.min_size and offset % _size:
+            _size //= 2
+        return _size
+
+    def observe(self, size: int, rows: int, seconds: float, nbytes: int):
+        """记录一页满页的耗时与响应大小, 调整之后的页大小"""
+        if rows < size or rows <= 0:  # 末页行数不足, 耗时没有可比性
+            return
+        _per_row = seconds / rows
+        _improved = self._best_per_row is None or _per_row < self._best_per_row * (1 - self.gain)
+        if self._best_per_row is None or _per_row < self._best_per_row:
+            self._best_per_row, self._best_size = _per_row, size
+        if not self.growing or size != self.size:  # 为对齐页码临时使用的小页不参与增长判断
+            return
+        _next = size * 2
+        if not _improved or nbytes * 2 > self.max_bytes or _next > self.max_size \
+                or (self._ceiling is not None and _next >= self._ceiling):
+            self.growing = False
+            self.size = self._best_size
+        else:
+            self.size = _next
+
+    def on_timeout(self, size: int) -> bool:
+        """
+        记录一次超时
+
+        Returns:
+            是否还能减小页大小; 已是最小页大小时返回 False, 由调用方按普通失败处理
+        """
+        if size <= self.min_size:
+            return False
+        self._ceiling = size if self._ceiling is None else min(self._ceiling, size)
+        self.size = max(size // 2, self.min_size)
+        self._best_size = min(self._best_size, self.size)
+        self.growing = False
+        return True
+
+
+class FetchTelemetry:
+    """
+    分页获取的吞吐量统计: 每页耗时, 行/秒, 字节/秒, 压缩比
+
+    字节数均指解压后的响应大小, 传输字节数为实际经过网络的 (压缩后) 大小;
+    传输字节数未知的页 (压缩且没有 Content-Length) 不计入传输量、压缩比与传输速度.
+    """
+
+    def __init__(self):
+        self.pages: List[tuple] = []  # [(页大小, 行数, 耗时, 字节数, 传输字节数), ...]
+        self.timeouts = 0
+        self._started = time.monotonic()
+
+    def record(self, size: int, rows: int, seconds: float, nbytes: int, wire_bytes: Optional[int] = None) -> str:
+        """记录一页, 返回该页的统计文本; wire_bytes 为 None 表示传输字节数未知"""
+        self.pages.append((size, rows, seconds, nbytes, wire_bytes))
+        _text = "页大小 {} · {} 行 · {:.2f}s · {:.0f} 行/s".format(
+            size, rows, seconds, rows / seconds if seconds > 0 else 0.0)
+        if wire_bytes is None:
+            return _text + " · 传输量未知"
+        return _text + " · {:.1f} KB/s · 压缩比 {:.1f}".format(
+            wire_bytes / 1024 / seconds if seconds > 0 else 0.0,
+            nbytes / wire_bytes if wire_bytes else 1.0,
+        )
+
+    @property
+    def rows(self) -> int:
+        return sum(__[1] for __ in self.pages)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(__[3] for __ in self.pages)
+
+    @property
+    def wire_bytes(self) -> int:
+        """传输字节数已知的页的传输量"""
+        return sum(__[4] for __ in self.pages if __[4] is not None)
+
+    @property
+    def unknown_wire_pages(self) -> int:
+        return sum(int(__[4] is None) for __ in self.pages)
+
+    def summary(self) -> dict:
+        _request_seconds = sum(__[2] for __ in self.pages)
+        _elapsed = time.monotonic() - self._started
+        return {
+            'pages': len(self.pages),
+            'rows': self.rows,
+            'bytes': self.nbytes,
+            'wire_bytes': self.wire_bytes,
+            'compression_ratio': sum(__[3] for __ in self.pages if __[4] is not None) / self.wire_bytes
+            if self.wire_bytes else 1.0,
+            'unknown_wire_pages': self.unknown_wire_pages,
+            'timeouts': self.timeouts,
+            'elapsed': _elapsed,
+            'seconds_per_page': _request_seconds / len(self.pages) if self.pages else 0.0,
+            'rows_per_second': self.rows / _elapsed if _elapsed > 0 else 0.0,
+            'bytes_per_second': self.wire_bytes / _elapsed if _elapsed > 0 else 0.0,
+        }
+
+    def describe(self) -> str:
+        _s = self.summary()
+        return ("共 {} 页 {} 行, 传输 {:.1f} KB{} (解压后 {:.1f} KB, 压缩比 {:.1f}), 用时 {:.1f}s, "
+                "平均每页 {:.2f}s, {:.0f} 行/s, {:.1f} KB/s, 超时 {} 次").format(
+            _s['pages'], _s['rows'], _s['wire_bytes'] / 1024,
+            " (另有 {} 页传输量未知)".format(_s['unknown_wire_pages']) if _s['unknown_wire_pages'] else "",
+            _s['bytes'] / 1024, _s['compression_ratio'], _s['elapsed'], _s['seconds_per_page'],
+            _s['rows_per_second'], _s['bytes_per_second'] / 1024, _s['timeouts'],
+        )
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ACM考勤统计系统 - Pipeline模块
+功能：获取记录 -> 计算指标 -> 写入表格 的统计流水线
+特点：考勤统计.py 与两个图形界面共用同一份实现，进度通过 Progress 模块上报
+"""
+
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from Modulo import Cancel
+from Modulo import Constant
+from Modulo import Export
+from Modulo import Heatmap
+from Modulo import Intervals
+from Modulo import Ledger
+from Modulo import Methods
+from Modulo import Progress
+from Modulo import Spider
+from Modulo import Streaks
+from Modulo import Trace
+from Modulo import Warehouse
+from Modulo import Writer
+
+# 计算指标阶段每隔多少人上报一次进度并检查取消令牌
+SCORE_REPORT_EVERY = 20
+
+
+def member_key(cell) -> str:
+    """
+    将表格中的工号单元格规范化为 Spider 使用的键
+
+    Args:
+        cell: 工号单元格内容
+
+    Returns:
+        大写、去空白的工号; 数值型工号会去掉小数部分
+    """
+    _id = str(cell).strip().upper()
+    if not Constant.ID_TYPE_TEXT:
+        _id = str(int(float(_id)))
+    return _id
+
+
+def roster_keys(rows: List[list]) -> List[str]:
+    """
+    表格名单中的全部工号, 跳过空行与无法解析的工号
+
+    Args:
+        rows: 表格内容, 正文从 Constant.ROW_START 开始
+    """
+    _keys = []
+    for _row in rows[Constant.ROW_START:]:
+        if _row[Constant.COL_ID] in (None, ''):
+            continue
+        try:
+            _keys.append(member_key(_row[Constant.COL_ID]))
+        except ValueError:
+            continue
+    return _keys
+
+
+def filter_dates(member_records: Intervals.IntervalStore, allowed_dates: Iterable[str]) -> Intervals.IntervalStore:
+    """
+    仅保留签到日期在 allowed_dates 中的区间
+
+    Args:
+        member_records: 配对后的打卡记录
+        allowed_dates: 允许的日期集合, 格式 yyyy-mm-dd
+
+    Returns:
+        过滤后的新存储, 没有剩余区间的成员不出现
+    """
+    # 每个日期转为 [当天 0 点, 次日 0 点), 相邻日期合并, 再按成员二分切片
+    _ranges = []
+    for _day in sorted(set(allowed_dates)):
+        _mk = time.strptime(_day, '%Y-%m-%d')
+        _lo = int(time.mktime(_mk[:3] + (0, 0, 0, 0, 0, -1)))
+        _hi = int(time.mktime(_mk[:2] + (_mk.tm_mday + 1, 0, 0, 0, 0, 0, -1)))
+        if _ranges and _ranges[-1][1] == _lo:
+            _ranges[-1] = (_ranges[-1][0], _hi)
+        else:
+            _ranges.append((_lo, _hi))
+    return member_records.select_ranges(_ranges)
+
+
+@Trace.traced("pipeline.fetch")
+def fetch_records(time_range: Tuple[float, float], allowed_dates: Optional[Iterable[str]] = None,
+                  progress: Optional[Progress.ProgressReporter] = None, cancel: Optional[Cancel.CancelToken] = None,
+                  rows: Optional[List[list]] = None):
+    """
+    获取并配对打卡记录
+
+    Args:
+        rows: 表格内容; 给出且 Constant.ROSTER_FILTER 开启时只获取名单成员的打卡
+
+    Returns:
+        (查询实际使用的时间范围, 配对后的打卡记录 Intervals.IntervalStore)
+    """
+    Progress.message(progress, "获取原始刷卡记录与训练情况历史...")
+    _roster = roster_keys(rows) if rows is not None and getattr(Constant, 'ROSTER_FILTER', True) else None
+    spider = Spider.Spider(time_range[0], time_range[1], progress=progress, cancel=cancel, roster=_roster)
+    member_records = spider.get_member_records()
+    if spider.anomalies:
+        Progress.message(progress, f"发现 {len(spider.anomalies)} 项可疑打卡, 详见输出日志")
+    if allowed_dates:
+        member_records = filter_dates(member_records, allowed_dates)
+    return spider.TimeRange, member_records
+
+
+def new_block_col(writer: Writer.Writer) -> int:
+    """根据表头计算本次周期性记录块的起始列号, 0-index"""
+    _new_col = len(writer.data[Constant.ROW_START - 1]) - Constant.COL_RECORDS_START + Constant.COL_RECORDS_LENGTH - 1
+    return _new_col // Constant.COL_RECORDS_LENGTH * Constant.COL_RECORDS_LENGTH + Constant.COL_RECORDS_START
+
+
+def write_header(writer: Writer.Writer, new_col: int, time_range: Tuple[int, int]):
+    """扩容表格并填写新增记录块的表头"""
+    # 更新表格大小 (扩容)
+    _extend = new_col + Constant.COL_RECORDS_LENGTH - len(writer.data[Constant.ROW_START - 1])
+    for _i in range(len(writer.data)):
+        writer.data[_i].extend([''] * _extend)
+
+    # 更新新增表头
+    writer.merge_range(
+        (Constant.ROW_START - 2, new_col),
+        (Constant.ROW_START - 1, new_col + Constant.COL_RECORDS_LENGTH),
+    )
+    _mk_st = time.localtime(time_range[0])
+    _mk_ed = time.localtime(time_range[1])
+    writer.data[Constant.ROW_START - 2][new_col] = "{}-{}-{} ~ {}-{}-{}".format(
+        _mk_st.tm_year, _mk_st.tm_mon, _mk_st.tm_mday,
+        _mk_ed.tm_year, _mk_ed.tm_mon, _mk_ed.tm_mday,
+    )
+    _header = writer.data[Constant.ROW_START - 1]
+    _header[new_col + Constant.COL_RECORDS_SECONDS] = Constant.COL_RECORDS_SECONDS_TITLE  # 打卡时长
+    _header[new_col + Constant.COL_RECORDS_FLEX_COUNT] = Constant.COL_RECORDS_FLEX_COUNT_TITLE  # 灵活次数
+    _header[new_col + Constant.COL_RECORDS_REGULAR_COUNT] = Constant.COL_RECORDS_REGULAR_COUNT_TITLE  # 固定次数
+    _header[new_col + Constant.COL_RECORDS_VIOLATION_COUNT] = Constant.COL_RECORDS_VIOLATION_COUNT_TITLE  # 新增违规
+    _header[new_col + Constant.COL_RECORDS_REMARK] = Constant.COL_RECORDS_REMARK_TITLE  # 备注
+
+
+class ScoreRow:
+    """
+    一名成员在本周期的计算结果
+
+    Attributes:
+        index: 成员在表格中的行号, 0-index
+        member: 规范化后的工号
+        name: 姓名
+        type: 类别
+        seconds: 打卡时长, 与写入表格的格式一致
+        flex_count: 灵活次数
+        regular_count: 固定次数
+        violation_count: 新增违规
+        total_seconds: 打卡总秒数, 用于排序
+    """
+    __slots__ = ("index", "member", "name", "type", "seconds", "flex_count", "regular_count",
+                 "violation_count", "total_seconds")
+
+    def __init__(self, index: int, member: str, row: list, method: Methods.MethodBase, total_seconds: int):
+        self.index = index
+        self.member = member
+        self.name = row[Constant.COL_NAME]
+        self.type = row[Constant.COL_TYPE]
+        self.seconds = method.seconds()
+        self.flex_count = method.flex_count()
+        self.regular_count = method.regular_count()
+        self.violation_count = method.violation_count()
+        self.total_seconds = total_seconds
+
+
+class Preview:
+    """
+    一次统计的内存结果, 尚未写入表格
+
+    预览与提交共用同一份已获取并配对的打卡记录, 提交时不会重新请求接口.
+    """
+
+    def __init__(self, time_range: Tuple[int, int], path_output: str, method_todo: str,
+                 member_records: Intervals.IntervalStore):
+        self.time_range = time_range
+        self.path_output = path_output
+        self.method_todo = method_todo
+        self.member_records = member_records
+        self.scores: List[ScoreRow] = []
+        self._heatmap: Optional[Heatmap.Heatmap] = None
+        self._ledger: Optional[Ledger.Ledger] = None
+        self._leave: Optional[Dict[str, list]] = None
+
+    @property
+    def ledger(self) -> Ledger.Ledger:
+        """请假台账 (Constant.LEDGER_PATH), 首次访问时读取; 台账格式错误时抛出 ValueError, 不带着错误的台账继续统计"""
+        if self._ledger is None:
+            with Trace.span("ledger.load"):
+                self._ledger = Ledger.load(key=member_key)
+        return self._ledger
+
+    @property
+    def leave(self) -> Dict[str, list]:
+        """本周期内已批准的请假时段 {工号: [(开始, 结束), ...]}, 预览与提交共用"""
+        if self._leave is None:
+            self._leave = self.ledger.within(self.time_range)
+        return self._leave
+
+    def remarks(self) -> Dict[str, str]:
+        """本周期的请假备注 {工号: 备注}"""
+        return self.ledger.remarks(self.time_range)
+
+    @property
+    def heatmap(self) -> Heatmap.Heatmap:
+        """本周期的 星期几 × 小时 在场热力图, 首次访问时计算, 之后复用"""
+        if self._heatmap is None:
+            with Trace.span("heatmap.build", members=len(self.member_records)):
+                self._heatmap = Heatmap.Heatmap(self.member_records)
+        return self._heatmap
+
+    @property
+    def cached_heatmap(self) -> Optional[Heatmap.Heatmap]:
+        """已计算的热力图, 尚未访问过 heatmap 时为 None, 不触发计算"""
+        return self._heatmap
+
+
+@Trace.traced("methods.score")
+def score_rows(rows: List[list], member_records: Intervals.IntervalStore, method_todo: str,
+               progress: Optional[Progress.ProgressReporter] = None,
+               cancel: Optional[Cancel.CancelToken] = None,
+               reuse: Optional[List[ScoreRow]] = None,
+               leave: Optional[Dict[str, list]] = None) -> List[ScoreRow]:
+    """
+    按选定的集训队管理办法计算每名成员的指标
+
+    Args:
+        rows: 表格内容, 正文从 Constant.ROW_START 开始
+        member_records: 配对后的打卡记录, 用法同 {工号: [(开始时间, 结束时间), ...]}
+        method_todo: Methods.all_methods 中的集训队管理办法名称
+        reuse: 预览时已算好的结果, 行号与工号均一致的成员直接复用
+        leave: 本周期已批准的请假时段 {工号: [(开始, 结束), ...]}, 见 Preview.leave
+
+    Returns:
+        正文每一行对应一个 ScoreRow
+    """
+    Progress.message(progress, "计算与更新新增数据...")
+    _method_cls = Methods.all_methods[method_todo]
+    _reuse = {(__.index, __.member): __ for __ in reuse or ()}
+    leave = leave or {}
+    _scores = []
+    _total = len(rows) - Constant.ROW_START
+    for _done, _i in enumerate(range(Constant.ROW_START, len(rows)), 1):
+        _row = rows[_i]
+        _id = member_key(_row[Constant.COL_ID])
+        _score = _reuse.get((_i, _id))
+        if _score is None:
+            _records = member_records.get(_id, [])
+            with Trace.span("methods.evaluate"):
+                _score = ScoreRow(_i, _id, _row, _method_cls(_row, _records, leave=leave.get(_id)),
+                                  Methods.total_seconds(_records))
+            Trace.count("methods.members")
+        _scores.append(_score)
+        if _done % SCORE_REPORT_EVERY == 0 or _done == _total:
+            Progress.emit(progress, Progress.STAGE_SCORE, _done, _total)
+            Cancel.check(cancel)
+    return _scores
+
+
+def fill_block(writer: Writer.Writer, new_col: int, scores: List[ScoreRow],
+               remarks: Optional[Dict[str, str]] = None):
+    """将计算结果填入 writer.data 的新增记录块, remarks 为 {工号: 备注}, 如请假台账的记录"""
+    remarks = remarks or {}
+    for _score in scores:
+        _row = writer.data[_score.index]
+        _row[new_col + Constant.COL_RECORDS_SECONDS] = _score.seconds  # 打卡时长
+        _row[new_col + Constant.COL_RECORDS_FLEX_COUNT] = _score.flex_count  # 灵活次数
+        _row[new_col + Constant.COL_RECORDS_REGULAR_COUNT] = _score.regular_count  # 固定次数
+        _row[new_col + Constant.COL_RECORDS_VIOLATION_COUNT] = _score.violation_count  # 新增违规
+        if _score.member in remarks:
+            _row[new_col + Constant.COL_RECORDS_REMARK] = remarks[_score.member]  # 备注
+
+
+def violation_formula(row: int) -> str:
+    """
+    违规次数公式: 对表头为 "新增违规" 的全部记录列求和
+
+    形如 =SUMIF($H$2:$XFD$2,"新增违规",$H3:$XFD3), 以前的 =L3+Q3+V3+... 每个周期多一项,
+    现在无论累积多少周期都是同一长度, 新增周期也无需改写公式.
+    """
+    _first = Writer.Writer.column_name(Constant.COL_RECORDS_START)
+    _last = Writer.Writer.column_name(16383)  # Excel 的最后一列 XFD
+    _header = Constant.ROW_START  # 表头行 ROW_START - 1 (0-index) 对应的 Excel 行号
+    return '=SUMIF(${0}${2}:${1}${2},"{3}",${0}{4}:${1}{4})'.format(
+        _first, _last, _header, Constant.COL_RECORDS_VIOLATION_COUNT_TITLE, row + 1)
+
+
+def _runs(rows: List[int]) -> List[Tuple[int, int]]:
+    """升序行号合并为连续行段 [(开始, 结束), ...], 结束不含"""
+    _out: List[List[int]] = []
+    for _i in rows:
+        if _out and _out[-1][1] == _i:
+            _out[-1][1] = _i + 1
+        else:
+            _out.append([_i, _i + 1])
+    return [(_st, _ed) for _st, _ed in _out]
+
+
+def write_results(writer: Writer.Writer, new_col: int, progress: Optional[Progress.ProgressReporter] = None,
+                  cancel: Optional[Cancel.CancelToken] = None):
+    """递交新增记录块与违规次数公式"""
+    Progress.message(progress, "正在将结果写入文件...")
+    _rows = len(writer.data)
+    _block_cells = (_rows - Constant.ROW_START + 2) * Constant.COL_RECORDS_LENGTH
+    _total_cells = _block_cells + _rows - Constant.ROW_START
+
+    # 递交新增信息 (含新增表头)
+    writer.rewrite_range(
+        (Constant.ROW_START - 2, new_col),
+        (_rows, new_col + Constant.COL_RECORDS_LENGTH),
+        cancel,
+    )
+    Progress.emit(progress, Progress.STAGE_WRITE, _block_cells, _total_cells)
+
+    # 更新违规次数公式, 公式长度固定, 不随周期数增长; 已经是该公式的单元格 (即之前统计过的成员) 不再重写,
+    # 只递交新成员或旧版本公式所在的连续行段
+    _current = writer.column_formulas(Constant.COL_VIOLATION_COUNT, Constant.ROW_START, _rows)
+    _stale = []
+    for _i, _formula in zip(range(Constant.ROW_START, _rows), _current):
+        _expected = violation_formula(_i)
+        writer.data[_i][Constant.COL_VIOLATION_COUNT] = _expected
+        if _formula != _expected:
+            _stale.append(_i)
+    for _st, _ed in _runs(_stale):
+        writer.rewrite_range(
+            (_st, Constant.COL_VIOLATION_COUNT),
+            (_ed, Constant.COL_VIOLATION_COUNT + 1),
+            cancel,
+        )
+    Progress.emit(progress, Progress.STAGE_WRITE, _total_cells, _total_cells)
+
+
+def write_heatmap(writer: Writer.Writer, preview: Preview, scores: List[ScoreRow],
+                  progress: Optional[Progress.ProgressReporter] = None):
+    """将本周期的在场热力图写入 Constant.HEATMAP_SHEET 工作表 (覆盖上一次的内容), 未配置时跳过"""
+    _sheet = getattr(Constant, 'HEATMAP_SHEET', '')
+    if not _sheet:
+        return
+    Progress.message(progress, "正在写入在场热力图...")
+    _names = {__.member: __.name for __ in scores}
+    writer.write_sheet(_sheet, preview.heatmap.table(_names, [__.member for __ in scores]))
+
+
+def preview(time_range: Tuple[float, float], path_output: str, method_todo: str,
+            allowed_dates: Optional[Iterable[str]] = None, progress: Optional[Progress.ProgressReporter] = None,
+            cancel: Optional[Cancel.CancelToken] = None) -> Preview:
+    """
+    获取记录并计算指标, 只读打开表格获取名单, 不修改表格
+
+    参数含义同 run, 返回的 Preview 可交给 commit 写入
+    """
+    with Trace.session("pipeline.preview", path_output):
+        _rows = Writer.Writer.read_only(path_output)
+        _range, member_records = fetch_records(time_range, allowed_dates, progress, cancel, _rows)
+        Cancel.check(cancel)
+        _preview = Preview(_range, path_output, method_todo, member_records)
+        _preview.scores = score_rows(_rows, member_records, method_todo, progress, cancel, leave=_preview.leave)
+        return _preview
+
+
+def commit(preview: Preview, progress: Optional[Progress.ProgressReporter] = None,
+           cancel: Optional[Cancel.CancelToken] = None):
+    """
+    将 Preview 写入表格, 不会重新获取记录
+
+    Raises:
+        Cancel.Cancelled: 任务被取消, 表格不做任何保存
+    """
+    with Trace.session("pipeline.commit", preview.path_output):
+        writer = Writer.Writer(preview.path_output, append=getattr(Constant, 'WRITE_APPEND', True))
+        try:
+            _new_col = new_block_col(writer)
+            write_header(writer, _new_col, preview.time_range)
+            _scores = score_rows(writer.data, preview.member_records, preview.method_todo, progress, cancel,
+                                 reuse=preview.scores, leave=preview.leave)
+            fill_block(writer, _new_col, _scores, preview.remarks())
+            write_results(writer, _new_col, progress, cancel)
+            write_heatmap(writer, preview, _scores, progress)
+        except Cancel.Cancelled:
+            # 放弃本次修改, 同时退出 Excel 进程
+            writer.abort()
+            raise
+        except Exception:
+            writer.close()
+            raise
+        # 关闭文件, 退出 Excel 进程
+        writer.close()
+        with Trace.span("pipeline.history"):
+            record_history(preview, _scores, progress)
+        with Trace.span("pipeline.export"):
+            export_results(preview, _scores, progress)
+
+
+def read_roster(path_output: str) -> Optional[List[list]]:
+    """只读获取名单供过滤获取使用, 读取失败时返回 None 退化为全量获取, 真正的错误留给写入阶段报告"""
+    if not getattr(Constant, 'ROSTER_FILTER', True):
+        return None
+    try:
+        return Writer.Writer.read_only(path_output)
+    except Exception as e:
+        print(f"读取名单失败, 将获取全部成员的记录: {e}")
+        return None
+
+
+def record_history(preview: Preview, scores: List[ScoreRow], progress: Optional[Progress.ProgressReporter] = None):
+    """将本次统计的打卡区间与结果记入历史仓库, 仓库出错不影响已写入的表格"""
+    if not Warehouse.default_path():
+        return
+    try:
+        with Warehouse.Warehouse() as _warehouse:
+            _warehouse.store_intervals(preview.member_records)
+            _warehouse.store_scores(preview.time_range, preview.method_todo, scores)
+            if preview.cached_heatmap is not None:
+                _warehouse.store_heatmap(preview.time_range, preview.cached_heatmap)
+            _streaks = Streaks.update(_warehouse, preview.time_range, preview.method_todo, scores)
+        if _streaks is not None:
+            print("[Pipeline] 滚动时长排行榜:\n" + Streaks.describe(_streaks, names={__.member: __.name for __ in scores}))
+    except Exception as e:
+        Progress.message(progress, f"记录历史仓库失败: {e}")
+
+
+def export_results(preview: Preview, scores: List[ScoreRow], progress: Optional[Progress.ProgressReporter] = None):
+    """将本次统计的数值结果追加到列式导出文件, 导出出错不影响已写入的表格"""
+    if not Export.default_path():
+        return
+    try:
+        Export.export(preview.time_range, preview.method_todo, scores)
+    except Exception as e:
+        Progress.message(progress, f"导出结果失败: {e}")
+
+
+def run(time_range: Tuple[float, float], path_output: str, method_todo: str,
+        allowed_dates: Optional[Iterable[str]] = None, progress: Optional[Progress.ProgressReporter] = None,
+        cancel: Optional[Cancel.CancelToken] = None):
+    """
+    执行一次完整的统计
+
+    Args:
+        time_range: 统计时间范围 (开始时间, 结束时间), Unix 时间
+        path_output: 输出 xlsx 文件, 必须已有表头格式
+        method_todo: Methods.all_methods 中的集训队管理办法名称
+        allowed_dates: 指定日期统计时允许的日期集合, 格式 yyyy-mm-dd
+        progress: 进度上报队列, 为 None 时仅 print
+        cancel: 取消令牌, 取消时抛出 Cancel.Cancelled, 表格不做任何保存
+
+    Raises:
+        Cancel.Cancelled: 任务被取消
+    """
+    with Trace.session("pipeline.run", path_output):
+        _range, member_records = fetch_records(time_range, allowed_dates, progress, cancel, read_roster(path_output))
+        Cancel.check(cancel)
+        commit(Preview(_range, path_output, method_todo, member_records), progress, cancel)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ACM考勤统计系统 - Profile模块
+功能：统计入口的内置性能分析开关, 命令行 --profile 与图形界面菜单共用
+特点：同时运行 cProfile 与一个采样线程, 在表格旁写出 .prof (snakeviz / pstats 可读) 与 .folded
+     (折叠栈, flamegraph.pl / speedscope 可直接生成火焰图), 并打印最耗时的函数; 只依赖标准库, 打包后同样可用
+"""
+
+import contextlib
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Optional
+
+from Modulo import Constant
+
+
+class StackSampler:
+    """
+    采样分析器: 后台线程每隔 interval 秒记录一次目标线程的调用栈
+
+    与 cProfile 的确定性计时互补, 得到的是完整调用栈, 可直接画火焰图, 且对被测代码的开销与调用次数无关.
+    """
+
+    def __init__(self, thread_id: int, interval: Optional[float] = None):
+        self.thread_id = thread_id
+        self.interval = interval or getattr(Constant, 'PROFILE_INTERVAL', 0.005)
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            _frame = sys._current_frames().get(self.thread_id)
+            _stack = []
+            while _frame is not None:
+                _code = _frame.f_code
+                _stack.append("{} ({}:{})".format(
+                    _code.co_name, os.path.basename(_code.co_filename), _code.co_firstlineno))
+                _frame = _frame.f_back
+            if _stack:
+                self.stacks[";".join(reversed(_stack))] += 1
+
+    def write_folded(self, path: str):
+        """折叠栈格式, 每行 "帧;帧;帧 次数\""""
+        with open(path, "w", encoding="utf-8") as _file:
+            for _stack, _count in self.stacks.most_common():
+                _file.write("{} {}\n".format(_stack, _count))
+
+
+def profile_base(path_output: str, name: str) -> str:
+    """输出文件的公共前缀: 与表格同目录同名, 如 考勤.xlsx 的 run 为 考勤.run"""
+    return "{}.{}".format(os.path.splitext(path_output)[0], name)
+
+
+def hot_functions(profiler: cProfile.Profile, top: Optional[int] = None) -> str:
+    """按自身耗时排序的前 top 个函数"""
+    top = top or getattr(Constant, 'PROFILE_TOP', 20)
+    _stream = io.StringIO()
+    pstats.Stats(profiler, stream=_stream).strip_dirs().sort_stats("tottime").print_stats(top)
+    return _stream.getvalue()
+
+
+@contextlib.contextmanager
+def profiled(path_output: str, name: str = "run", enabled: bool = True):
+    """
+    在当前线程中分析一段代码, 结束时 (包括出错与取消) 写出结果并打印最耗时的函数
+
+    Args:
+        path_output: 输出表格, 分析结果写在其旁边
+        name: 输出文件名中的阶段名
+        enabled: 为 False 时不做任何事, 便于调用方直接传入开关
+    """
+    if not enabled:
+        yield
+        return
+    _profiler = cProfile.Profile()
+    _sampler = StackSampler(threading.get_ident())
+    _start = time.perf_counter()
+    _sampler.start()
+    _profiler.enable()
+    try:
+        yield
+    finally:
+        _profiler.disable()
+        _sampler.stop()
+        _base = profile_base(path_output, name)
+        print("[Profile] {} 用时 {:.2f}s, 最耗时的函数:".format(name, time.perf_counter() - _start))
+        print(hot_functions(_profiler))
+        try:
+            _profiler.dump_stats(_base + ".prof")
+            _sampler.write_folded(_base + ".folded")
+            print("[Profile] 已写入 {0}.prof 与 {0}.folded".format(_base))
+        except OSError as e:
+            print(f"[Profile] 写入分析结果失败: {e}")
+
+
+def wrap(target: Callable, path_output: str, name: str, enabled: bool) -> Callable:
+    """返回在 profiled 中执行 target 的函数, 供图形界面作为工作线程的入口"""
+    if not enabled:
+        return target
+
+    def _run():
+        with profiled(path_output, name):
+            target()
+    return _run
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ACM考勤统计系统 - Progress模块
+功能：统计流水线的结构化进度事件
+特点：工作线程只负责 emit, 图形界面在 Tk 主循环中定时 drain, 不再从工作线程调用 root.after
+"""
+
+import queue
+import time
+from typing import Dict, List, Optional
+
+# 流水线阶段
+STAGE_FETCH = "fetch"  # 获取记录, 单位: 条
+STAGE_SCORE = "score"  # 计算指标, 单位: 成员
+STAGE_WRITE = "write"  # 写入表格, 单位: 单元格
+STAGE_MESSAGE = "message"  # 纯文本状态
+STAGE_FINISH = "finish"  # 流水线结束, done 为 1 表示成功
+
+STAGE_TITLES = {
+    STAGE_FETCH: ("获取记录", "条"),
+    STAGE_SCORE: ("计算指标", "人"),
+    STAGE_WRITE: ("写入表格", "格"),
+}
+
+
+class ProgressEvent:
+    """
+    进度事件
+
+    Attributes:
+        stage: 阶段, 取值见 STAGE_* 常量
+        done: 已完成数量
+        total: 总数量, 未知时为 None
+        message: 附带的状态文本
+        timestamp: 事件产生时刻 (time.monotonic)
+    """
+    __slots__ = ("stage", "done", "total", "message", "timestamp")
+
+    def __init__(self, stage: str, done: int = 0, total: Optional[int] = None, message: str = ""):
+        self.stage = stage
+        self.done = done
+        self.total = total
+        self.message = message
+        self.timestamp = time.monotonic()
+
+    def __repr__(self):
+        return "ProgressEvent({!r}, {}, {}, {!r})".format(self.stage, self.done, self.total, self.message)
+
+
+class ProgressReporter:
+    """
+    线程安全的进度事件队列
+
+    工作线程调用 emit / message / finish 上报进度, 界面线程调用 drain 取出全部积压事件.
+    reporter 为 None 的位置一律视为不上报, 因此命令行版本无需任何改动.
+    """
+
+    def __init__(self):
+        self._queue: "queue.Queue[ProgressEvent]" = queue.Queue()
+
+    def emit(self, stage: str, done: int, total: Optional[int] = None, message: str = ""):
+        self._queue.put_nowait(ProgressEvent(stage, done, total, message))
+
+    def message(self, text: str):
+        self._queue.put_nowait(ProgressEvent(STAGE_MESSAGE, message=text))
+
+    def finish(self, success: bool, message: str = ""):
+        self._queue.put_nowait(ProgressEvent(STAGE_FINISH, int(success), 1, message))
+
+    def drain(self) -> List[ProgressEvent]:
+        """取出当前积压的全部事件, 不阻塞"""
+        _events = []
+        while True:
+            try:
+                _events.append(self._queue.get_nowait())
+            except queue.Empty:
+                return _events
+
+
+def emit(progress: Optional[ProgressReporter], stage: str, done: int, total: Optional[int] = None, message: str = ""):
+    """reporter 可能为 None 时的便捷上报"""
+    if progress is not None:
+        progress.emit(stage, done, total, message)
+
+
+def message(progress: Optional[ProgressReporter], text: str):
+    """上报状态文本, 无 reporter 时退化为 print"""
+    if progress is not None:
+        progress.message(text)
+    else:
+        print(text)
+
+
+class ProgressTracker:
+    """
+    界面侧的进度汇总, 根据事件计算各阶段吞吐量与剩余时间 (ETA)
+    """
+
+    def __init__(self):
+        self._started: Dict[str, tuple] = {}  # {阶段: (首个事件时刻, 首个事件完成数)}
+        self.stage: Optional[str] = None
+        self.done = 0
+        self.total: Optional[int] = None
+        self.rate = 0.0  # 当前阶段吞吐量, 单位/秒
+
+    def update(self, event: ProgressEvent):
+        if event.stage not in STAGE_TITLES:
+            return
+        _t0, _done0 = self._started.setdefault(event.stage, (event.timestamp, event.done))
+        self.stage, self.done, self.total = event.stage, event.done, event.total
+        _elapsed = event.timestamp - _t0
+        self.rate = (self.done - _done0) / _elapsed if _elapsed > 0 else 0.0
+
+    def fraction(self) -> Optional[float]:
+        """当前阶段完成比例, 总量未知时返回 None"""
+        if not self.total:
+            return None
+        return min(self.done / self.total, 1.0)
+
+    def eta(self) -> Optional[float]:
+        """当前阶段预计剩余秒数, 无法估计时返回 None"""
+        if not self.total or self.rate <= 0:
+            return None
+        return max(self.total - self.done, 0) / self.rate
+
+    def describe(self) -> str:
+        if self.stage is None:
+            return ""
+        _title, _unit = STAGE_TITLES[self.stage]
+        _text = "{} {}/{} {}".format(_title, self.done, self.total if self.total else "?", _unit)
+        if self.rate > 0:
+            _text += " · {:.1f} {}/s".format(self.rate, _unit)
+        _eta = self.eta()
+        if _eta is not None:
+            _text += " · 剩余约 {:.0f}s".format(_eta)
+        return _text
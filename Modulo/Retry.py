@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ACM考勤统计系统 - Retry模块
+功能：得力云接口请求的重试策略与熔断器
+特点：区分可重试与致命错误, 认证失败立即失败; 退避带随机抖动并遵守 Retry-After; 连续 5xx 后熔断
+"""
+
+import email.utils
+import random
+import time
+from typing import Optional
+
+import requests
+
+from Modulo import Constant
+
+# 可重试的 HTTP 状态码, 其余 4xx 视为致命错误
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+STATUS_HINTS = {
+    401: "认证失败，请检查AUTH_CODE、AUTH_ID、ORG_ID",
+    403: "权限不足",
+    429: "请求过于频繁",
+    500: "服务器内部错误",
+    502: "网关错误",
+    503: "服务暂不可用",
+    504: "网关超时",
+}
+
+
+class ApiError(requests.RequestException):
+    """
+    接口返回的错误
+
+    Attributes:
+        status: HTTP 状态码, 业务错误或解析错误时为 None
+        retryable: 是否值得重试
+        retry_after: 服务端要求的等待秒数, 未给出时为 None
+    """
+
+    def __init__(self, message: str, status: Optional[int] = None, retryable: bool = False,
+                 retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+    @classmethod
+    def from_status(cls, status: int, retry_after: Optional[float] = None) -> "ApiError":
+        _msg = f"HTTP错误: {status}"
+        if status in STATUS_HINTS:
+            _msg += f" ({STATUS_HINTS[status]})"
+        return cls(_msg, status, status in RETRYABLE_STATUS, retry_after)
+
+
+class CircuitOpen(requests.RequestException):
+    """熔断器打开期间拒绝请求"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    解析 Retry-After 响应头
+
+    Args:
+        value: 秒数或 HTTP 日期
+
+    Returns:
+        需要等待的秒数, 无法解析时返回 None
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        _when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(_when.timestamp() - time.time(), 0.0)
+
+
+class RetryPolicy:
+    """
+    重试策略: 可重试错误按 "full jitter" 指数退避, 即在 [0, min(上限, 基数 * 2^n)] 内均匀随机等待
+
+    多个客户端同时失败时随机等待可以错开重试, 避免再次同时打到服务端.
+    服务端给出 Retry-After 时以其为准 (不超过上限).
+    """
+
+    def __init__(self, max_retries: Optional[int] = None, base_delay: Optional[float] = None,
+                 max_delay: Optional[float] = None):
+        self.max_retries = max_retries if max_retries is not None else getattr(Constant, 'MAX_RETRIES', 5)
+        self.base_delay = base_delay if base_delay is not None else getattr(Constant, 'RETRY_BASE_DELAY', 1.0)
+        self.max_delay = max_delay if max_delay is not None else getattr(Constant, 'RETRY_MAX_DELAY', 30.0)
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        if isinstance(error, ApiError):
+            return error.retryable
+        if isinstance(error, CircuitOpen):
+            return False
+        return isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError))
+
+    def should_retry(self, error: Exception, attempt: int) -> bool:
+        """attempt 为已失败的次数减一, 即从 0 开始"""
+        return attempt < self.max_retries and self.is_retryable(error)
+
+    def delay(self, error: Exception, attempt: int) -> float:
+        _cap = min(self.max_delay, self.base_delay * 2 ** attempt)
+        _retry_after = getattr(error, 'retry_after', None)
+        if _retry_after is not None:
+            return min(_retry_after, self.max_delay)
+        return random.uniform(0, _cap)
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    连续 threshold 次服务端错误 (5xx) 后打开, cooldown 秒内的请求直接抛出 CircuitOpen;
+    冷却结束后放行一次试探请求, 成功则关闭, 失败则重新打开.
+    """
+
+    def __init__(self, threshold: Optional[int] = None, cooldown: Optional[float] = None):
+        self.threshold = threshold or getattr(Constant, 'BREAKER_THRESHOLD', 3)
+        self.cooldown = cooldown if cooldown is not None else getattr(Constant, 'BREAKER_COOLDOWN', 60.0)
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None and time.monotonic() - self.opened_at < self.cooldown
+
+    def before_request(self):
+        if self.is_open:
+            raise CircuitOpen("服务端连续返回错误，暂停请求 {:.0f} 秒".format(
+                self.cooldown - (time.monotonic() - self.opened_at)))
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self, error: Exception):
+        """只有服务端错误计入熔断, 超时与客户端错误由重试策略处理"""
+        if not (isinstance(error, ApiError) and error.status is not None and error.status >= 500):
+            return
+        self.failures += 1
+        if self.failures >= self.threshold or self.opened_at is not None:
+            self.opened_at = time.monotonic()
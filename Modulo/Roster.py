@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ACM考勤统计系统 - Roster模块
+功能：将表格名单中的工号解析为接口的 member_id, 供 Spider 按 member_ids 过滤获取
+特点：映射在进程内缓存, 配置了 WAREHOUSE_PATH 时同时持久化到历史仓库; 名单中有未知工号或未命中已过期时全量获取并学习映射
+"""
+
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from Modulo import Constant
+from Modulo import Warehouse
+
+# 进程内缓存 {工号: (member_id, 确认时刻)}, 图形界面多次统计时无需重复读取仓库
+_cache: Dict[str, Tuple[str, int]] = {}
+_loaded = False
+
+
+def _load() -> Dict[str, Tuple[str, int]]:
+    global _loaded
+    if not _loaded:
+        _loaded = True
+        if Warehouse.default_path():
+            try:
+                with Warehouse.Warehouse() as _warehouse:
+                    _cache.update(_warehouse.member_map())
+            except Exception as e:
+                print(f"[Roster] 读取工号映射失败: {e}")
+    return _cache
+
+
+class MemberMap:
+    """
+    工号 -> member_id 映射
+
+    映射只能从打卡记录中学到 (记录同时带有工号与 member_id), 接口没有成员目录可查, 因此名单中有未知工号时需要全量获取.
+    全量获取中未出现的工号记为空 member_id (已知的未命中), 只在 MEMBER_MISS_REFRESH_HOURS 小时内不再触发全量获取;
+    过期后下一次统计重新全量获取, 新加入或重新打卡的成员最迟在这段时间之后被解析, 而不是每次统计都全量获取.
+    """
+
+    def __init__(self):
+        self.entries = _load()
+        self.refresh = getattr(Constant, 'MEMBER_MISS_REFRESH_HOURS', 24) * 3600
+
+    def resolve(self, roster: Iterable[str]) -> Tuple[List[str], List[str], List[str]]:
+        """
+        Args:
+            roster: 名单工号, 已规范化为 Spider 使用的键
+
+        Returns:
+            (已知的 member_id 列表, 需要全量获取才能解析的工号列表, 未过期的已知未命中工号列表)
+        """
+        _now = time.time()
+        _member_ids, _unresolved, _misses = [], [], []
+        for _id in dict.fromkeys(roster):
+            _entry = self.entries.get(_id)
+            if _entry is not None and _entry[0]:
+                _member_ids.append(_entry[0])
+            elif _entry is not None and _now - _entry[1] < self.refresh:
+                _misses.append(_id)
+            else:
+                _unresolved.append(_id)
+        return _member_ids, _unresolved, _misses
+
+    def learn(self, roster: Iterable[str], seen: Dict[str, str]):
+        """
+        根据一次全量获取的结果更新名单成员的映射
+
+        Args:
+            roster: 名单工号
+            seen: 本次获取中见到的 {工号: member_id}
+        """
+        _now = int(time.time())
+        _updated = {}
+        for _id in roster:
+            if seen.get(_id):
+                _updated[_id] = (seen[_id], _now)
+            elif not (self.entries.get(_id) or ('', 0))[0]:  # 已有的映射不因本期无打卡而失效
+                _updated[_id] = ('', _now)
+        self.entries.update(_updated)
+        if _updated and Warehouse.default_path():
+            try:
+                with Warehouse.Warehouse() as _warehouse:
+                    _warehouse.store_member_map(_updated)
+            except Exception as e:
+                print(f"[Roster] 保存工号映射失败: {e}")
+
+
+def batches(items: List[str], size: Optional[int] = None) -> List[List[str]]:
+    """按 MEMBER_BATCH_SIZE 切分 member_ids, 避免单个请求体过大"""
+    size = size or getattr(Constant, 'MEMBER_BATCH_SIZE', 50)
+    return [items[__:__ + size] for __ in range(0, len(items), size)]
@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ACM考勤统计系统 - Rules模块
+功能：图形界面自定义统计规则的声明式描述, 编译为 Methods.MethodBase 子类; Calendar 的训练日程也编译为同一个基类
+特点：规则只解析、编译一次; 有训练日期时编译为 Intervals.WindowIndex, 与假期办法共用同一套窗口查询;
+     只按星期几统计时与内置办法共用 Methods.window_seconds; 规则可保存为 JSON 并在启动时重新载入
+"""
+
+import json
+import os
+import time
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from Modulo import Cells
+from Modulo import Constant
+from Modulo import Intervals
+from Modulo import Methods
+
+REGULAR_NONE = 'none'  # 无固定打卡
+REGULAR_DAILY = 'daily'  # 每天固定打卡
+
+FLEX_DEFAULT_KEY = '默认'  # 灵活时长标准中, 成员类型不在表中时使用的键
+
+
+class RuleSpec:
+    """
+    一条自定义统计规则
+
+    Attributes:
+        name: 规则名称, 即统计规则下拉列表中的名称
+        flex_standard: 灵活时长标准 {成员类型: 小时数}
+        flex_default: 成员类型不在上表时的灵活时长标准, 0 表示不考核灵活时长
+        regular: 固定打卡日期, REGULAR_NONE / REGULAR_DAILY / 星期几列表 (0-6)
+        regular_window: 固定打卡时段 (开始, 结束), 表达为一天中的第几秒; None 表示当天有打卡即可
+        train_range: 训练日期范围 ('YYYY-MM-DD', 'YYYY-MM-DD'), 固定打卡只统计其中的日期; None 为不限
+        train_interval: 训练间隔天数, 与 train_range 同时设置时只统计从开始日期起每隔该天数的日期
+        tolerance: 允许迟到早退的总分钟数, 灵活时长也按此向上取整
+    """
+    __slots__ = ("name", "flex_standard", "flex_default", "regular", "regular_window", "train_range",
+                 "train_interval", "tolerance")
+
+    def __init__(self, name: str, flex_standard: Optional[Dict[str, int]] = None, flex_default: int = 14,
+                 regular=(5,), regular_window: Optional[Tuple[int, int]] = None,
+                 train_range: Optional[Tuple[str, str]] = None, train_interval: int = 0, tolerance: int = 10):
+        self.name = name
+        self.flex_standard = dict(flex_standard or {})
+        self.flex_default = flex_default
+        self.regular = regular if regular in (REGULAR_NONE, REGULAR_DAILY) else sorted(set(regular))
+        self.regular_window = tuple(regular_window) if regular_window else None
+        self.train_range = tuple(train_range) if train_range else None
+        self.train_interval = train_interval
+        self.tolerance = tolerance
+
+    @property
+    def flex_assessed(self) -> bool:
+        """是否考核灵活时长, 标准全为 0 时不考核"""
+        return any(self.flex_standard.values()) or self.flex_default > 0
+
+    def to_dict(self) -> dict:
+        return {__: getattr(self, __) for __ in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RuleSpec":
+        return cls(**{__: data[__] for __ in cls.__slots__ if __ in data})
+
+    def train_days(self) -> Optional[List[float]]:
+        """训练日期 (当天 0 点的 Unix 时间), 未设置训练日期范围时为 None"""
+        if self.train_range is None:
+            return None
+        _st, _ed = (datetime.strptime(__, '%Y-%m-%d').date() for __ in self.train_range)
+        _step = max(self.train_interval, 1)
+        return [
+            time.mktime(date.fromordinal(__).timetuple())
+            for __ in range(_st.toordinal(), _ed.toordinal() + 1, _step)
+        ]
+
+
+class RuleMethod(Methods.MethodBase):
+    """
+    由 RuleSpec 或 Calendar.Schedule 编译得到的办法的基类, 编译时把规则换算为类属性, 计算时不再解析规则
+
+    固定次数为达标的固定打卡天数与达标的训练天数之和. 违规次数与内置办法一致: 灵活次数不足标准记 1 次;
+    有固定打卡要求时, 固定打卡日未达标 (REGULAR_ALL_DAYS 时为未全部达标, 否则为达标天数为 0) 记 1 次;
+    有训练时段时, 训练日未全部达标记 1 次. 请假从当天要求的时段中扣除, 请假覆盖全部时段的日期不再要求.
+    """
+    SPEC: RuleSpec = None  # 由训练日程编译时为 None
+    FLEX_STANDARD: Optional[Dict[str, int]] = {}  # 不考核灵活时长时为 None, 与 Calendar.Schedule 一致
+    FLEX_STANDARD_DEFAULT = 14
+    FLEX_COUNTED = True  # 不考核灵活时长时是否仍统计灵活次数; 训练日程与 MethodVacation 相同, 不统计
+    REGULAR_WDAYS: Optional[Tuple[int, ...]] = None  # None 为每天
+    REGULAR_START = 0
+    REGULAR_END = 86400
+    REGULAR_SLOTS = True  # 是否有固定打卡日, 没有时固定打卡不计入固定次数
+    REGULAR_REQUIRED = True  # 固定打卡未达标时是否记违规
+    REGULAR_ALL_DAYS = False  # 固定打卡日须全部达标
+    REGULAR_SUMMED = False  # 与 MethodRegular 相同, 周期内全部固定打卡日的打卡秒数求和, 不少于一个时段即记 1 次
+    REGULAR_ANY_PUNCH = True  # 未设置时段时, 当天有打卡即算一次
+    EXEMPT_DAYS: frozenset = frozenset()  # 按星期几统计时跳过的日期 (当天 0 点); 窗口索引在编译时已排除
+    SLOT_INDEX: Optional[Intervals.WindowIndex] = None  # 有训练日期时, 训练日期 × 固定打卡时段的窗口索引
+    TRAIN_INDEX: Optional[Intervals.WindowIndex] = None  # 训练日期 × 训练时段的窗口索引, 每个训练日都须达标
+    TOLERANCE = 600
+
+    def __init__(self, basic_info: list, count_in_list, leave: Optional[list] = None):
+        super().__init__(basic_info, count_in_list, leave)
+        self.__slot_result: Optional[Tuple[int, int]] = None
+        self.__train_result: Optional[Tuple[int, int]] = None
+
+    def _calc_seconds(self) -> Cells.Duration:
+        return Cells.Duration(Methods.total_seconds(self._data))
+
+    def _calc_flex_count(self) -> int:
+        if self.FLEX_STANDARD is None and not self.FLEX_COUNTED:
+            return 0
+        return (int(Methods.total_seconds(self._data)) + self.TOLERANCE) // 3600
+
+    def _slot_attendance(self) -> Tuple[int, int]:
+        """(达标的固定打卡天数, 因请假免于固定打卡的天数)"""
+        if self.__slot_result is None:
+            if self.SLOT_INDEX is not None:
+                self.__slot_result = self.SLOT_INDEX.attendance(
+                    self._data, self.TOLERANCE, self._leave, any_overlap=self.REGULAR_ANY_PUNCH)
+            elif self.REGULAR_SUMMED:
+                self.__slot_result = self._summed_attendance()
+            else:
+                self.__slot_result = self._weekday_attendance()
+        return self.__slot_result
+
+    def _train_attendance(self) -> Tuple[int, int]:
+        """(达标的训练天数, 因请假免于训练的天数)"""
+        if self.__train_result is None:
+            self.__train_result = (0, 0) if self.TRAIN_INDEX is None else self.TRAIN_INDEX.attendance(
+                self._data, self.TOLERANCE, self._leave)
+        return self.__train_result
+
+    def _window_seconds(self, data) -> Dict[int, float]:
+        """按天统计固定打卡时段内的秒数, 不含 EXEMPT_DAYS"""
+        return {_day: _seconds for _day, _seconds in Methods.window_seconds(
+            data, self.REGULAR_START, self.REGULAR_END, wdays=self.REGULAR_WDAYS).items()
+            if _day not in self.EXEMPT_DAYS}
+
+    def _weekday_attendance(self) -> Tuple[int, int]:
+        """没有训练日期时按星期几逐天统计, 请假见 Methods.required_seconds"""
+        _full = self.REGULAR_END - self.REGULAR_START
+        _required = {_day: _seconds for _day, _seconds in Methods.required_seconds(
+            self._leave, self.REGULAR_START, self.REGULAR_END, wdays=self.REGULAR_WDAYS).items()
+            if _day not in self.EXEMPT_DAYS}
+        _met = sum(
+            int(_required.get(_day, _full) > 0 and (
+                self.REGULAR_ANY_PUNCH or _seconds + self.TOLERANCE >= _required.get(_day, _full)))
+            for _day, _seconds in self._window_seconds(self._data).items()
+        )
+        return _met, sum(int(__ <= 0) for __ in _required.values())
+
+    def _summed_attendance(self) -> Tuple[int, int]:
+        """REGULAR_SUMMED 时整个周期只有一次固定打卡要求, 返回 (0 或 1, 本周期是否因请假免于固定打卡)"""
+        _seconds = sum(self._window_seconds(self._data).values())
+        _required = self.REGULAR_END - self.REGULAR_START - sum(self._window_seconds(self._leave or ()).values())
+        _met = _seconds > 0 if self.REGULAR_ANY_PUNCH else _seconds + self.TOLERANCE >= _required
+        return int(_required > 0 and _met), int(_required <= 0)
+
+    def _slot_days(self) -> int:
+        """一个周期内的固定打卡天数: 有训练日期时为其中落在固定打卡星期几的天数, 否则按周统计为每周的天数"""
+        if self.SLOT_INDEX is not None:
+            return len(self.SLOT_INDEX.lengths)
+        if self.REGULAR_SUMMED:
+            return 1
+        return 7 if self.REGULAR_WDAYS is None else len(self.REGULAR_WDAYS)
+
+    def _calc_regular_count(self) -> int:
+        return (self._slot_attendance()[0] if self.REGULAR_SLOTS else 0) + self._train_attendance()[0]
+
+    def _calc_violation_count(self) -> int:
+        _cnt = 0
+        if self.FLEX_STANDARD is not None and self.flex_count() < self.FLEX_STANDARD.get(
+                str(self._info[Constant.COL_TYPE]).strip(), self.FLEX_STANDARD_DEFAULT):
+            _cnt += 1
+        if self.REGULAR_SLOTS and self.REGULAR_REQUIRED:
+            _met, _excused = self._slot_attendance()
+            if self.REGULAR_ALL_DAYS:
+                _cnt += int(_met < self._slot_days() - _excused)
+            else:
+                # 与 MethodRegular 相同, 固定打卡日全部被请假覆盖时本周期免于固定打卡
+                _cnt += int(_met == 0 and _excused < self._slot_days())
+        if self.TRAIN_INDEX is not None:
+            _met, _excused = self._train_attendance()
+            _cnt += int(_met < len(self.TRAIN_INDEX.lengths) - _excused)
+        return _cnt
+
+
+def build_method(name: str, **attrs) -> type:
+    """以 RuleMethod 的类属性 (如 FLEX_STANDARD、SLOT_INDEX) 构造子类, 供 compile_rule 与 Calendar.Schedule 使用"""
+    _unknown = [__ for __ in attrs if not hasattr(RuleMethod, __)]
+    if _unknown:
+        raise TypeError("RuleMethod 没有属性: {}".format(', '.join(_unknown)))
+    return type(name, (RuleMethod,), attrs)
+
+
+def compile_rule(spec: RuleSpec) -> type:
+    """将规则编译为 RuleMethod 子类, 可直接放入 Methods.all_methods"""
+    _train_days = spec.train_days()
+    return build_method(
+        spec.name,
+        SPEC=spec,
+        FLEX_STANDARD=dict(spec.flex_standard) if spec.flex_assessed else None,
+        FLEX_STANDARD_DEFAULT=spec.flex_default,
+        REGULAR_WDAYS=None if spec.regular in (REGULAR_NONE, REGULAR_DAILY) else tuple(spec.regular),
+        REGULAR_START=spec.regular_window[0] if spec.regular_window else 0,
+        REGULAR_END=spec.regular_window[1] if spec.regular_window else 86400,
+        REGULAR_SLOTS=spec.regular != REGULAR_NONE,
+        REGULAR_REQUIRED=spec.regular != REGULAR_NONE,
+        # 有训练日期且每天固定打卡时, 训练日期内每天都须达标
+        REGULAR_ALL_DAYS=_train_days is not None and spec.regular == REGULAR_DAILY,
+        REGULAR_ANY_PUNCH=spec.regular_window is None,
+        SLOT_INDEX=None if _train_days is None else Intervals.WindowIndex.daily(
+            [__ for __ in _train_days if spec.regular in (REGULAR_NONE, REGULAR_DAILY)
+             or Methods.local_day(__)[1] in spec.regular],
+            [spec.regular_window or (0, 86400)]),
+        TOLERANCE=spec.tolerance * 60,
+    )
+
+
+# ==== 时刻, 规则与训练日程 (Calendar) 的文本共用 ====
+
+def parse_clock(text: str) -> int:
+    """'HH:MM' 换算为一天中的第几秒"""
+    _h, _m = text.strip().split(':')
+    return int(_h) * 3600 + int(_m) * 60
+
+
+def format_clock(seconds: int) -> str:
+    return "{:02d}:{:02d}".format(seconds // 3600, seconds % 3600 // 60)
+
+
+# ==== 文本格式, 即高级设置中统计规则选项卡的格式 ====
+
+
+def parse_text(text: str, skip: Iterable[str] = ()) -> Dict[str, RuleSpec]:
+    """
+    解析规则文本, 格式为:
+        • 规则名称
+          灵活时长标准: 20                    (或 正式队员=14, 参赛队员=16, 默认=14)
+          固定打卡日期: 每天 / 周6 / 周6,周7 / 无, 可跟时段, 如 周6 12:00-17:00
+          训练时间: 2025-01-20-2025-02-05 / 间隔2天 / 2025-01-20-2025-02-05 间隔2天
+          容差分钟: 10
+
+    无法识别的行忽略, 字段缺省时取 RuleSpec 的默认值. skip 中的规则 (如界面中列出的内置办法) 整条忽略.
+    Raises:
+        ValueError: 字段值格式错误, 信息中带有规则名称
+    """
+    skip = set(skip)
+    _fields: Dict[str, dict] = {}
+    _current = None
+    for _line in text.split('\n'):
+        _line = _line.strip()
+        if _line.startswith('• '):
+            _current = _line[2:].strip()
+            if _current in skip:
+                _current = None
+            else:
+                _fields[_current] = {}
+            continue
+        if _current is None or ':' not in _line:
+            continue
+        _key, _value = (__.strip() for __ in _line.split(':', 1))
+        try:
+            if _key == '灵活时长标准':
+                if '=' in _value:
+                    _table = dict(
+                        (__.split('=')[0].strip(), int(__.split('=')[1])) for __ in _value.replace('，', ',').split(',')
+                    )
+                    _fields[_current]['flex_default'] = _table.pop(FLEX_DEFAULT_KEY, 14)
+                    _fields[_current]['flex_standard'] = _table
+                else:
+                    _fields[_current]['flex_default'] = int(_value)
+            elif _key == '固定打卡日期':
+                _days, _window = _value, ''
+                if ':' in _value:  # 带有时段
+                    _days, _, _window = _value.rpartition(' ')
+                    _days = _days.strip()
+                if _days == '每天':
+                    _fields[_current]['regular'] = REGULAR_DAILY
+                elif _days == '无':
+                    _fields[_current]['regular'] = REGULAR_NONE
+                else:
+                    _fields[_current]['regular'] = [
+                        int(__.strip().lstrip('周')) - 1 for __ in _days.replace('，', ',').split(',')
+                    ]
+                if _window:
+                    _st, _ed = _window.split('-')
+                    _fields[_current]['regular_window'] = (parse_clock(_st), parse_clock(_ed))
+            elif _key == '训练时间':
+                _range, _, _interval = _value.partition('间隔')
+                _range = _range.strip()
+                if _range.isdigit():  # 纯数字, 作为间隔天数处理
+                    _range, _interval = '', _range
+                if _range:
+                    _parts = _range.split('-')
+                    if len(_parts) != 6:
+                        raise ValueError(_range)
+                    _fields[_current]['train_range'] = (
+                        datetime(*map(int, _parts[:3])).strftime('%Y-%m-%d'),
+                        datetime(*map(int, _parts[3:])).strftime('%Y-%m-%d'),
+                    )
+                if _interval.strip():
+                    _fields[_current]['train_interval'] = int(_interval.replace('天', ''))
+            elif _key == '容差分钟':
+                _fields[_current]['tolerance'] = int(_value)
+        except (ValueError, TypeError, IndexError) as e:
+            raise ValueError("规则 {} 的 {} 格式错误: {}".format(_current, _key, _value)) from e
+    return {_name: RuleSpec(_name, **_kwargs) for _name, _kwargs in _fields.items()}
+
+
+def format_text(spec: RuleSpec) -> str:
+    """规则的文本形式, parse_text 可原样解析"""
+    if spec.flex_standard:
+        _flex = ', '.join('{}={}'.format(*__) for __ in spec.flex_standard.items())
+        _flex += ', {}={}'.format(FLEX_DEFAULT_KEY, spec.flex_default)
+    else:
+        _flex = str(spec.flex_default)
+    if spec.regular == REGULAR_DAILY:
+        _regular = '每天'
+    elif spec.regular == REGULAR_NONE:
+        _regular = '无'
+    else:
+        _regular = ','.join('周{}'.format(__ + 1) for __ in spec.regular)
+    if spec.regular_window:
+        _regular += ' {}-{}'.format(*map(format_clock, spec.regular_window))
+    _lines = ["• {}".format(spec.name), "  灵活时长标准: {}".format(_flex), "  固定打卡日期: {}".format(_regular)]
+    _train = ' '.join(filter(None, (
+        '-'.join(spec.train_range) if spec.train_range else '',
+        '间隔{}天'.format(spec.train_interval) if spec.train_interval else '',
+    )))
+    if _train:
+        _lines.append("  训练时间: {}".format(_train))
+    _lines.append("  容差分钟: {}".format(spec.tolerance))
+    return '\n'.join(_lines) + '\n'
+
+
+# ==== 保存与载入 ====
+
+def default_path() -> str:
+    """Constant.ini 中配置的规则文件路径, 为空表示不保存"""
+    return getattr(Constant, 'RULES_PATH', '')
+
+
+def load(path: Optional[str] = None) -> Dict[str, RuleSpec]:
+    path = path or default_path()
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as _file:
+        return {__['name']: RuleSpec.from_dict(__) for __ in json.load(_file)}
+
+
+def save(specs: Dict[str, RuleSpec], path: Optional[str] = None):
+    """保存全部自定义规则, 先写临时文件再改名"""
+    path = path or default_path()
+    if not path:
+        return
+    _tmp = path + '.tmp'
+    with open(_tmp, 'w', encoding='utf-8') as _file:
+        json.dump([__.to_dict() for __ in specs.values()], _file, ensure_ascii=False, indent=2)
+    os.replace(_tmp, path)
+
+
+def is_custom(method) -> bool:
+    """Methods.all_methods 中的一项是否为自定义规则; 其中也有办法类以外的项 (如 Calendar.Schedule 实例)"""
+    return isinstance(method, type) and issubclass(method, RuleMethod) and method.SPEC is not None
+
+
+def custom_specs() -> Dict[str, RuleSpec]:
+    """Methods.all_methods 中已注册的自定义规则"""
+    return {_name: _method.SPEC for _name, _method in Methods.all_methods.items() if is_custom(_method)}
+
+
+def register(specs: Dict[str, RuleSpec]) -> List[str]:
+    """
+    编译并注册到 Methods.all_methods, 与内置办法重名的规则不会覆盖内置办法
+
+    Returns:
+        注册的规则名称
+    """
+    _registered = []
+    for _name, _spec in specs.items():
+        _existing = Methods.all_methods.get(_name)
+        if _existing is not None and not is_custom(_existing):
+            continue
+        Methods.all_methods[_name] = compile_rule(_spec)
+        _registered.append(_name)
+    return _registered
+
+
+def unregister_missing(specs: Dict[str, RuleSpec]) -> List[str]:
+    """
+    从 Methods.all_methods 中移除不在 specs 中的自定义规则 (如在界面中删除的规则), 内置办法与日程不受影响
+
+    Returns:
+        移除的规则名称
+    """
+    _removed = [_name for _name, _method in Methods.all_methods.items() if is_custom(_method) and _name not in specs]
+    for _name in _removed:
+        del Methods.all_methods[_name]
+    return _removed
+
+
+def register_saved(path: Optional[str] = None) -> List[str]:
+    """载入并注册已保存的自定义规则, 文件损坏时只打印提示"""
+    try:
+        return register(load(path))
+    except (OSError, ValueError, TypeError, KeyError) as e:
+        print(f"[Rules] 载入自定义规则失败: {e}")
+        return []
@@ -6,12 +6,276 @@ ACM考勤统计系统 - Spider模块
 特点：完全动态认证，支持重试机制，延迟初始化
 """
 
+import codecs
+import re
 import requests
 import time
 import json
 import urllib3
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
+from Modulo import Anomaly
+from Modulo import Cancel
 from Modulo import Constant
+from Modulo import Intervals
+from Modulo import Paging
+from Modulo import Progress
+from Modulo import Retry
+from Modulo import Roster
+from Modulo import Trace
+
+try:  # requests 仅在安装 brotli 时才能解码 br
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+# 解码后的一条打卡记录: (打卡时间 ms, 工号, member_id), 其余字段在解析时即丢弃
+PunchRecord = Tuple[int, str, str]
+
+
+@Trace.traced("spider.pair")
+def pair_punches(punches: Dict[str, List[int]]) -> Intervals.IntervalStore:
+    """
+    将打卡时间配对为签到签退区间
+
+    Args:
+        punches: {工号: [打卡时间, ...]}, Unix 时间, 无需有序, 会被原地排序
+
+    Returns:
+        紧凑的区间存储, 用法同 {工号: [(开始时间, 结束时间), ...]}, 同一天内相邻两次打卡配成一对
+    """
+    _paired = Intervals.IntervalStore()
+    for _id, _record in punches.items():
+        _record.sort()
+
+        # 原地过滤频繁打卡
+        _pre, _j = 0, 0
+        for _i in range(len(_record)):
+            if _record[_i] - _pre >= Constant.FREQUENCY_FILTER:
+                _record[_j] = _record[_i]
+                _pre = _record[_j]
+                _j += 1
+
+        # 将同一天的打卡记录配对导出
+        _starts, _ends = [], []
+        _i = 1
+        while _i < _j:
+            _pre_tm = time.localtime(_record[_i - 1])
+            _now_tm = time.localtime(_record[_i])
+            if _pre_tm.tm_year == _now_tm.tm_year and _pre_tm.tm_yday == _now_tm.tm_yday:
+                _starts.append(_record[_i - 1])
+                _ends.append(_record[_i])
+                _i += 2
+            else:  # 过滤同一天落单的一条记录
+                _i += 1
+        _paired.add(_id, _starts, _ends)
+    return _paired
+
+
+def build_headers(org_id: Optional[str] = None) -> Dict[str, str]:
+    """
+    构建请求头, Spider 与 AsyncSpider 共用
+
+    Args:
+        org_id: 组织编号, 默认为 Constant.ORG_ID
+    """
+    return {
+        'authority': 'checkin2-app.delicloud.com',
+        'accept': 'application/json, text/plain, */*',
+        'accept-encoding': ACCEPT_ENCODING,
+        'accept-language': 'zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6',
+        'client_id': 'eplus_web',
+        'content-type': 'application/json;charset=UTF-8',
+        'Authorization': f'Bearer {Constant.AUTH_CODE}',
+        'member_id': str(Constant.AUTH_ID),
+        'org_id': str(org_id or Constant.ORG_ID),
+        'origin': 'https://v2-eapp.delicloud.com',
+        'sec-ch-ua': '"Chromium";v="118", "Microsoft Edge";v="118", "Not=A?Brand";v="99"',
+        'sec-ch-ua-mobile': '?0',
+        'sec-ch-ua-platform': '"Windows"',
+        'sec-fetch-dest': 'empty',
+        'sec-fetch-mode': 'cors',
+        'sec-fetch-site': 'same-site',
+        'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36 Edg/118.0.2088.61',
+        'x-service-id': 'ass-integration',
+    }
+
+
+def build_request_data(page: int, size: int, start_time: int, end_time: int,
+                       org_id: Optional[str] = None, member_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    构建请求数据, Spider 与 AsyncSpider 共用
+
+    Args:
+        page: 页码
+        size: 每页大小
+        start_time, end_time: 查询时间范围, Unix 时间 (秒)
+        org_id: 组织编号, 默认为 Constant.ORG_ID
+        member_ids: 仅获取这些成员 (接口 member_id), 为空时获取 Constant.DEPT_IDS 部门或全组织
+    """
+    return {
+        'org_id': org_id or Constant.ORG_ID,
+        'page': page,
+        'size': size,
+        'start_time': start_time * 1000,  # 转换为毫秒
+        'end_time': end_time * 1000,      # 转换为毫秒
+        'dept_ids': [] if member_ids else list(getattr(Constant, 'DEPT_IDS', [])),
+        'member_ids': list(member_ids or []),
+    }
+
+
+def unwrap_response(response_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    检查API业务状态码并取出 data, 业务错误重试无益, 抛出不可重试的 Retry.ApiError
+    """
+    if response_data.get("code") != 0:
+        api_error = response_data.get('msg', '未知错误')
+        raise Retry.ApiError(f"API业务错误: {api_error}")
+    return response_data.get("data", {})
+
+
+def _project_record(obj: Dict[str, Any]):
+    """
+    json 的 object_hook, 在解析过程中自内向外逐个对象调用
+
+    checkin_extra_data 先被压缩为工号字符串, 外层打卡记录再被压缩为 PunchRecord,
+    因此完整的记录字典解析完即被丢弃, 不会随页驻留内存.
+    """
+    if 'check_in_time' in obj:
+        _extra = obj.get('checkin_extra_data')
+        if isinstance(_extra, dict):
+            _extra = _extra.get('employee_num')
+        _member_id = obj.get('member_id')
+        return int(obj['check_in_time']), _extra or '', '' if _member_id is None else str(_member_id)
+    if 'employee_num' in obj:
+        return obj['employee_num']
+    return obj
+
+
+def decode_response(body: bytes) -> Dict[str, Any]:
+    """
+    解析 record/search 的响应, 记录在解析时即投影为 PunchRecord
+
+    Raises:
+        json.JSONDecodeError: 响应不是合法 JSON
+    """
+    return json.loads(body, object_hook=_project_record)
+
+
+class StreamDecoder:
+    """
+    增量解析 record/search 的响应: 边接收边解析, 记录数组中的每条记录一完整即投影为 PunchRecord
+
+    缓冲区只保留尚未解析完的一条记录以及数组之前、之后的少量字段, 内存不随页大小增长;
+    响应中没有记录数组 (如业务错误) 时退化为整体解析. 用法:
+        decoder = StreamDecoder()
+        for chunk in response.iter_content(...): decoder.feed(chunk)
+        data = decoder.finish()
+    """
+    _ARRAY = re.compile(r'"(records|rows)"\s*:\s*\[')
+    _SKIP = re.compile(r'[\s,]*')
+
+    def __init__(self):
+        self.nbytes = 0  # 已接收的 (解压后) 字节数
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._decoder = json.JSONDecoder(object_hook=_project_record)
+        self._buffer = ''
+        self._head: Optional[str] = None  # 记录数组之前的文本 (含 '['), 找到数组后才设置
+        self._key: Optional[str] = None
+        self._closed = False  # 记录数组是否已结束
+        self.records: List[PunchRecord] = []
+
+    def feed(self, chunk: bytes):
+        self.nbytes += len(chunk)
+        self._buffer += self._text.decode(chunk)
+        if self._head is None:
+            _match = self._ARRAY.search(self._buffer)
+            if _match is None:
+                return
+            self._head, self._key = self._buffer[:_match.end()], _match.group(1)
+            self._buffer = self._buffer[_match.end():]
+        if not self._closed:
+            self._drain()
+
+    def _drain(self):
+        """解析缓冲区中已完整的记录, 不完整的最后一条留待下一块"""
+        _pos = 0
+        while True:
+            _pos = self._SKIP.match(self._buffer, _pos).end()
+            if _pos == len(self._buffer):
+                break
+            if self._buffer[_pos] == ']':
+                self._closed = True
+                break
+            try:
+                _record, _pos_next = self._decoder.raw_decode(self._buffer, _pos)
+            except json.JSONDecodeError:
+                break  # 记录尚未接收完整
+            self.records.append(_record)
+            _pos = _pos_next
+        self._buffer = self._buffer[_pos:]
+
+    def finish(self) -> Dict[str, Any]:
+        """
+        接收完毕, 返回与 decode_response 相同的结果
+
+        Raises:
+            json.JSONDecodeError: 响应不是合法 JSON, 如被截断
+        """
+        try:
+            self._buffer += self._text.decode(b'', final=True)
+        except UnicodeDecodeError as e:  # 截断在多字节字符中间
+            raise json.JSONDecodeError("响应不完整: {}".format(e), self._buffer, len(self._buffer)) from e
+        if self._head is None:
+            return json.loads(self._buffer, object_hook=_project_record)
+        if not self._closed:
+            self._drain()
+            if not self._closed:
+                raise json.JSONDecodeError("记录数组不完整", self._buffer, 0)
+        _data = json.loads(self._head + self._buffer, object_hook=_project_record)
+        _holder = _data.get('data') if isinstance(_data.get('data'), dict) else _data
+        _holder[self._key] = self.records
+        return _data
+
+
+def wire_size(headers, nbytes: int) -> Optional[int]:
+    """
+    响应实际传输的 (压缩后) 字节数, 用于不能从原始流计数的客户端 (AsyncSpider, SpiderDynamic)
+
+    Content-Length 为压缩后的大小; 缺少时, 未压缩的响应即为解压后的大小 nbytes, 压缩的响应无从得知, 返回 None
+    """
+    _length = headers.get('Content-Length')
+    if _length:
+        return int(_length)
+    if headers.get('Content-Encoding', 'identity').strip().lower() == 'identity':
+        return nbytes
+    return None
+
+
+@Trace.traced("spider.collect")
+def collect_punches(records: List[PunchRecord], punches: Dict[Any, List[int]], key=None,
+                    member_ids: Optional[Dict[str, str]] = None) -> int:
+    """
+    将一页记录按工号归并到 punches, 过滤无编号人员
+
+    Args:
+        records: decode_response 投影后的一页记录
+        punches: {工号: [打卡时间, ...]}, 原地追加
+        key: 由工号生成 punches 键的函数, 默认直接使用工号
+        member_ids: 若给出, 顺便记录 {工号: member_id}, 供 Roster 学习映射
+
+    Returns:
+        有效记录数
+    """
+    _count = 0
+    for check_in_time, employee_num, member_id in records:
+        employee_num = employee_num.strip().upper()
+        if employee_num:
+            punches.setdefault(key(employee_num) if key else employee_num, []).append(check_in_time // 1000)
+            if member_ids is not None and member_id:
+                member_ids[employee_num] = member_id
+            _count += 1
+    return _count
 
 
 class Spider:
@@ -20,32 +284,52 @@ class Spider:
     
     主要功能：
     1. 从得力云API获取考勤记录
-    2. 支持分页获取大量数据
+    2. 支持分页获取大量数据，页大小按实测耗时自适应调整
     3. 自动重试和错误处理
     4. 延迟初始化，避免不必要的网络请求
     """
     
-    def __init__(self, start_time: float, end_time: float):
+    def __init__(self, start_time: float, end_time: float,
+                 progress: Optional[Progress.ProgressReporter] = None,
+                 cancel: Optional[Cancel.CancelToken] = None,
+                 roster: Optional[List[str]] = None):
         """
         初始化Spider
         
         Args:
             start_time: 开始时间戳（Unix时间）
             end_time: 结束时间戳（Unix时间）
+            progress: 进度上报队列，为 None 时不上报
+            cancel: 取消令牌，每页之间与重试等待期间检查
+            roster: 名单工号，给出时按 member_ids 分批过滤获取，为 None 时获取全组织
         """
         # 时间范围（查询的最小粒度为10分钟）
         self.start_time = int(start_time) // 600 * 600
         self.end_time = (int(end_time) + 1) // 600 * 600 - 1
         self.TimeRange = (self.start_time, self.end_time)
         
-        # 存储考勤记录 {工号: [记录列表]}
-        self.MemberClockinRecords: Dict[str, List[Dict[str, Any]]] = {}
+        # 存储考勤记录，用法同 {工号: [(开始时间, 结束时间), ...]}，与 SpiderDynamic 一致
+        self.MemberClockinRecords: Intervals.IntervalStore = Intervals.IntervalStore()
+        
+        # 进度上报与取消
+        self.progress = progress
+        self.cancel = cancel
+        
+        # 名单, 只获取名单成员的打卡
+        self.roster = roster
         
         # 延迟初始化标志
         self._initialized = False
         
+        # 自适应页大小与吞吐量统计
+        self.page_tuner = Paging.PageSizeTuner()
+        self.telemetry = Paging.FetchTelemetry()
+        self.anomalies: Optional[Anomaly.AnomalyReport] = None  # ANOMALY_REPORT 开启时的可疑打卡报告
+        self.last_response = (0.0, 0, 0)  # 最近一次成功请求的 (耗时, 解压后字节数, 传输字节数)
+        
         # 请求配置
-        self.max_retries = getattr(Constant, 'MAX_RETRIES', 5)
+        self.retry_policy = Retry.RetryPolicy()
+        self.breaker = Retry.CircuitBreaker()
         self.timeout = getattr(Constant, 'SSL_TIMEOUT', 60)
         self.verify_ssl = getattr(Constant, 'VERIFY_SSL', False)
         
@@ -53,12 +337,12 @@ class Spider:
         if not self.verify_ssl:
             urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
     
-    def get_member_records(self) -> Dict[str, List[Dict[str, Any]]]:
+    def get_member_records(self) -> Intervals.IntervalStore:
         """
         获取成员考勤记录（延迟加载）
         
         Returns:
-            考勤记录字典 {工号: [记录列表]}
+            考勤记录，用法同 {工号: [(开始时间, 结束时间), ...]}
         """
         self._ensure_initialized()
         return self.MemberClockinRecords
@@ -76,181 +360,231 @@ class Spider:
         Returns:
             完整的请求头字典
         """
-        return {
-            'authority': 'checkin2-app.delicloud.com',
-            'accept': 'application/json, text/plain, */*',
-            'accept-language': 'zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6',
-            'client_id': 'eplus_web',
-            'content-type': 'application/json;charset=UTF-8',
-            'Authorization': f'Bearer {Constant.AUTH_CODE}',
-            'member_id': str(Constant.AUTH_ID),
-            'org_id': str(Constant.ORG_ID),
-            'origin': 'https://v2-eapp.delicloud.com',
-            'sec-ch-ua': '"Chromium";v="118", "Microsoft Edge";v="118", "Not=A?Brand";v="99"',
-            'sec-ch-ua-mobile': '?0',
-            'sec-ch-ua-platform': '"Windows"',
-            'sec-fetch-dest': 'empty',
-            'sec-fetch-mode': 'cors',
-            'sec-fetch-site': 'same-site',
-            'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36 Edg/118.0.2088.61',
-            'x-service-id': 'ass-integration',
-        }
+        return build_headers()
     
-    def _build_request_data(self, page: int, size: int) -> Dict[str, Any]:
+    def _build_request_data(self, page: int, size: int, member_ids: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         构建请求数据
         
         Args:
             page: 页码
             size: 每页大小
+            member_ids: 仅获取这些成员
             
         Returns:
             请求数据字典
         """
-        return {
-            'org_id': Constant.ORG_ID,
-            'page': page,
-            'size': size,
-            'start_time': self.start_time * 1000,  # 转换为毫秒
-            'end_time': self.end_time * 1000,      # 转换为毫秒
-            'dept_ids': [],
-            'member_ids': [],
-        }
+        return build_request_data(page, size, self.start_time, self.end_time, member_ids=member_ids)
     
-    def _make_request(self, page: int, size: int) -> Dict[str, Any]:
+    @Trace.traced("spider.request")
+    def _make_request(self, page: int, size: int, retry_timeout: bool = True,
+                      member_ids: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         发送API请求
         
         Args:
             page: 页码
             size: 每页大小
+            retry_timeout: 超时是否原地重试; 为 False 时立即抛出, 由调用方减小页大小
+            member_ids: 仅获取这些成员
             
         Returns:
-            API响应数据
+            API响应数据, 其中记录已投影为 PunchRecord; 本次请求的耗时与响应大小记录在 self.last_response
             
         Raises:
-            requests.RequestException: 请求失败时抛出
+            requests.RequestException: 请求失败时抛出; 认证失败等致命错误不重试, 为 Retry.ApiError
         """
         headers = self._build_headers()
-        data = self._build_request_data(page, size)
+        data = self._build_request_data(page, size, member_ids)
         
         # 创建会话
         session = requests.Session()
         
-        # 重试机制
-        last_exception = None
-        for attempt in range(self.max_retries + 1):
+        # 重试机制: 仅重试超时、连接错误、429 与 5xx, 认证失败等致命错误立即抛出
+        attempt = 0
+        while True:
             try:
-                print(f"[Spider] 发送请求 第{page}页 (尝试 {attempt + 1}/{self.max_retries + 1})")
+                self.breaker.before_request()
+                print(f"[Spider] 发送请求 第{page}页 (尝试 {attempt + 1}/{self.retry_policy.max_retries + 1})")
                 
+                request_start = time.monotonic()
                 response = session.post(
                     Constant.REMOTE_URL,
                     headers=headers,
                     json=data,
                     verify=self.verify_ssl,
                     timeout=self.timeout,
+                    stream=True,
                 )
                 
                 # 检查HTTP状态码
                 if response.status_code != 200:
-                    error_msg = f"HTTP错误: {response.status_code}"
-                    if response.status_code == 401:
-                        error_msg += " (认证失败，请检查AUTH_CODE、AUTH_ID、ORG_ID)"
-                    elif response.status_code == 403:
-                        error_msg += " (权限不足)"
-                    elif response.status_code == 500:
-                        error_msg += " (服务器内部错误)"
-                    
-                    raise requests.RequestException(error_msg)
+                    response.close()
+                    raise Retry.ApiError.from_status(
+                        response.status_code, Retry.parse_retry_after(response.headers.get('Retry-After')))
                 
-                # 解析JSON响应
+                # 分块读取、解压并增量解析, 不在内存中拼出整个响应; raw.tell() 为实际传输的 (压缩后) 字节数.
+                # 响应被截断时值得重试
+                decoder = StreamDecoder()
                 try:
-                    response_data = response.json()
+                    with Trace.span("spider.decode"):
+                        for chunk in response.iter_content(64 * 1024):
+                            decoder.feed(chunk)
+                        response_data = decoder.finish()
+                    wire_bytes = response.raw.tell()
                 except json.JSONDecodeError as e:
-                    raise requests.RequestException(f"JSON解析失败: {e}, 响应内容: {response.text[:200]}")
-                
-                # 检查API业务状态码
-                if response_data.get("code") != 0:
-                    api_error = response_data.get('msg', '未知错误')
-                    raise requests.RequestException(f"API业务错误: {api_error}")
+                    raise Retry.ApiError(f"JSON解析失败: {e}, 已接收 {decoder.nbytes} 字节", retryable=True)
+                finally:
+                    response.close()
                 
-                return response_data.get("data", {})
+                result = unwrap_response(response_data)
+                self.breaker.record_success()
+                self.last_response = (time.monotonic() - request_start, decoder.nbytes, wire_bytes)
+                Trace.count("spider.bytes", decoder.nbytes)
+                Trace.count("spider.wire_bytes", wire_bytes)
+                return result
                 
-            except (requests.exceptions.SSLError, 
-                    requests.exceptions.ConnectionError, 
-                    requests.exceptions.Timeout, 
-                    requests.exceptions.RequestException) as e:
-                last_exception = e
+            except requests.RequestException as e:
+                self.breaker.record_failure(e)
                 
-                if attempt < self.max_retries:
-                    wait_time = 2 ** attempt  # 指数退避
-                    print(f"[Spider] 请求失败: {e}, {wait_time}秒后重试...")
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    print(f"[Spider] 所有重试都失败了，最后异常: {e}")
+                if isinstance(e, requests.exceptions.Timeout) and not retry_timeout:
+                    print(f"[Spider] 请求超时: {e}")
                     raise
-        
-        # 如果所有重试都失败
-        if last_exception:
-            raise last_exception
+                if self.breaker.is_open and not isinstance(e, Retry.CircuitOpen):
+                    print(f"[Spider] 服务端连续错误，熔断 {self.breaker.cooldown:.0f} 秒: {e}")
+                    raise
+                if not self.retry_policy.should_retry(e, attempt):
+                    if self.retry_policy.is_retryable(e):
+                        print(f"[Spider] 所有重试都失败了，最后异常: {e}")
+                    else:
+                        print(f"[Spider] 请求失败且不可重试: {e}")
+                    raise
+                wait_time = self.retry_policy.delay(e, attempt)
+                print(f"[Spider] 请求失败: {e}, {wait_time:.1f}秒后重试...")
+                Cancel.sleep(self.cancel, wait_time)
+                attempt += 1
     
     def _fetch_all_data(self):
         """
-        获取所有考勤数据（分页处理）
+        获取所有考勤数据（分页处理），并按工号配对为签到签退区间
+        
+        给出名单且名单工号的 member_id 均已知时，按 member_ids 分批获取；否则全量获取一次并学习映射
         """
         print(f"[Spider] 开始获取考勤数据，时间范围: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.start_time))} 至 {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.end_time))}")
         
-        page = 1
-        page_size = 100
-        total_records = 0
+        punches: Dict[str, List[int]] = {}
+        seen: Dict[str, str] = {}  # 全量获取时见到的 {工号: member_id}
+        member_map = None
+        batches: List[Optional[List[str]]] = [None]
+        if self.roster is not None:
+            member_map = Roster.MemberMap()
+            member_ids, unresolved, misses = member_map.resolve(self.roster)
+            if unresolved:
+                # 全量获取已包含已解析的成员, 不再重复按名单获取
+                print(f"[Spider] 名单中 {len(unresolved)} 个工号尚无 member_id 映射或未命中已过期，本次全量获取")
+            else:
+                batches = Roster.batches(member_ids)
+                print(f"[Spider] 按名单过滤获取 {len(member_ids)} 个成员，共 {len(batches)} 批")
+                if misses:
+                    print(f"[Spider] {len(misses)} 个工号在最近的全量获取中没有打卡，"
+                          f"{member_map.refresh / 3600:.0f} 小时内不获取: {', '.join(misses[:10])}"
+                          f"{' 等' if len(misses) > 10 else ''}")
         
         try:
-            while True:
-                print(f"[Spider] 正在获取第 {page} 页数据...")
-                
-                # 获取当前页数据
-                data = self._make_request(page, page_size)
-                records = data.get('records', [])
-                
-                if not records:
-                    print(f"[Spider] 第 {page} 页无数据，停止获取")
-                    break
-                
-                # 处理当前页记录
-                page_records = 0
-                for record in records:
-                    member_id = record.get('member_id', '')
-                    if member_id:
-                        if member_id not in self.MemberClockinRecords:
-                            self.MemberClockinRecords[member_id] = []
-                        self.MemberClockinRecords[member_id].append(record)
-                        page_records += 1
-                        total_records += 1
-                
-                print(f"[Spider] 第 {page} 页获取到 {page_records} 条记录")
-                
-                # 检查是否还有更多数据
-                if len(records) < page_size:
-                    print(f"[Spider] 第 {page} 页数据不足 {page_size} 条，已到最后一页")
-                    break
-                
-                page += 1
-                
-                # 防止无限循环
-                if page > 100:
-                    print("[Spider] 警告：分页过多，可能存在数据问题，停止获取")
-                    break
-                
-                # 避免请求过于频繁
-                time.sleep(0.1)
+            total_records = 0
+            fetched = 0
+            for batch in batches:
+                batch_records, batch_rows = self._fetch_pages(
+                    batch, punches, seen if batch is None else None, fetched, len(batches) == 1)
+                total_records += batch_records
+                fetched += batch_rows
             
+            if member_map is not None and batches == [None]:
+                member_map.learn(self.roster, seen)
+            if getattr(Constant, 'ANOMALY_REPORT', False):
+                with Trace.span("anomaly.detect", members=len(punches)):
+                    self.anomalies = Anomaly.detect(punches)  # 配对会原地过滤重复打卡, 须在配对前检测
+                print(f"[Spider] 可疑打卡 {len(self.anomalies)} 项:\n{self.anomalies.describe()}")
+            self.MemberClockinRecords = pair_punches(punches)
             print(f"[Spider] 数据获取完成，共获取 {total_records} 条记录，涉及 {len(self.MemberClockinRecords)} 个成员")
+            print(f"[Spider] 吞吐量: {self.telemetry.describe()}")
             
+        except Cancel.Cancelled:
+            print("[Spider] 获取数据已取消")
+            raise
         except Exception as e:
             print(f"[Spider] 获取数据失败: {e}")
             raise
     
+    def _fetch_pages(self, member_ids: Optional[List[str]], punches: Dict[str, List[int]],
+                     seen: Optional[Dict[str, str]], fetched: int, report_total: bool) -> Tuple[int, int]:
+        """
+        分页获取一批成员 (member_ids 为 None 时为全组织) 的记录, 归并到 punches
+        
+        Args:
+            seen: 若给出, 记录见到的 {工号: member_id}
+            fetched: 之前各批已获取的行数, 用于进度上报
+            report_total: 是否上报总行数, 分多批时总行数未知
+        
+        Returns:
+            (有效记录数, 获取的行数)
+        """
+        requests_made = 0
+        offset = 0  # 已获取的行数, 换页大小时据此换算页码
+        total_rows = None
+        total_records = 0
+        while True:
+            Cancel.check(self.cancel)
+            page_size = self.page_tuner.page_for(offset)
+            page = offset // page_size + 1
+            print(f"[Spider] 正在获取第 {page} 页数据 (页大小 {page_size})...")
+            
+            # 获取当前页数据, 超时时先减小页大小再重试
+            try:
+                data = self._make_request(page, page_size, retry_timeout=page_size <= self.page_tuner.min_size,
+                                          member_ids=member_ids)
+            except requests.exceptions.Timeout:
+                self.telemetry.timeouts += 1
+                if not self.page_tuner.on_timeout(page_size):
+                    raise
+                print(f"[Spider] 页大小 {page_size} 超时，减小为 {self.page_tuner.size}")
+                continue
+            requests_made += 1
+            records = data.get('records') or data.get('rows') or []
+            Trace.count("spider.rows", len(records))
+            if total_rows is None and data.get('total'):
+                total_rows = int(data['total'])
+            
+            if not records:
+                print(f"[Spider] 第 {page} 页无数据，停止获取")
+                break
+            
+            # 处理当前页记录，按工号归并打卡时间
+            page_records = collect_punches(records, punches, member_ids=seen)
+            total_records += page_records
+            
+            offset += len(records)
+            seconds, nbytes, wire_bytes = self.last_response
+            print(f"[Spider] 第 {page} 页获取到 {page_records} 条记录 · "
+                  f"{self.telemetry.record(page_size, len(records), seconds, nbytes, wire_bytes)}")
+            Progress.emit(self.progress, Progress.STAGE_FETCH, fetched + offset,
+                          total_rows if report_total else None)
+            
+            # 检查是否还有更多数据
+            if len(records) < page_size:
+                print(f"[Spider] 第 {page} 页数据不足 {page_size} 条，已到最后一页")
+                break
+            self.page_tuner.observe(page_size, len(records), seconds, nbytes)
+            
+            # 防止无限循环
+            if requests_made >= 100:
+                print("[Spider] 警告：分页过多，可能存在数据问题，停止获取")
+                break
+            
+            # 避免请求过于频繁
+            Cancel.sleep(self.cancel, 0.1)
+        return total_records, offset
+    
     def get_summary(self) -> Dict[str, Any]:
         """
         获取数据摘要信息
@@ -261,7 +595,7 @@ class Spider:
         self._ensure_initialized()
         
         total_members = len(self.MemberClockinRecords)
-        total_records = sum(len(records) for records in self.MemberClockinRecords.values())
+        total_records = self.MemberClockinRecords.interval_count()
         
         return {
             'total_members': total_members,
@@ -270,7 +604,8 @@ class Spider:
                 'start': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.start_time)),
                 'end': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.end_time))
             },
-            'member_ids': list(self.MemberClockinRecords.keys())
+            'member_ids': list(self.MemberClockinRecords.keys()),
+            'telemetry': self.telemetry.summary(),
         }
     
     def validate_authentication(self) -> bool:
@@ -285,7 +620,7 @@ class Spider:
             test_data = self._make_request(1, 1)
             return True
         except requests.RequestException as e:
-            if '401' in str(e) or '认证失败' in str(e):
+            if getattr(e, 'status', None) == 401 or '认证失败' in str(e):
                 print(f"[Spider] 认证验证失败: {e}")
                 return False
             else:
@@ -2,6 +2,8 @@ import json
 import time
 import requests
 from Modulo import Constant
+from Modulo import Intervals
+from Modulo import Spider
 
 
 class SpiderDynamic:
@@ -11,8 +13,8 @@ class SpiderDynamic:
         ed = (int(ed) + 1) // 600 * 600 - 1
         self.TimeRange = st, ed
 
-        # 打卡记录. {工号: [(开始时间, 结束时间), ...]}, Unix 时间
-        self.MemberClockinRecords = {}
+        # 打卡记录. 用法同 {工号: [(开始时间, 结束时间), ...]}, Unix 时间, 见 Modulo.Intervals
+        self.MemberClockinRecords = Intervals.IntervalStore()
         
         # 动态认证信息
         self.auth_code = auth_code or Constant.AUTH_CODE
@@ -26,6 +28,7 @@ class SpiderDynamic:
         return {
             'authority': 'checkin2-app.delicloud.com',
             'accept': 'application/json, text/plain, */*',
+            'accept-encoding': Spider.ACCEPT_ENCODING,
             'accept-language': 'zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6',
             'authorization': self.auth_code,
             'client_id': 'eplus_web',
@@ -73,6 +76,7 @@ class SpiderDynamic:
             ))
 
         try:
+            _request_start = time.monotonic()
             _response = requests.post(
                 Constant.REMOTE_URL,
                 headers=headers,
@@ -103,8 +107,15 @@ class SpiderDynamic:
                 
                 raise requests.RequestException('Unexpected Status Code: {}'.format(_response.status_code))
                 
-            _response.encoding = 'utf-8'
-            _data = json.loads(_response.text)
+            _data = Spider.decode_response(_response.content)  # 记录在解析时即投影为 Spider.PunchRecord
+            _seconds = time.monotonic() - _request_start
+            _wire_bytes = Spider.wire_size(_response.headers, len(_response.content))
+            if _wire_bytes is None:  # 压缩且没有 Content-Length, 传输量未知
+                print("请求用时 {:.2f}s, 传输量未知, 解压后 {:.1f} KB".format(_seconds, len(_response.content) / 1024))
+            else:
+                print("请求用时 {:.2f}s, 传输 {:.1f} KB, 解压后 {:.1f} KB, {:.1f} KB/s".format(
+                    _seconds, _wire_bytes / 1024, len(_response.content) / 1024,
+                    _wire_bytes / 1024 / max(_seconds, 1e-6)))
             
             if _data["code"] != 0:
                 print(f"API返回错误: {_data['msg']}")
@@ -132,42 +143,11 @@ class SpiderDynamic:
         # 获取原始数据
         _data = self._requests(1, 100000000)["rows"]  # 最多获取 1e8 条记录
 
-        # 数据整合
-        for _item in _data:
-            # _id = _item["member_name"]  # 人员主键
-            _id = _item["checkin_extra_data"]["employee_num"].strip().upper()  # 人员主键
-            if _id == '':  # 过滤无编号人员
-                continue
-            _time = int(_item["check_in_time"]) // 1000
-            if _id not in _records:
-                _records[_id] = []
-            _records[_id].append(_time)
+        # 数据整合, 过滤无编号人员
+        Spider.collect_punches(_data, _records)
 
-        # 数据处理
-        for _id, _record in _records.items():
-            _record.sort()
-
-            # 原地过滤频繁打卡
-            _pre, _j = 0, 0
-            for _i in range(len(_record)):
-                if _record[_i] - _pre >= Constant.FREQUENCY_FILTER:
-                    _record[_j] = _record[_i]
-                    _pre = _record[_j]
-                    _j += 1
-            # _record = _record[:_j]  # 目前注释掉也无妨
-
-            # 将同一天的打卡记录配对导出
-            _i = 1
-            while _i < _j:
-                _pre_tm = time.localtime(_record[_i - 1])
-                _now_tm = time.localtime(_record[_i])
-                if _pre_tm.tm_year == _now_tm.tm_year and _pre_tm.tm_yday == _now_tm.tm_yday:
-                    if _id not in self.MemberClockinRecords:
-                        self.MemberClockinRecords[_id] = []
-                    self.MemberClockinRecords[_id].append((_record[_i - 1], _record[_i]))
-                    _i += 2
-                else:  # 过滤同一天落单的一条记录
-                    _i += 1
+        # 数据处理: 过滤频繁打卡并将同一天的打卡记录配对导出
+        self.MemberClockinRecords = Spider.pair_punches(_records)
 
 
 # 测试程序
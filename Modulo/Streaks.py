@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ACM考勤统计系统 - Streaks模块
+功能：跨周期的考勤分析: 最近几个周期 (默认 4 个, 按周统计即 4 周) 的滚动时长、连续达到灵活时长标准的周期数, 以及排行榜
+特点：增量维护, 每计入一个新周期只更新一次每名成员的状态, O(成员数), 不重新扫描历史;
+     状态与周期记录一起保存在历史仓库 (Modulo.Warehouse) 中, 下次运行继续累积
+"""
+
+import heapq
+import json
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from Modulo import Constant
+from Modulo import Methods
+
+
+class MemberStreak:
+    """
+    一名成员的跨周期状态
+
+    Attributes:
+        member: 工号
+        recent: 最近 STREAK_WINDOW 个周期各自的打卡秒数, 由旧到新
+        current: 截至最近一个周期的连续达标周期数
+        longest: 历史最长连续达标周期数
+        met: 累计达标周期数
+    """
+    __slots__ = ("member", "recent", "current", "longest", "met")
+
+    def __init__(self, member: str, recent: Optional[List[int]] = None, current: int = 0, longest: int = 0,
+                 met: int = 0):
+        self.member = member
+        self.recent = recent or []
+        self.current = current
+        self.longest = longest
+        self.met = met
+
+    @property
+    def rolling_seconds(self) -> int:
+        """最近 STREAK_WINDOW 个周期的打卡总秒数"""
+        return sum(self.recent)
+
+    def push(self, seconds: int, met: bool, window: int):
+        """计入一个新周期"""
+        self.recent.append(int(seconds))
+        del self.recent[:-window]
+        if met:
+            self.current += 1
+            self.met += 1
+            self.longest = max(self.longest, self.current)
+        else:
+            self.current = 0
+
+    def to_row(self) -> Tuple[str, str, int, int, int]:
+        return self.member, json.dumps(self.recent), self.current, self.longest, self.met
+
+    @classmethod
+    def from_row(cls, row: Tuple[str, str, int, int, int]) -> "MemberStreak":
+        return cls(row[0], json.loads(row[1]), row[2], row[3], row[4])
+
+
+def is_met(method_cls, score) -> bool:
+    """
+    该周期是否达标: 办法考核灵活时长时为灵活次数不低于成员类别的标准, 否则 (如假期办法, 或 FLEX_STANDARD 为 None)
+    为没有新增违规
+
+    Args:
+        method_cls: Methods.all_methods 中的办法类
+        score: Pipeline.ScoreRow
+    """
+    _standard = getattr(method_cls, 'FLEX_STANDARD', None)
+    if _standard is None:
+        return score.violation_count == 0
+    return score.flex_count >= _standard.get(str(score.type).strip(), method_cls.FLEX_STANDARD_DEFAULT)
+
+
+def load(warehouse) -> Dict[str, MemberStreak]:
+    """读取仓库中的全部成员状态"""
+    return {__[0]: MemberStreak.from_row(__) for __ in warehouse.streaks()}
+
+
+def update(warehouse, period: Tuple[int, int], method_todo: str, scores: Iterable) -> Optional[Dict[str, MemberStreak]]:
+    """
+    将一个周期的结果计入跨周期状态并保存
+
+    本周期没有出现的已知成员按 0 秒、未达标计入, 因此连续记录会中断.
+    周期不晚于上一次计入的周期 (重复统计或补录旧周期) 时不做修改, 以免重复累加.
+
+    Args:
+        warehouse: 已打开的 Warehouse.Warehouse
+        period: 周期 (开始时间, 结束时间), Unix 时间
+        method_todo: Methods.all_methods 中的集训队管理办法名称
+        scores: Pipeline.ScoreRow 序列
+
+    Returns:
+        更新后的 {工号: MemberStreak}; 周期已计入时为 None
+    """
+    _last = warehouse.last_streak_period()
+    if _last is not None and int(period[1]) <= _last[1]:
+        return None
+    _window = getattr(Constant, 'STREAK_WINDOW', 4)
+    _method_cls = Methods.all_methods[method_todo]
+    _states = load(warehouse)
+    _seen = set()
+    for _score in scores:
+        _state = _states.get(_score.member)
+        if _state is None:
+            _state = _states[_score.member] = MemberStreak(_score.member)
+        _state.push(_score.total_seconds, is_met(_method_cls, _score), _window)
+        _seen.add(_score.member)
+    for _id, _state in _states.items():
+        if _id not in _seen:
+            _state.push(0, False, _window)
+    warehouse.store_streaks(period, (__.to_row() for __ in _states.values()))
+    return _states
+
+
+def leaderboard(states: Dict[str, MemberStreak], top: Optional[int] = None) -> List[MemberStreak]:
+    """按滚动时长降序, 其次按当前连续周期数降序的前 top 名"""
+    top = top or getattr(Constant, 'LEADERBOARD_TOP', 10)
+    return heapq.nsmallest(top, states.values(), key=lambda __: (-__.rolling_seconds, -__.current, __.member))
+
+
+def describe(states: Dict[str, MemberStreak], top: Optional[int] = None, names: Optional[Dict[str, str]] = None) -> str:
+    names = names or {}
+    return "\n".join(
+        "{:>2}. {} · 近 {} 个周期 {:.1f} 小时 · 连续达标 {} (最长 {})".format(
+            _rank, "{} {}".format(_state.member, names.get(_state.member, "")).strip(), len(_state.recent),
+            _state.rolling_seconds / 3600, _state.current, _state.longest)
+        for _rank, _state in enumerate(leaderboard(states, top), 1)
+    )
+
+
+# 命令行查看排行榜:
+#   python -m Modulo.Streaks [名次数]
+if __name__ == '__main__':
+    from Modulo import Warehouse
+    if not Warehouse.default_path():
+        print("Constant.ini 未配置 WAREHOUSE_PATH")
+        sys.exit(1)
+    with Warehouse.Warehouse() as _warehouse:
+        _states = load(_warehouse)
+    print(describe(_states, int(sys.argv[1]) if len(sys.argv) > 1 else None) if _states else "尚未计入任何周期")
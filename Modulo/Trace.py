@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ACM考勤统计系统 - Trace模块
+功能：统计流水线各阶段的轻量计时: 可嵌套的 span、计数器, 每个 span 记录墙钟时间与线程 CPU 时间
+特点：未开启时 span 返回共享的空上下文, 几乎没有开销; 每次统计结束时打印汇总表并写出 Chrome trace JSON
+     (可在 chrome://tracing 或 https://ui.perfetto.dev 中打开)
+"""
+
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from Modulo import Constant
+
+_tracer: Optional["Tracer"] = None  # 当前统计的 Tracer, 未开启时为 None
+_enabled: Optional[bool] = None  # 运行时开关, None 表示按 Constant.TRACE
+
+
+class _NullSpan:
+    """未开启时使用的空 span"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "args", "start", "cpu", "child")
+
+    def __init__(self, tracer: "Tracer", name: str, args: dict):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.child = 0.0  # 子 span 的墙钟时间, 用于计算自身时间
+
+    def __enter__(self):
+        self.tracer._stack().append(self)
+        self.cpu = time.thread_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _wall = time.perf_counter() - self.start
+        _cpu = time.thread_time() - self.cpu
+        _stack = self.tracer._stack()
+        _stack.pop()
+        if _stack:
+            _stack[-1].child += _wall
+        self.tracer._finish(self, _wall, _cpu)
+        return False
+
+
+class Tracer:
+    """
+    一次统计的全部 span 与计数器
+
+    span 按线程分别嵌套; 汇总按名称聚合调用次数、总时间、自身时间 (扣除子 span) 与 CPU 时间.
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.events: List[dict] = []  # Chrome trace 事件
+        self.stats: Dict[str, list] = {}  # {名称: [次数, 墙钟, 自身, CPU]}
+        self.counters: Dict[str, float] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self) -> List[_Span]:
+        _stack = getattr(self._local, "stack", None)
+        if _stack is None:
+            _stack = self._local.stack = []
+        return _stack
+
+    def _finish(self, span: _Span, wall: float, cpu: float):
+        _event = {
+            "name": span.name, "ph": "X", "pid": os.getpid(), "tid": threading.get_ident(),
+            "ts": (span.start - self.origin) * 1e6, "dur": wall * 1e6,
+            "args": dict(span.args, cpu_ms=round(cpu * 1000, 3)),
+        }
+        with self._lock:
+            self.events.append(_event)
+            _stat = self.stats.setdefault(span.name, [0, 0.0, 0.0, 0.0])
+            _stat[0] += 1
+            _stat[1] += wall
+            _stat[2] += wall - span.child
+            _stat[3] += cpu
+
+    def span(self, name: str, args: dict) -> _Span:
+        return _Span(self, name, args)
+
+    def count(self, name: str, value: float):
+        with self._lock:
+            _total = self.counters[name] = self.counters.get(name, 0) + value
+            self.events.append({
+                "name": name, "ph": "C", "pid": os.getpid(), "tid": threading.get_ident(),
+                "ts": (time.perf_counter() - self.origin) * 1e6, "args": {"value": _total},
+            })
+
+    def summary(self) -> str:
+        """按总时间降序的汇总表"""
+        _lines = ["{:<24} {:>7} {:>10} {:>10} {:>10} {:>10}".format(
+            "span", "次数", "总计(s)", "自身(s)", "CPU(s)", "平均(ms)")]
+        for _name, (_calls, _wall, _self, _cpu) in sorted(self.stats.items(), key=lambda __: -__[1][1]):
+            _lines.append("{:<24} {:>7} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.2f}".format(
+                _name, _calls, _wall, _self, _cpu, _wall / _calls * 1000))
+        for _name, _value in sorted(self.counters.items()):
+            _lines.append("{:<24} {:>7}".format(_name, int(_value) if float(_value).is_integer() else _value))
+        return "\n".join(_lines)
+
+    def write_chrome_trace(self, path: str):
+        """写出 Chrome trace (JSON Object Format)"""
+        with open(path, "w", encoding="utf-8") as _file:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms",
+                       "otherData": {"counters": self.counters}}, _file, ensure_ascii=False)
+
+
+def enable(on: Optional[bool] = True):
+    """运行时开关, 优先于 Constant.TRACE; 传入 None 恢复按配置"""
+    global _enabled
+    _enabled = on
+
+
+def is_enabled() -> bool:
+    return _enabled if _enabled is not None else getattr(Constant, 'TRACE', False)
+
+
+def span(name: str, **args):
+    """
+    计时上下文, 用法: with Trace.span("writer.write", rows=100): ...
+    不在 session 中时返回空上下文
+    """
+    if _tracer is None:
+        return _NULL_SPAN
+    return _tracer.span(name, args)
+
+
+def count(name: str, value: float = 1):
+    """累加计数器, 不在 session 中时忽略"""
+    if _tracer is not None:
+        _tracer.count(name, value)
+
+
+def traced(name: str):
+    """将整个函数记为一个 span 的装饰器"""
+    def _decorator(func):
+        @functools.wraps(func)
+        def _wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with _tracer.span(name, {}):
+                return func(*args, **kwargs)
+        return _wrapper
+    return _decorator
+
+
+def trace_path(path_output: str, name: str) -> str:
+    """Chrome trace 的输出位置: 与表格同目录, 如 考勤.xlsx 的 pipeline.preview 为 考勤.preview.trace.json"""
+    return "{}.{}.trace.json".format(os.path.splitext(path_output)[0], name.rsplit(".", 1)[-1])
+
+
+@contextlib.contextmanager
+def session(name: str, path_output: Optional[str] = None):
+    """
+    一次统计的计时范围, 结束时打印汇总表, 给出 path_output 时写出 Chrome trace
+
+    已在 session 中时 (如 run 调用 commit) 只作为普通 span; 未开启时不做任何事.
+    """
+    global _tracer
+    if _tracer is not None or not is_enabled():
+        with span(name):
+            yield
+        return
+    _tracer = _current = Tracer()
+    try:
+        with _current.span(name, {}):
+            yield
+    finally:
+        _tracer = None
+        print("[Trace] {} 计时汇总:\n{}".format(name, _current.summary()))
+        if path_output:
+            try:
+                _path = trace_path(path_output, name)
+                _current.write_chrome_trace(_path)
+                print("[Trace] Chrome trace 已写入 {}".format(_path))
+            except OSError as e:
+                print(f"[Trace] 写入 Chrome trace 失败: {e}")
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ACM考勤统计系统 - Warehouse模块
+功能：基于 SQLite 的考勤历史仓库, 保存配对后的打卡区间与每个周期的计算结果
+特点：按 (成员, 日期) 与 (周期) 建立索引, 查询历史无需打开 Excel
+"""
+
+import sqlite3
+import sys
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from Modulo import Constant
+from Modulo import Heatmap
+from Modulo import Intervals
+from Modulo import Methods
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS intervals (
+    member TEXT NOT NULL,
+    day TEXT NOT NULL,
+    wday INTEGER NOT NULL,
+    day_start INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    PRIMARY KEY (member, start)
+);
+CREATE INDEX IF NOT EXISTS idx_intervals_member_day ON intervals (member, day);
+CREATE INDEX IF NOT EXISTS idx_intervals_wday_day ON intervals (wday, day);
+
+CREATE TABLE IF NOT EXISTS scores (
+    period_start INTEGER NOT NULL,
+    period_end INTEGER NOT NULL,
+    method TEXT NOT NULL,
+    member TEXT NOT NULL,
+    seconds INTEGER NOT NULL,
+    flex_count INTEGER NOT NULL,
+    regular_count INTEGER NOT NULL,
+    violation_count INTEGER NOT NULL,
+    PRIMARY KEY (period_start, period_end, method, member)
+);
+CREATE INDEX IF NOT EXISTS idx_scores_period ON scores (period_start, period_end);
+
+CREATE TABLE IF NOT EXISTS heatmaps (
+    period_start INTEGER NOT NULL,
+    period_end INTEGER NOT NULL,
+    member TEXT NOT NULL,
+    cells BLOB NOT NULL,
+    PRIMARY KEY (period_start, period_end, member)
+);
+
+CREATE TABLE IF NOT EXISTS streaks (
+    member TEXT PRIMARY KEY,
+    recent TEXT NOT NULL,
+    current INTEGER NOT NULL,
+    longest INTEGER NOT NULL,
+    met INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS streak_periods (
+    period_start INTEGER NOT NULL,
+    period_end INTEGER NOT NULL,
+    PRIMARY KEY (period_start, period_end)
+);
+
+CREATE TABLE IF NOT EXISTS member_map (
+    employee_num TEXT PRIMARY KEY,
+    member_id TEXT NOT NULL,
+    checked INTEGER NOT NULL
+);
+"""
+
+
+def default_path() -> str:
+    """Constant.ini 中配置的仓库路径, 为空表示不记录历史"""
+    return getattr(Constant, 'WAREHOUSE_PATH', '')
+
+
+class Warehouse:
+    """
+    考勤历史仓库
+
+    intervals 表每行一个签到签退区间, day 为签到当天的本地日期 yyyy-mm-dd, day_start 为当天 0 点的 Unix 时间.
+    scores 表每行一个成员在一个周期内的结果, 同一周期同一办法重复写入时覆盖.
+    heatmaps 表每行一个成员在一个周期内的 星期几 × 小时 在场秒数, 为 168 个 int64 的原始字节, 见 Modulo.Heatmap.
+    streaks 表每行一个成员的跨周期状态 (最近几个周期的秒数、连续达标周期数等), streak_periods 记录已计入的周期, 见 Modulo.Streaks.
+    member_map 表缓存工号到接口 member_id 的映射, 见 Modulo.Roster.
+    支持 with 语句, 退出时提交并关闭.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or default_path()
+        self._conn = sqlite3.connect(self.path)
+        self._conn.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self._conn.commit()
+        self._conn.close()
+
+    def close(self):
+        self._conn.commit()
+        self._conn.close()
+
+    # ==== 写入 ====
+
+    def store_intervals(self, member_records: Dict[str, Iterable[Tuple[int, int]]]) -> int:
+        """
+        保存配对后的打卡区间, 已存在的区间 (成员与开始时间相同) 会被覆盖
+
+        Args:
+            member_records: {工号: [(开始时间, 结束时间), ...]}
+
+        Returns:
+            写入的区间数
+        """
+        _rows = []
+        _days = {}  # {当天 0 点: yyyy-mm-dd}, 同一天只格式化一次
+        for _id, _pairs in member_records.items():
+            for _st, _ed in _pairs:
+                _mk = time.localtime(_st)
+                _day_start = _st - (_mk.tm_hour * 3600 + _mk.tm_min * 60 + _mk.tm_sec)
+                _day = _days.get(_day_start)
+                if _day is None:
+                    _day = _days[_day_start] = time.strftime('%Y-%m-%d', _mk)
+                _rows.append((_id, _day, _mk.tm_wday, _day_start, int(_st), int(_ed)))
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO intervals (member, day, wday, day_start, start, end) VALUES (?, ?, ?, ?, ?, ?)",
+            _rows,
+        )
+        return len(_rows)
+
+    def store_scores(self, period: Tuple[int, int], method: str, scores: Iterable) -> int:
+        """
+        保存一个周期的计算结果
+
+        Args:
+            period: 周期 (开始时间, 结束时间), Unix 时间
+            method: 集训队管理办法名称
+            scores: Pipeline.ScoreRow 序列
+
+        Returns:
+            写入的成员数
+        """
+        _rows = [
+            (int(period[0]), int(period[1]), method, __.member, int(__.total_seconds),
+             int(__.flex_count), int(__.regular_count), int(__.violation_count))
+            for __ in scores
+        ]
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO scores (period_start, period_end, method, member, seconds, flex_count, "
+            "regular_count, violation_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            _rows,
+        )
+        return len(_rows)
+
+    def store_heatmap(self, period: Tuple[int, int], heatmap: Heatmap.Heatmap) -> int:
+        """
+        保存一个周期的在场热力图, 同一周期重复写入时覆盖
+
+        Returns:
+            写入的成员数
+        """
+        _rows = [(int(period[0]), int(period[1]), _id, _cells.tobytes()) for _id, _cells in heatmap.members.items()]
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO heatmaps (period_start, period_end, member, cells) VALUES (?, ?, ?, ?)",
+            _rows,
+        )
+        return len(_rows)
+
+    def store_streaks(self, period: Tuple[int, int], rows: Iterable[Tuple[str, str, int, int, int]]) -> int:
+        """
+        保存计入 period 之后的跨周期状态, 与周期记录在同一事务中提交
+
+        Args:
+            rows: [(工号, 最近各周期秒数 JSON, 当前连续, 最长连续, 累计达标), ...]
+
+        Returns:
+            写入的成员数
+        """
+        _rows = list(rows)
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO streaks (member, recent, current, longest, met) VALUES (?, ?, ?, ?, ?)",
+            _rows,
+        )
+        self._conn.execute(
+            "INSERT OR REPLACE INTO streak_periods (period_start, period_end) VALUES (?, ?)",
+            (int(period[0]), int(period[1])),
+        )
+        return len(_rows)
+
+    def store_member_map(self, entries: Dict[str, Tuple[str, int]]) -> int:
+        """
+        保存工号映射
+
+        Args:
+            entries: {工号: (member_id, 确认时刻)}, member_id 为空串表示全量获取时未见到该成员
+
+        Returns:
+            写入的工号数
+        """
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO member_map (employee_num, member_id, checked) VALUES (?, ?, ?)",
+            [(_id, _member_id, int(_checked)) for _id, (_member_id, _checked) in entries.items()],
+        )
+        return len(entries)
+
+    # ==== 查询 ====
+
+    def member_map(self) -> Dict[str, Tuple[str, int]]:
+        """全部工号映射 {工号: (member_id, 确认时刻)}"""
+        return {_id: (_member_id, _checked) for _id, _member_id, _checked in self._conn.execute(
+            "SELECT employee_num, member_id, checked FROM member_map"
+        )}
+
+    def members(self) -> List[str]:
+        """仓库中出现过的全部成员"""
+        return [__[0] for __ in self._conn.execute(
+            "SELECT member FROM intervals UNION SELECT member FROM scores ORDER BY 1"
+        )]
+
+    def interval_store(self, start_day: Optional[str] = None, end_day: Optional[str] = None) -> Intervals.IntervalStore:
+        """
+        读取日期范围内的全部区间
+
+        Args:
+            start_day, end_day: 日期范围 yyyy-mm-dd, 闭区间, 为 None 表示不限
+
+        Returns:
+            紧凑的区间存储, 用法同 {工号: [(开始时间, 结束时间), ...]}
+        """
+        _sql = "SELECT member, start, end FROM intervals WHERE 1"
+        _args = []
+        if start_day is not None:
+            _sql += " AND day >= ?"
+            _args.append(start_day)
+        if end_day is not None:
+            _sql += " AND day <= ?"
+            _args.append(end_day)
+        _store = Intervals.IntervalStore()
+        _member, _starts, _ends = None, [], []
+        for _id, _st, _ed in self._conn.execute(_sql + " ORDER BY member, start", _args):
+            if _id != _member:
+                if _member is not None:
+                    _store.add(_member, _starts, _ends)
+                _member, _starts, _ends = _id, [], []
+            _starts.append(_st)
+            _ends.append(_ed)
+        if _member is not None:
+            _store.add(_member, _starts, _ends)
+        return _store
+
+    def monthly_hours(self, member: Optional[str] = None, start_day: Optional[str] = None,
+                      end_day: Optional[str] = None) -> List[Tuple[str, str, float]]:
+        """
+        每名成员每月的打卡总时长
+
+        Args:
+            member: 仅查询该成员, 为 None 时查询全部
+            start_day, end_day: 日期范围 yyyy-mm-dd, 闭区间, 为 None 表示不限
+
+        Returns:
+            [(工号, yyyy-mm, 小时数), ...], 按工号、月份排序
+        """
+        _sql = "SELECT member, substr(day, 1, 7) AS month, SUM(end - start) / 3600.0 FROM intervals WHERE 1"
+        _args = []
+        if member is not None:
+            _sql += " AND member = ?"
+            _args.append(member)
+        if start_day is not None:
+            _sql += " AND day >= ?"
+            _args.append(start_day)
+        if end_day is not None:
+            _sql += " AND day <= ?"
+            _args.append(end_day)
+        _sql += " GROUP BY member, month ORDER BY member, month"
+        return list(self._conn.execute(_sql, _args))
+
+    def missed_sessions(self, wday: int, start_day: str, end_day: str,
+                        window: Optional[Tuple[int, int]] = None,
+                        members: Optional[Iterable[str]] = None) -> List[Tuple[str, str]]:
+        """
+        在日期范围内, 哪些成员缺席了每周固定时段
+
+        Args:
+            wday: 星期几, 与 time.struct_time.tm_wday 一致, 周一为 0, 周六为 5
+            start_day, end_day: 日期范围 yyyy-mm-dd, 闭区间
+            window: 固定时段, 表达为一天中的第几秒, 默认为集训队日常管理办法的固定打卡时段
+            members: 需要检查的成员, 为 None 时使用仓库中出现过的全部成员
+
+        Returns:
+            [(工号, yyyy-mm-dd), ...], 该成员当天在固定时段内没有任何打卡区间
+        """
+        if window is None:
+            window = (Methods.MethodRegular.REGULAR_START, Methods.MethodRegular.REGULAR_END)
+        _sessions = []
+        _t = time.mktime(time.strptime(start_day, '%Y-%m-%d'))
+        _ed = time.mktime(time.strptime(end_day, '%Y-%m-%d'))
+        while _t <= _ed:
+            _mk = time.localtime(_t)
+            if _mk.tm_wday == wday:
+                _sessions.append(time.strftime('%Y-%m-%d', _mk))
+            # 加 26 小时再取整到当天 0 点, 避免夏令时导致的重复或跳过
+            _t = time.mktime(time.localtime(_t + 26 * 3600)[:3] + (0, 0, 0, 0, 0, -1))
+        _present = set(self._conn.execute(
+            "SELECT DISTINCT member, day FROM intervals WHERE wday = ? AND day BETWEEN ? AND ? "
+            "AND start < day_start + ? AND end > day_start + ?",
+            (wday, start_day, end_day, window[1], window[0]),
+        ))
+        _members = list(members) if members is not None else self.members()
+        return [(_m, _d) for _m in _members for _d in _sessions if (_m, _d) not in _present]
+
+    def periods(self) -> List[Tuple[int, int, str]]:
+        """已记录的全部周期 [(开始时间, 结束时间, 办法名称), ...]"""
+        return list(self._conn.execute(
+            "SELECT DISTINCT period_start, period_end, method FROM scores ORDER BY period_start, period_end"
+        ))
+
+    def period_scores(self, period: Tuple[int, int]) -> List[Tuple[str, str, int, int, int, int]]:
+        """
+        一个周期内全部成员的结果
+
+        Returns:
+            [(工号, 办法名称, 打卡秒数, 灵活次数, 固定次数, 新增违规), ...]
+        """
+        return list(self._conn.execute(
+            "SELECT member, method, seconds, flex_count, regular_count, violation_count FROM scores "
+            "WHERE period_start = ? AND period_end = ? ORDER BY member",
+            (int(period[0]), int(period[1])),
+        ))
+
+    def streaks(self) -> List[Tuple[str, str, int, int, int]]:
+        """全部成员的跨周期状态 [(工号, 最近各周期秒数 JSON, 当前连续, 最长连续, 累计达标), ...]"""
+        return list(self._conn.execute("SELECT member, recent, current, longest, met FROM streaks"))
+
+    def last_streak_period(self) -> Optional[Tuple[int, int]]:
+        """最近一个计入跨周期状态的周期, 没有时为 None"""
+        return self._conn.execute(
+            "SELECT period_start, period_end FROM streak_periods ORDER BY period_end DESC, period_start DESC LIMIT 1"
+        ).fetchone()
+
+    def heatmap(self, period: Tuple[int, int]) -> Optional[Heatmap.Heatmap]:
+        """读取一个周期已保存的在场热力图, 未保存时为 None"""
+        _members = {}
+        for _member, _cells in self._conn.execute(
+            "SELECT member, cells FROM heatmaps WHERE period_start = ? AND period_end = ?",
+            (int(period[0]), int(period[1])),
+        ):
+            _members[_member] = array('q', _cells)
+        return Heatmap.Heatmap.from_cells(_members) if _members else None
+
+
+# 命令行查询:
+#   python -m Modulo.Warehouse monthly [工号]
+#   python -m Modulo.Warehouse missed 起始日期 结束日期 [星期几, 默认 5 即周六]
+#   python -m Modulo.Warehouse periods
+#   python -m Modulo.Warehouse heatmap  (最近一个周期的全队在场分钟数)
+if __name__ == '__main__':
+    if not default_path():
+        print("Constant.ini 未配置 WAREHOUSE_PATH")
+        sys.exit(1)
+    _argv = sys.argv[1:] or ['monthly']
+    with Warehouse() as _warehouse:
+        if _argv[0] == 'monthly':
+            for _member, _month, _hours in _warehouse.monthly_hours(_argv[1] if len(_argv) > 1 else None):
+                print("{}\t{}\t{:.2f}".format(_member, _month, _hours))
+        elif _argv[0] == 'missed' and len(_argv) >= 3:
+            for _member, _day in _warehouse.missed_sessions(int(_argv[3]) if len(_argv) > 3 else 5, _argv[1], _argv[2]):
+                print("{}\t{}".format(_member, _day))
+        elif _argv[0] == 'periods':
+            for _st, _ed, _method in _warehouse.periods():
+                print("{} ~ {}\t{}".format(
+                    time.strftime('%Y-%m-%d', time.localtime(_st)),
+                    time.strftime('%Y-%m-%d', time.localtime(_ed)),
+                    _method,
+                ))
+        elif _argv[0] == 'heatmap':
+            _periods = _warehouse.periods()
+            _heatmap = _warehouse.heatmap(_periods[-1][:2]) if _periods else None
+            if _heatmap is None:
+                print("没有已保存的在场热力图")
+            else:
+                for _row in _heatmap.table()[:8]:
+                    print("\t".join(str(__) for __ in _row[:25]))
+                print(_heatmap.describe())
+        else:
+            print("用法: python -m Modulo.Warehouse monthly [工号] | missed 起始日期 结束日期 [星期几] | periods | heatmap")
@@ -1,5 +1,11 @@
 import xlwings
+from Modulo import Cancel
+from Modulo import Cells
 from Modulo import Constant
+from Modulo import Trace
+
+# 分批写入时每批的行数, 每批之间检查取消令牌
+WRITE_BATCH_ROWS = 200
 
 
 # 写入类, 写入所有到输出表格
@@ -11,80 +17,199 @@ class Writer:
     self.data 公有, 并且保证为矩阵. 直接操作即可
     rewrite 将 self.data 全部同步到 excel 文件, 再次提醒同步需要手动提交
     rewrite_range 将 self.data 中的部分同步到 excel 文件, 通常表格中只有部分区间需要同步, 这样减少读写量
+    read_only 只读获取表格内容而不启动 Excel, 用于预览等不修改表格的场景
+    append=True 为追加模式, 只读取表头行与人员基本信息列 (COL_RECORDS_START 之前), 历史记录块在 self.data 中为空串,
+        读取量不随历史学期增长; 此模式下只能用 rewrite_range 写回新增部分, 不能 rewrite
 
     另外在代码实现中需要特别注意的点有:
-    * xlwings 写入时自动识别数据类型, 但是似乎这个地方问题很大, 需要通过系列操作规避自动识别 (别问我就是这么答辩)
+    * xlwings 写入时自动识别数据类型, 但是似乎这个地方问题很大 (别问我就是这么答辩). self.data 中的单元格是类型化的:
+      数值保持为数值, 时长为 Cells.Duration, 写入时转为 Excel 时间值并设置显示格式, 不再把文本交给 Excel 去猜
     * xlwings 中所有索引使用 1-index, 而 Python 内置数据类型均采用 0-index (别问我源作者怎么想的). 在我的代码习惯中, 该类所有对外接口均为 0-index
     * xlwings 异常退出, 即未调用 app.quit() 时, 将残留僵尸进程 (具体由本地 Excel 编辑器决定), 同时可能导致文件无法二次打开. 请注意异常处理, 遇到时清理后台进程
+    * 任务被取消时调用 abort 放弃修改并退出, close 与 abort 均保证最终调用 app.quit()
     """
 
     # 先从原表格读取原信息
-    def __init__(self, fp):
+    def __init__(self, fp, append: bool = False):
         self.__app = xlwings.App(visible=False)
+        self.append = append
         try:
-            self.__book = self.__app.books.open(fp)
-            self.__sheet = self.__book.sheets[0]
-            self.data = []
-            _len = 1
-            while self.__sheet.range(Constant.ROW_START - 1, _len).value or \
-                    self.__sheet.range(Constant.ROW_START, _len).value:
-                _len += 1
-            _len -= 1
-            _i = 0  # 从第0行开始读取，xlwings会自动转换为1基索引
-            while True:
-                _item = self.__format_data(self.__sheet.range((_i + 1, 1), (_i + 1, _len)).value)
-                _yep = False
-                for _cell in _item:
-                    if _cell:
-                        _yep = True
-                        break
-                if not _yep:
-                    break
-                self.data.append(_item)
-                _i += 1
+            with Trace.span("writer.open"):
+                self.__book = self.__app.books.open(fp)
+                self.__sheet = self.__book.sheets[0]
+            if append:
+                self.data = self.__read_append()
+                return
+            self.data = self.__read_all()
         except Exception:
             self.__app.quit()
             raise
 
-    # 将任意类型转换为 str
+    # 逐行读取整张表格, 直到空行
+    @Trace.traced("writer.read")
+    def __read_all(self) -> list:
+        _data = []
+        _len = 1
+        while self.__sheet.range(Constant.ROW_START - 1, _len).value or \
+                self.__sheet.range(Constant.ROW_START, _len).value:
+            _len += 1
+        _len -= 1
+        _i = 0  # 从第0行开始读取，xlwings会自动转换为1基索引
+        while True:
+            _item = self.__format_data(self.__sheet.range((_i + 1, 1), (_i + 1, _len)).value)
+            _yep = False
+            for _cell in _item:
+                if _cell:
+                    _yep = True
+                    break
+            if not _yep:
+                break
+            _data.append(_item)
+            _i += 1
+        return _data
+
+    # 追加模式读取: 表头行整行读取一次, 正文只读取基本信息列, 其余单元格以空串占位
+    @Trace.traced("writer.read")
+    def __read_append(self) -> list:
+        _last = self.__sheet.used_range.last_cell
+        _rows, _cols = _last.row, _last.column
+        _header = [
+            self.__format_data(__) for __ in
+            self.__sheet.range((1, 1), (Constant.ROW_START, _cols)).options(ndim=2).value
+        ]
+        _len = 0
+        while _len < _cols and (_header[Constant.ROW_START - 2][_len] or _header[Constant.ROW_START - 1][_len]):
+            _len += 1
+        _data = [__[:_len] + [''] * (_len - len(__)) for __ in _header]
+        if _rows <= Constant.ROW_START:
+            return _data
+        _basic = self.__sheet.range(
+            (Constant.ROW_START + 1, 1), (_rows, Constant.COL_RECORDS_START)
+        ).options(ndim=2).value
+        for _item in _basic:
+            _item = self.__format_data(_item)
+            if not any(_item):
+                break
+            _data.append(_item + [''] * (_len - len(_item)))
+        return _data
+
+    # 只读获取表格内容, 格式与 self.data 一致. 优先使用 openpyxl 不启动 Excel, 不支持的格式退回 xlwings
     @staticmethod
-    def __any2str(x) -> str:
-        if x is None:
-            return ""
-        # if isinstance(x, str):
-        #     return "'{}".format(x)
-        if isinstance(x, float):
-            return str(int(x * 100) / 100)
-        return str(x)
-
-    # 格式化列表为全部 str, 避免触发 xlwings 的 BUG
+    @Trace.traced("writer.read_only")
+    def read_only(fp) -> list:
+        try:
+            import openpyxl
+            _book = openpyxl.load_workbook(fp, read_only=True, data_only=True)
+        except Exception:
+            _writer = Writer(fp)
+            _writer.abort()
+            return _writer.data
+        try:
+            _data = []
+            for _item in _book.worksheets[0].iter_rows(values_only=True):
+                _item = Writer.__format_data(list(_item))
+                if not any(_item):
+                    break
+                _data.append(_item)
+        finally:
+            _book.close()
+        _len = max((len(__) for __ in _data), default=0)
+        for _item in _data:
+            _item.extend([''] * (_len - len(_item)))
+        return _data
+
+    # 规范化读取到的单元格, 空单元格为 '', 整数值不带小数, 见 Cells.normalize
     @staticmethod
     def __format_data(ls: list) -> list:
-        return [Writer.__format_data(__) if isinstance(__, list) else Writer.__any2str(__) for __ in ls]
-
-    # 刷新表格的限定区间, 以减少读写量
-    def rewrite_range(self, st: tuple, ed: tuple):
-        self.__sheet.range(
-            st[0] + 1, st[1] + 1
-        ).expand().value = [
-            __[st[1]:ed[1]] for __ in self.__format_data(self.data)[st[0]:ed[0]]
-        ]
+        return [Writer.__format_data(__) if isinstance(__, list) else Cells.normalize(__) for __ in ls]
+
+    # 写入前转换单元格, 见 Cells.to_excel
+    @staticmethod
+    def __excel_data(ls: list) -> list:
+        return [Writer.__excel_data(__) if isinstance(__, list) else Cells.to_excel(__) for __ in ls]
+
+    # 写入一块矩形区域, 并为其中的时长列设置显示格式. r, c 为左上角, 0-index
+    @Trace.traced("writer.write")
+    def __write_block(self, r: int, c: int, rows: list):
+        if not rows:
+            return
+        with Trace.span("writer.format"):
+            _values = self.__excel_data(rows)
+        self.__sheet.range(r + 1, c + 1).value = _values
+        for _j in sorted({_j for _row in rows for _j, _x in enumerate(_row) if isinstance(_x, Cells.Duration)}):
+            self.__sheet.range((r + 1, c + _j + 1), (r + len(rows), c + _j + 1)).number_format = \
+                Cells.DURATION_FORMAT
+        Trace.count("writer.cells", len(rows) * len(rows[0]))
+
+    # 刷新表格的限定区间, 以减少读写量. 按 WRITE_BATCH_ROWS 分批写入, 每批之间检查取消令牌, 只转换写入的部分
+    def rewrite_range(self, st: tuple, ed: tuple, cancel: Cancel.CancelToken = None):
+        for _r in range(st[0], ed[0], WRITE_BATCH_ROWS):
+            Cancel.check(cancel)
+            self.__write_block(_r, st[1], [
+                __[st[1]:ed[1]] for __ in self.data[_r:min(_r + WRITE_BATCH_ROWS, ed[0])]
+            ])
+
+    # 读取一列 [r0, r1) 的公式文本 (非公式单元格为其值的文本), 0-index. 用于跳过内容未变化的公式列
+    @Trace.traced("writer.read_formulas")
+    def column_formulas(self, c: int, r0: int, r1: int) -> list:
+        if r1 <= r0:
+            return []
+        _formulas = self.__sheet.range((r0 + 1, c + 1), (r1, c + 1)).formula
+        if isinstance(_formulas, str):  # 单个单元格时 xlwings 返回字符串
+            return [_formulas]
+        return [__[0] if isinstance(__, (list, tuple)) else __ for __ in _formulas]
 
     # 刷新表格全部区间
     def rewrite(self):
-        self.__sheet.range("A1").expand().value = self.__format_data(self.data)
+        if self.append:
+            raise RuntimeError("追加模式只读取了部分单元格, 不能整表写回")
+        self.__write_block(0, 0, self.data)
 
     # 合并单元格
+    @Trace.traced("writer.merge")
     def merge_range(self, st: tuple, ed: tuple):
         self.__sheet.range((st[0] + 1, st[1] + 1), ed).api.Merge()
 
-    # 获取 Excel 风格索引, 如 (0, 0) -> A1
+    # 将 rows 整块写入名为 name 的附加工作表, 不存在时在末尾新建, 已存在时先清空. 不影响主表与 self.data
+    @Trace.traced("writer.sheet")
+    def write_sheet(self, name: str, rows: list):
+        _names = [__.name for __ in self.__book.sheets]
+        if name in _names:
+            _sheet = self.__book.sheets[name]
+            _sheet.clear_contents()
+        else:
+            _sheet = self.__book.sheets.add(name, after=self.__book.sheets[len(_names) - 1])
+        if rows:
+            _sheet.range(1, 1).value = self.__excel_data(rows)
+            Trace.count("writer.cells", len(rows) * len(rows[0]))
+
+    # 获取 Excel 风格列名, 如 0 -> A, 26 -> AA
+    @staticmethod
+    def column_name(c) -> str:
+        _name = ''
+        c += 1
+        while c:
+            c, _mod = divmod(c - 1, 26)
+            _name = chr(ord('A') + _mod) + _name
+        return _name
+
+    # 获取 Excel 风格索引, 如 (0, 0) -> A1. 纯计算, 不经过 Excel
     def excel_index(self, r, c):
-        _tmp = str(self.__sheet.range(r + 1, c + 1)).split('$')
-        return _tmp[1] + _tmp[2][:-1]
+        return self.column_name(c) + str(r + 1)
 
     # 保存并关闭
+    @Trace.traced("writer.save")
     def close(self):
-        self.__book.save()
-        self.__book.close()
-        self.__app.quit()
+        try:
+            self.__book.save()
+            self.__book.close()
+        finally:
+            self.__app.quit()
+
+    # 放弃修改并关闭, 用于任务取消或出错
+    @Trace.traced("writer.abort")
+    def abort(self):
+        try:
+            self.__book.close()
+        finally:
+            self.__app.quit()
@@ -52,14 +52,22 @@ from selenium.common.exceptions import (
 # 如果你在本地项目中没有这些模块，请确保它们在 PYTHONPATH 中
 try:
     from Modulo import Ask
+    from Modulo import Calendar
     from Modulo import Spider
     from Modulo import Writer
     from Modulo import Constant
     from Modulo import Methods
+    from Modulo import Pipeline
+    from Modulo import Rules
 except Exception as e:
     # 如果导入失败，提供更友好的错误信息，GUI 仍能启动但在使用时会报错
     print('[WARN] 无法导入 Modulo 模块，运行时会失败。请确保项目结构正确并在 PYTHONPATH 中。', e)
-    Ask = Spider = Writer = Constant = Methods = None
+    Ask = Calendar = Spider = Writer = Constant = Methods = Pipeline = Rules = None
+
+# 进度与取消不依赖第三方库，单独导入，保证 GUI 在任何情况下都能刷新状态
+from Modulo import Cancel
+from Modulo import Profile
+from Modulo import Progress
 
 # ----------------------
 # 配置（按需修改）
@@ -70,6 +78,7 @@ LOGIN_URL = 'https://v2-web.delicloud.com/login'
 MAX_LOGIN_WAIT = 300  # 登录等待（秒）
 TARGET_CHECKIN_RULE_PART = '/checkIn/rule'
 VERBOSE = True
+PROGRESS_POLL_MS = 100  # 进度队列的刷新间隔（毫秒）
 # ----------------------
 
 # 正则预编译
@@ -724,6 +733,12 @@ class ACMAttendanceGUI:
         self.create_widgets()
         self.load_default_config()
 
+        # 统计任务状态，关闭窗口时需要先取消任务并等待 Excel / 浏览器清理完毕
+        self.worker = None
+        self.cancel_token = None
+        self.closing = False
+        self.root.protocol('WM_DELETE_WINDOW', self.on_close)
+
     # create_widgets & many GUI helper methods are kept identical to original GUI file
     # 为节省篇幅，在这里复用原 GUI 的方法实现（将原文件内容逐行合并进来）
 
@@ -733,6 +748,14 @@ class ACMAttendanceGUI:
         """构建最小可用 GUI 元素，确保必须的变量（file_path_var、start_button、progress、status_label、method_combo、stat_method）存在。
         我把界面做得简洁且足够运行统计流程；如果你需要把原始完整界面恢复回来，我可以把完整 create_widgets 的实现粘回。
         """
+        # 菜单: 性能分析开关，开启后统计结束时在输出文件旁写出 .prof 与 .folded
+        self.profile_var = tk.BooleanVar(value=getattr(Constant, 'PROFILE', False) if Constant else False)
+        menubar = tk.Menu(self.root)
+        tools_menu = tk.Menu(menubar, tearoff=0)
+        tools_menu.add_checkbutton(label='性能分析', variable=self.profile_var)
+        menubar.add_cascade(label='工具', menu=tools_menu)
+        self.root.config(menu=menubar)
+
         # 容器
         main_frame = ttk.Frame(self.root, padding=8)
         main_frame.pack(fill='both', expand=True)
@@ -747,6 +770,8 @@ class ACMAttendanceGUI:
         # 统计方法
         ttk.Label(main_frame, text='统计方法:').grid(row=1, column=0, sticky='w', pady=(8,0))
         try:
+            Calendar.register_saved()  # 集训与假期的训练日程
+            Rules.register_saved()  # 图形界面中保存的自定义统计规则
             methods_list = list(Methods.all_methods.keys())
         except Exception:
             methods_list = ['默认方法']
@@ -787,6 +812,9 @@ class ACMAttendanceGUI:
         self.start_button = ttk.Button(btn_frame, text='开始统计', command=self.start_statistics)
         self.start_button.pack(side='left')
 
+        self.cancel_button = ttk.Button(btn_frame, text='取消', command=self.cancel_statistics, state='disabled')
+        self.cancel_button.pack(side='left', padx=(6, 0))
+
         self.progress = ttk.Progressbar(btn_frame, mode='indeterminate', length=200)
         self.progress.pack(side='left', padx=8)
 
@@ -926,10 +954,36 @@ class ACMAttendanceGUI:
         self.progress.start()
         self.status_label.config(text='准备登录并获取认证信息...', foreground='blue')
 
-        thread = threading.Thread(target=self._login_then_stat_thread, 
-                                args=(file_path, method_todo, time_range))
-        thread.daemon = True
-        thread.start()
+        self.cancel_button.config(state='normal')
+
+        # 进度事件队列：工作线程只负责上报，由主循环定时取出并刷新界面
+        self.cancel_token = Cancel.CancelToken()
+        self.progress_reporter = Progress.ProgressReporter()
+        self.progress_tracker = Progress.ProgressTracker()
+        self.last_error = None
+        self.profile_on = self.profile_var.get()
+        self.root.after(PROGRESS_POLL_MS, self.poll_progress)
+
+        self.worker = threading.Thread(target=self._login_then_stat_thread, 
+                                       args=(file_path, method_todo, time_range))
+        self.worker.daemon = True
+        self.worker.start()
+
+    def cancel_statistics(self):
+        """请求取消当前统计，流水线会在下一页或下一批处停止并退出 Excel"""
+        if self.cancel_token is not None and not self.cancel_token.cancelled:
+            self.cancel_token.cancel()
+            self.cancel_button.config(state='disabled')
+            self.status_label.config(text='正在取消...', foreground='orange')
+
+    def on_close(self):
+        """关闭窗口：若统计仍在进行，先取消并等待工作线程完成清理，避免残留 Excel 进程"""
+        if self.worker is not None and self.worker.is_alive():
+            self.closing = True
+            self.cancel_statistics()
+            self.root.after(PROGRESS_POLL_MS, self.on_close)
+            return
+        self.root.destroy()
 
     def _login_then_stat_thread(self, file_path, method_todo, time_range):
         try:
@@ -949,7 +1003,7 @@ class ACMAttendanceGUI:
                         driver.quit()
                 except Exception:
                     pass
-                self.root.after(0, self._on_thread_finish_failure)
+                self.progress_reporter.finish(False)
                 return
 
             # 2) 更新配置文件
@@ -961,11 +1015,13 @@ class ACMAttendanceGUI:
                     driver.quit()
                 except Exception:
                     pass
-                self.root.after(0, self._on_thread_finish_failure)
+                self.progress_reporter.finish(False)
                 return
             
             self.status_update(f'配置文件已更新: AUTH_CODE={auth[:10]}..., AUTH_ID={member}', 'blue')
             time.sleep(1) 
+            # 登录等待期间无法中断，登录完成后立即响应取消
+            self.cancel_token.check()
 
             # 3) 执行原本的统计流程
             self.status_update('开始统计...', 'blue')
@@ -995,6 +1051,7 @@ class ACMAttendanceGUI:
                     from Modulo.Writer import Writer
                     from Modulo import Constant # <- 这是上个版本出错的地方，已修正
                     from Modulo import Methods
+                    from Modulo import Pipeline
                     
                     self.status_update('模块重载完成，准备创建实例...', 'green')
 
@@ -1009,69 +1066,27 @@ class ACMAttendanceGUI:
                 end_time_str = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time_range[1]))
                 self.status_update(f'开始统计，时间范围: {start_time_str} 至 {end_time_str}', 'blue')
 
-                # 尝试创建Spider实例
-                try:
-                    self.status_update('正在创建Spider实例...', 'blue')
-                    spider = Spider(time_range[0], time_range[1])
-                    self.status_update(f'Spider创建成功，获取到 {len(spider.MemberClockinRecords)} 条记录', 'green')
-
-                except Exception as e:
-                    error_msg = f'创建Spider实例失败: {e}'
-                    self.status_update(error_msg, 'red')
-                    traceback.print_exc()
-                    raise RuntimeError(error_msg)
-
-                member_records = spider.MemberClockinRecords
-                writer = Writer(file_path)
-
-                # 余下统计逻辑与原 run_statistics 保持一致
-                _new_col = len(writer.data[Constant.ROW_START - 1]) - Constant.COL_RECORDS_START + Constant.COL_RECORDS_LENGTH - 1
-                _new_col = _new_col // Constant.COL_RECORDS_LENGTH * Constant.COL_RECORDS_LENGTH + Constant.COL_RECORDS_START
-                _extend = _new_col + Constant.COL_RECORDS_LENGTH - len(writer.data[Constant.ROW_START - 1])
-                for _i in range(len(writer.data)):
-                    writer.data[_i].extend([''] * _extend)
-
-                writer.merge_range((Constant.ROW_START - 2, _new_col),(Constant.ROW_START - 1, _new_col + Constant.COL_RECORDS_LENGTH))
-                _st, _ed = spider.TimeRange
-                _mk_st = time.localtime(_st)
-                _mk_ed = time.localtime(_ed)
-                writer.data[Constant.ROW_START - 2][_new_col] = "{}-{}-{} ~ {}-{}-{}".format(_mk_st.tm_year, _mk_st.tm_mon, _mk_st.tm_mday, _mk_ed.tm_year, _mk_ed.tm_mon, _mk_ed.tm_mday)
-                writer.data[Constant.ROW_START - 1][_new_col + Constant.COL_RECORDS_SECONDS] = Constant.COL_RECORDS_SECONDS_TITLE
-                writer.data[Constant.ROW_START - 1][_new_col + Constant.COL_RECORDS_FLEX_COUNT] = Constant.COL_RECORDS_FLEX_COUNT_TITLE
-                writer.data[Constant.ROW_START - 1][_new_col + Constant.COL_RECORDS_REGULAR_COUNT] = Constant.COL_RECORDS_REGULAR_COUNT_TITLE
-                writer.data[Constant.ROW_START - 1][_new_col + Constant.COL_RECORDS_VIOLATION_COUNT] = Constant.COL_RECORDS_VIOLATION_COUNT_TITLE
-                writer.data[Constant.ROW_START - 1][_new_col + Constant.COL_RECORDS_REMARK] = Constant.COL_RECORDS_REMARK_TITLE
-
-                for _i in range(Constant.ROW_START, len(writer.data)):
-                    _id = writer.data[_i][Constant.COL_ID].strip().upper()
-                    if not Constant.ID_TYPE_TEXT:
-                        _id = str(int(float(_id)))
-                    method = Methods.all_methods[method_todo](writer.data[_i], member_records.get(_id, []))
-                    writer.data[_i][_new_col + Constant.COL_RECORDS_SECONDS] = method.seconds()
-                    writer.data[_i][_new_col + Constant.COL_RECORDS_FLEX_COUNT] = method.flex_count()
-                    writer.data[_i][_new_col + Constant.COL_RECORDS_REGULAR_COUNT] = method.regular_count()
-                    writer.data[_i][_new_col + Constant.COL_RECORDS_VIOLATION_COUNT] = method.violation_count()
-
-                writer.rewrite_range((Constant.ROW_START - 2, _new_col),(len(writer.data), _new_col + Constant.COL_RECORDS_LENGTH))
-
-                for _i in range(Constant.ROW_START, len(writer.data)):
-                    writer.data[_i][Constant.COL_VIOLATION_COUNT] = "={}".format(
-                        "+".join([writer.excel_index(_i, __) for __ in range(Constant.COL_RECORDS_START + Constant.COL_RECORDS_VIOLATION_COUNT, _new_col + Constant.COL_RECORDS_LENGTH, Constant.COL_RECORDS_LENGTH)])
-                    )
-
-                writer.rewrite_range((Constant.ROW_START, Constant.COL_VIOLATION_COUNT),(len(writer.data), Constant.COL_VIOLATION_COUNT + 1))
-                writer.close()
+                # 获取记录、计算与写入与原 run_statistics 共用 Modulo.Pipeline
+                # 性能分析只覆盖统计本身，不含浏览器登录
+                with Profile.profiled(file_path, 'run', self.profile_on):
+                    Pipeline.run(time_range, file_path, method_todo, progress=self.progress_reporter,
+                                 cancel=self.cancel_token)
 
                 # 统计完成
                 self.status_update('统计完成，正在关闭浏览器...', 'green')
-                self.root.after(0, self._on_thread_finish_success)
+                self.progress_reporter.finish(True)
+
+            except Cancel.Cancelled as e:
+                print(e)
+                self.status_update(str(e), 'orange')
+                self.progress_reporter.finish(False)
 
             except Exception as e:
                 err = f'统计过程中出现错误:\n{e}'
                 print(err)
                 traceback.print_exc()
                 self.status_update('统计失败: ' + str(e), 'red')
-                self.root.after(0, self._on_thread_finish_failure)
+                self.progress_reporter.finish(False)
 
             finally:
                 # 4) 关闭浏览器
@@ -1081,6 +1096,16 @@ class ACMAttendanceGUI:
                 except Exception:
                     pass
 
+        except Cancel.Cancelled as e:
+            print(e)
+            try:
+                if self.driver:
+                    self.driver.quit()
+            except Exception:
+                pass
+            self.status_update(str(e), 'orange')
+            self.progress_reporter.finish(False)
+
         except Exception as e:
             print('[login_then_stat_thread] 线程主异常:', e)
             traceback.print_exc()
@@ -1090,21 +1115,51 @@ class ACMAttendanceGUI:
             except Exception:
                 pass
             # 确保在任何异常下都能恢复GUI状态
-            self.root.after(0, self._on_thread_finish_failure)
+            self.progress_reporter.finish(False)
 
 
     def status_update(self, text, color='black'):
-        def _upd():
-            try:
-                self.status_label.config(text=text, foreground=color)
-            except Exception:
-                pass
-        self.root.after(0, _upd)
+        # 工作线程不直接操作界面，状态经进度队列交给主循环刷新
+        self.progress_reporter.message(text)
+        if color == 'red':
+            self.last_error = text
+
+    def poll_progress(self):
+        """在 Tk 主循环中定时取出进度事件并刷新进度条与状态"""
+        for event in self.progress_reporter.drain():
+            if event.stage == Progress.STAGE_FINISH:
+                if event.done:
+                    self._on_thread_finish_success()
+                else:
+                    self._on_thread_finish_failure()
+                return
+            if event.stage == Progress.STAGE_MESSAGE:
+                self.status_label.config(text=event.message, foreground='red' if event.message == self.last_error else 'blue')
+                continue
+            self.progress_tracker.update(event)
+            fraction = self.progress_tracker.fraction()
+            if fraction is None:
+                if str(self.progress.cget('mode')) != 'indeterminate':
+                    self.progress.config(mode='indeterminate')
+                    self.progress.start()
+            else:
+                if str(self.progress.cget('mode')) != 'determinate':
+                    self.progress.stop()
+                    self.progress.config(mode='determinate')
+                self.progress['value'] = fraction * 100
+            self.status_label.config(text=self.progress_tracker.describe(), foreground='blue')
+        self.root.after(PROGRESS_POLL_MS, self.poll_progress)
 
     def _on_thread_finish_success(self):
         try:
             self.progress.stop()
+            self.progress.config(mode='indeterminate')
+            self.progress['value'] = 0
+            self.status_label.config(text='统计完成', foreground='green')
             self.start_button.config(state='normal')
+            self.cancel_button.config(state='disabled')
+            if self.closing:
+                return
             messagebox.showinfo('完成', f'统计完成，文件已保存到: {self.file_path_var.get()}')
         except Exception:
             pass
@@ -1112,8 +1167,19 @@ class ACMAttendanceGUI:
     def _on_thread_finish_failure(self):
         try:
             self.progress.stop()
+            self.progress.config(mode='indeterminate')
+            self.progress['value'] = 0
+            if self.last_error:
+                self.status_label.config(text=self.last_error, foreground='red')
             self.start_button.config(state='normal')
-            if '创建Spider实例失败' in self.status_label.cget('text') or '无法导入' in self.status_label.cget('text'):
+            self.cancel_button.config(state='disabled')
+            if self.closing:
+                # 窗口正在关闭，on_close 会在工作线程退出后销毁窗口
+                return
+            if self.cancel_token.cancelled:
+                self.status_label.config(text='统计已取消', foreground='orange')
+                return
+            if '统计失败' in self.status_label.cget('text') or '无法导入' in self.status_label.cget('text'):
                  messagebox.showerror('错误', f'统计失败，请检查控制台日志。\n错误信息: {self.status_label.cget("text")}')
             else:
                  messagebox.showerror('错误', '登录或统计失败，请查看控制台日志')
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能基准: 打卡配对、各集训队管理办法、Writer 转换与写入、只读读取、认证日志解析
+
+输入均为固定种子生成的合成数据, 不访问接口、不启动 Excel, 结果可在不同机器上复现比较.
+缺少依赖 (xlwings / openpyxl / selenium) 的项目自动跳过.
+
+用法:
+    python benchmark.py                                   # 运行并保存到 benchmark_results.json
+    python benchmark.py --save baseline.json              # 在主分支上保存基线
+    python benchmark.py --compare baseline.json           # 与基线比较, 变慢超过阈值时退出码为 1
+    python benchmark.py --sizes 100 1000 --repeat 7 --threshold 0.15 -k methods
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from Modulo import Constant
+from Modulo import Methods
+from Modulo import Spider
+
+SEED = 20231001
+DAY = 86400
+PERIOD_START = int(time.mktime((2024, 4, 22, 0, 0, 0, 0, 0, 0)))  # 周一, 合成数据覆盖两周
+PERIOD_DAYS = 14
+
+# 基准项目注册表 {名称: (准备函数, 被测函数)}; 准备函数接收规模, 返回被测函数的参数, 不计入时间
+CASES: Dict[str, Tuple[Callable, Callable]] = {}
+
+
+def case(name: str, setup: Callable):
+    def _decorator(func):
+        CASES[name] = (setup, func)
+        return func
+    return _decorator
+
+
+# ==== 合成数据 ====
+
+def member_ids(size: int) -> List[str]:
+    return ["{:010d}".format(2020000000 + __) for __ in range(size)]
+
+
+def synthetic_punches(size: int) -> Dict[str, List[int]]:
+    """每人每天 0~3 段在校时间, 每段两次打卡, 夹杂少量频繁重复打卡与落单打卡"""
+    _rng = random.Random(SEED)
+    _punches = {}
+    for _id in member_ids(size):
+        _times = []
+        for _day in range(PERIOD_DAYS):
+            _clock = PERIOD_START + _day * DAY + 8 * 3600
+            for _ in range(_rng.randint(0, 3)):
+                _clock += _rng.randint(600, 3 * 3600)
+                _end = _clock + _rng.randint(1800, 4 * 3600)
+                _times.extend((_clock, _end))
+                if _rng.random() < 0.1:
+                    _times.append(_end + _rng.randint(1, Constant.FREQUENCY_FILTER - 1))
+                _clock = _end
+            if _rng.random() < 0.05:
+                _times.append(PERIOD_START + _day * DAY + 23 * 3600)
+        _rng.shuffle(_times)
+        _punches[_id] = _times
+    return _punches
+
+
+def synthetic_rows(size: int) -> List[list]:
+    """与表格结构一致的名单, 前 ROW_START 行为表头"""
+    _types = ("正式队员", "参赛队员", "预备队员")
+    _rows = [[''] * Constant.COL_RECORDS_START for _ in range(Constant.ROW_START)]
+    for _i, _id in enumerate(member_ids(size)):
+        _row = [''] * Constant.COL_RECORDS_START
+        _row[Constant.COL_ID] = _id
+        _row[Constant.COL_NAME] = "成员{}".format(_i)
+        _row[Constant.COL_TYPE] = _types[_i % len(_types)]
+        _rows.append(_row)
+    return _rows
+
+
+# ==== 配对与计算 ====
+
+def _setup_pair(size: int):
+    return (synthetic_punches(size),)
+
+
+@case("spider.pair_punches", _setup_pair)
+def bench_pair(punches):
+    # pair_punches 原地排序与过滤, 每次使用新的副本 (复制的开销很小, 计入时间)
+    Spider.pair_punches({_id: list(_times) for _id, _times in punches.items()})
+
+
+def _setup_methods(size: int):
+    return synthetic_rows(size), Spider.pair_punches(synthetic_punches(size))
+
+
+def _bench_method(method_cls):
+    def _run(rows, records):
+        for _row in rows[Constant.ROW_START:]:
+            _method = method_cls(_row, records.get(_row[Constant.COL_ID], []))
+            _method.seconds()
+            _method.flex_count()
+            _method.regular_count()
+            _method.violation_count()
+    return _run
+
+
+def register_methods():
+    """Methods.all_methods 中的每个办法 (含训练日程与已保存的自定义规则) 各为一项"""
+    try:
+        from Modulo import Calendar
+        from Modulo import Rules
+        Calendar.register_saved()
+        Rules.register_saved()
+    except Exception as e:
+        print(f"载入自定义规则失败, 仅测试内置办法: {e}")
+    for _name, _method_cls in Methods.all_methods.items():
+        CASES["methods." + getattr(_method_cls, "__name__", _name)] = (_setup_methods, _bench_method(_method_cls))
+
+
+# ==== Writer ====
+
+class MemorySheet:
+    """
+    内存中的工作表, 只实现 Writer 写入路径用到的 range(...).value / number_format
+    用于在不启动 Excel 的情况下测量 Writer 自身的转换与分批开销
+    """
+
+    class Range:
+        __slots__ = ("sheet", "row", "col")
+
+        def __init__(self, sheet, cell, end=None):
+            self.sheet = sheet
+            self.row, self.col = cell if isinstance(cell, tuple) else (cell, end)
+
+        @property
+        def value(self):
+            return self.sheet.cells.get((self.row, self.col))
+
+        @value.setter
+        def value(self, rows):
+            for _i, _row in enumerate(rows):
+                for _j, _x in enumerate(_row):
+                    self.sheet.cells[(self.row + _i, self.col + _j)] = _x
+
+        @property
+        def number_format(self):
+            return None
+
+        @number_format.setter
+        def number_format(self, fmt):
+            self.sheet.formats.append(((self.row, self.col), fmt))
+
+    def __init__(self):
+        self.cells = {}
+        self.formats = []
+
+    def range(self, cell, end=None):
+        return MemorySheet.Range(self, cell, end)
+
+
+def _import_writer():
+    try:
+        from Modulo import Writer
+        return Writer
+    except ImportError:
+        return None
+
+
+def _setup_writer(size: int):
+    Writer = _import_writer()
+    if Writer is None:
+        raise ImportError("需要 xlwings")
+    from Modulo import Pipeline
+    _rows = synthetic_rows(size)
+    _records = Spider.pair_punches(synthetic_punches(size))
+    _writer = Writer.Writer.__new__(Writer.Writer)  # 不启动 Excel, 只替换工作表
+    _writer._Writer__sheet = MemorySheet()
+    _writer.append = True
+    _writer.data = [_row + [''] * Constant.COL_RECORDS_LENGTH for _row in _rows]
+    _new_col = Constant.COL_RECORDS_START
+    _scores = Pipeline.score_rows(_writer.data, _records, next(iter(Methods.all_methods)))
+    Pipeline.fill_block(_writer, _new_col, _scores)
+    return _writer, _new_col
+
+
+@case("writer.write_results", _setup_writer)
+def bench_writer(writer, new_col):
+    from Modulo import Pipeline
+    Pipeline.write_results(writer, new_col)
+
+
+def _setup_read_only(size: int):
+    Writer = _import_writer()
+    if Writer is None:
+        raise ImportError("需要 xlwings")
+    import openpyxl
+    _book = openpyxl.Workbook()
+    _sheet = _book.active
+    for _row in synthetic_rows(size):
+        _sheet.append([__ if __ != '' else None for __ in _row] + [1.5, 2, 0, 1, None] * 8)
+    _fd, _path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(_fd)
+    _book.save(_path)
+    _TEMP_FILES.append(_path)
+    return Writer.Writer.read_only, _path
+
+
+@case("writer.read_only", _setup_read_only)
+def bench_read_only(read_only, path):
+    read_only(path)
+
+
+_TEMP_FILES: List[str] = []
+
+
+# ==== 认证日志 ====
+
+def _setup_auth_logs(size: int):
+    import acm_attendance_with_login as login
+    login.VERBOSE = False
+    _rng = random.Random(SEED)
+    _logs = []
+    for _i in range(size):
+        _request = {"url": "https://example.com/static/{}.js".format(_i), "method": "GET", "headers": {}}
+        if _i % 5 == 0:
+            _request = {
+                "url": "https://example.com/api/attendance/record?page={}".format(_i), "method": "POST",
+                "headers": {"Accept": "application/json", "X-Trace": str(_rng.random())},
+                "postData": json.dumps({"page": _i, "size": 100, "filter": {"deptIds": [1, 2, 3]}}),
+            }
+        _logs.append({"message": json.dumps({"message": {"method": "Network.requestWillBeSent",
+                                                         "params": {"request": _request}}})})
+    # 只有最早的一条带有认证信息, 解析需要倒序扫描全部日志
+    _logs[0] = {"message": json.dumps({"message": {"method": "Network.requestWillBeSent", "params": {
+        "request": {"url": "https://example.com/api/checkin?member_id=123456", "method": "POST",
+                    "headers": {"Authorization": "Bearer abcdef.123456"}}}}})}
+
+    class _Driver:
+        @staticmethod
+        def get_log(kind):
+            return _logs
+
+    return login.parse_performance_logs_for_auth, _Driver()
+
+
+@case("auth.parse_performance_logs", _setup_auth_logs)
+def bench_auth_logs(parse, driver):
+    parse(driver, max_candidates=10 ** 9)
+
+
+# ==== 运行与比较 ====
+
+def measure(func: Callable, args: tuple, repeat: int, min_batch: float = 0.05) -> float:
+    """
+    单次调用耗时: 先确定每批调用次数使一批不少于 min_batch 秒, 再取 repeat 批中的最小值, 受其他进程干扰最小
+    被测代码的 print 输出被丢弃
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        _number = 1
+        while True:
+            _start = time.perf_counter()
+            for _ in range(_number):
+                func(*args)
+            _elapsed = time.perf_counter() - _start
+            if _elapsed >= min_batch:
+                break
+            _number *= 2
+        _best = _elapsed / _number
+        for _ in range(repeat - 1):
+            _start = time.perf_counter()
+            for _ in range(_number):
+                func(*args)
+            _best = min(_best, (time.perf_counter() - _start) / _number)
+    return _best
+
+
+def run(sizes: List[int], repeat: int, keyword: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    _results: Dict[str, Dict[str, float]] = {}
+    for _name, (_setup, _func) in CASES.items():
+        if keyword and keyword not in _name:
+            continue
+        for _size in sizes:
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    _args = _setup(_size)
+            except ImportError as e:
+                print("{:<44} 跳过: {}".format(_name, e))
+                break
+            _seconds = measure(_func, _args, repeat)
+            _results.setdefault(_name, {})[str(_size)] = _seconds
+            print("{:<44} {:>7} {:>12.3f} ms".format(_name, _size, _seconds * 1000))
+    for _path in _TEMP_FILES:
+        os.remove(_path)
+    _TEMP_FILES.clear()
+    return _results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            threshold: float) -> List[str]:
+    """
+    Returns:
+        变慢超过 threshold (比例) 的项目说明, 为空表示没有回退
+    """
+    _regressions = []
+    print("\n{:<44} {:>7} {:>12} {:>12} {:>8}".format("项目", "规模", "基线(ms)", "本次(ms)", "变化"))
+    for _name, _sizes in results.items():
+        for _size, _seconds in _sizes.items():
+            _base = baseline.get(_name, {}).get(_size)
+            if not _base:
+                continue
+            _ratio = _seconds / _base - 1
+            _flag = " !" if _ratio > threshold else ""
+            print("{:<44} {:>7} {:>12.3f} {:>12.3f} {:>+7.0%}{}".format(
+                _name, _size, _base * 1000, _seconds * 1000, _ratio, _flag))
+            if _ratio > threshold:
+                _regressions.append("{} @ {}: {:+.0%}".format(_name, _size, _ratio))
+    return _regressions
+
+
+def main(argv=None) -> int:
+    _parser = argparse.ArgumentParser(description="考勤统计性能基准")
+    _parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 1000], help="成员数 (日志条数) 规模")
+    _parser.add_argument("--repeat", type=int, default=5, help="每项重复次数, 取最小值")
+    _parser.add_argument("-k", dest="keyword", help="只运行名称包含该字符串的项目")
+    _parser.add_argument("--save", default="benchmark_results.json", help="结果保存位置")
+    _parser.add_argument("--compare", help="基线结果文件")
+    _parser.add_argument("--threshold", type=float, default=0.2, help="允许变慢的比例, 超过时退出码为 1")
+    _args = _parser.parse_args(argv)
+
+    register_methods()
+    _results = run(_args.sizes, _args.repeat, _args.keyword)
+    with open(_args.save, "w", encoding="utf-8") as _file:
+        json.dump({
+            "meta": {"python": sys.version.split()[0], "platform": platform.platform(), "seed": SEED,
+                     "repeat": _args.repeat, "time": time.strftime("%Y-%m-%d %H:%M:%S")},
+            "results": _results,
+        }, _file, ensure_ascii=False, indent=2)
+    print("\n结果已保存到 {}".format(_args.save))
+
+    if _args.compare:
+        with open(_args.compare, "r", encoding="utf-8") as _file:
+            _baseline = json.load(_file)["results"]
+        _regressions = compare(_results, _baseline, _args.threshold)
+        if _regressions:
+            print("\n性能回退 (阈值 {:.0%}):\n  {}".format(_args.threshold, "\n  ".join(_regressions)))
+            return 1
+        print("\n没有超过阈值 {:.0%} 的性能回退".format(_args.threshold))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+检查日程文件 (schedules.json) 中原内置的集训办法与被移除的 Methods 子类结果一致
+
+被移除的子类在此按原样重建为参照 (均只覆盖了 Methods.MethodRegular / MethodVacation 的类属性或违规计算),
+用固定种子生成 7 / 9 / 14 天周期的随机打卡, 比较 (灵活次数, 固定次数, 违规次数).
+
+用法:
+    python check_schedules.py                  # 有不一致时打印前几项, 退出码为 1
+    python check_schedules.py --cases 500
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from Modulo import Calendar
+from Modulo import Constant
+from Modulo import Methods
+
+SEED = 20240420
+DAY = 86400
+MEMBER_TYPES = ("正式队员", "参赛队员", "预备队员")
+
+
+def _day(y, m, d) -> float:
+    return time.mktime((y, m, d, 0, 0, 0, 0, 0, 0))
+
+
+class LegacyVacation241001(Methods.MethodVacation):
+    TRAIN_DAYS = [_day(2024, 10, 1), _day(2024, 10, 2), _day(2024, 10, 3), _day(2024, 10, 4)]
+    TRAIN_START = 9 * 3600
+    TRAIN_END = 17 * 3600
+
+
+class LegacyVacation20240430(Methods.MethodRegular):
+    FLEX_STANDARD = {"正式队员": 20, "参赛队员": 22}
+    FLEX_STANDARD_DEFAULT = 20
+
+
+class LegacyVacation20240501(Methods.MethodVacation):
+    TRAIN_DAYS = [_day(2024, 5, 2), _day(2024, 5, 3), _day(2024, 5, 4)]
+    TRAIN_START = 9 * 3600
+    TRAIN_END = 17 * 3600
+
+
+class LegacyVacation20240506(Methods.MethodRegular):
+    def _calc_violation_count(self) -> int:
+        return int(self.flex_count() < self.FLEX_STANDARD.get(
+            str(self._info[Constant.COL_TYPE]).strip(), self.FLEX_STANDARD_DEFAULT))
+
+
+LEGACY = {
+    "集训队假期管理方法241001 10-01~10-04 9:00~17:00": LegacyVacation241001,
+    "集训队假期管理方法240420 4-22~4-30": LegacyVacation20240430,
+    "集训队假期管理方法240501 05-02~05-03 9:00~17:00": LegacyVacation20240501,
+    "集训队假期管理方法240506 05-06~05-12": LegacyVacation20240506,
+}
+
+# 周期开始日期: 各办法的日期范围内外各取几个
+PERIOD_STARTS = [_day(2024, 4, 15), _day(2024, 4, 22), _day(2024, 4, 29), _day(2024, 5, 6), _day(2024, 9, 28),
+                 _day(2024, 9, 30), _day(2025, 3, 3)]
+PERIOD_DAYS = (7, 9, 14)
+
+
+def random_records(rng: random.Random, start: float, days: int) -> list:
+    """每天以一定概率打卡一到两次, 部分区间跨过 0 点"""
+    _records = []
+    for _d in range(days):
+        _t = int(start + _d * DAY + rng.randint(6 * 3600, 21 * 3600))
+        for _ in range(rng.choice((0, 1, 1, 2))):
+            _ed = _t + rng.randint(600, 9 * 3600)
+            _records.append((_t, _ed))
+            _t = _ed + rng.randint(600, 3 * 3600)
+    return _records
+
+
+def compare(cases: int) -> list:
+    """返回不一致的项 [(办法, 周期开始, 天数, 原结果, 新结果), ...]"""
+    Calendar.register_saved()
+    _rng = random.Random(SEED)
+    _mismatches = []
+    for _name, _legacy in LEGACY.items():
+        _schedule = Methods.all_methods.get(_name)
+        if _schedule is None:
+            _mismatches.append((_name, None, None, "日程文件中缺少该办法", None))
+            continue
+        for _start in PERIOD_STARTS:
+            for _days in PERIOD_DAYS:
+                for _ in range(cases):
+                    _info = [''] * (Constant.COL_RECORDS_START + 1)
+                    _info[Constant.COL_TYPE] = _rng.choice(MEMBER_TYPES)
+                    _records = random_records(_rng, _start, _days)
+                    _results = []
+                    for _method in (_legacy(_info, _records), _schedule(_info, _records)):
+                        _results.append((_method.flex_count(), _method.regular_count(), _method.violation_count()))
+                    if _results[0] != _results[1]:
+                        _mismatches.append((_name, _start, _days, _results[0], _results[1]))
+    return _mismatches
+
+
+def main():
+    _parser = argparse.ArgumentParser(description="比较日程文件与被移除的集训办法子类")
+    _parser.add_argument('--cases', type=int, default=100, help="每个办法、每个周期的随机成员数")
+    _args = _parser.parse_args()
+    _mismatches = compare(_args.cases)
+    _total = len(LEGACY) * len(PERIOD_STARTS) * len(PERIOD_DAYS) * _args.cases
+    if not _mismatches:
+        print(f"✅ {_total} 项全部一致")
+        return
+    print(f"❌ {len(_mismatches)} / {_total} 项不一致:")
+    for _name, _start, _days, _old, _new in _mismatches[:10]:
+        _when = time.strftime('%Y-%m-%d', time.localtime(_start)) if _start else ''
+        print(f"  {_name} {_when} {_days or ''}天: 原 {_old} -> 现 {_new}")
+    sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()